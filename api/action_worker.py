@@ -0,0 +1,316 @@
+"""
+Action Worker
+Long-running asyncio workers (one per device) that execute queued dashboard actions
+"""
+
+import asyncio
+import time
+from typing import Dict, List, Optional, Set
+
+from src.storage import ActionQueue, get_email_store
+from src.utils import StageStats, get_device_pool, setup_logger
+
+logger = setup_logger(__name__)
+
+# Inbox actions that can share one multi-select device session
+COALESCIBLE_ACTIONS = ("archive", "delete")
+
+
+class ActionWorker:
+    """
+    Leases actions from the queue and runs them through a DroidRunExecutor.
+
+    The worker sleeps until the queue reports new work (no polling; a slow
+    sweep picks up leases abandoned by other executors). Each wake-up leases
+    a batch, runs compatible archive/delete actions together in one device
+    session and everything else one by one, then acks or nacks every action.
+    Leases are renewed while the batch runs. An action whose lease was lost
+    to another executor is not started, and the batch is abandoned (not
+    acked) if the action in flight loses its lease or renewal keeps failing
+    until the leases may have expired.
+    A worker bound to a device only leases actions for that device (or for
+    any device), so each device works through its own share of the queue.
+    """
+
+    def __init__(
+        self,
+        queue: ActionQueue,
+        executor,
+        owner: str = "api-worker",
+        batch_size: int = 10,
+        lease_seconds: float = 600.0,
+        sweep_seconds: float = 60.0,
+        coalesce_seconds: float = 1.0,
+        data_dir=None,
+        device: Optional[str] = None
+    ):
+        """
+        Args:
+            queue: Action queue to consume
+            executor: DroidRunExecutor (or anything with the same methods)
+            owner: Lease owner name for this worker
+            batch_size: Max actions leased (and coalesced) per round
+            lease_seconds: Lease length; renewed every third of it while a
+                batch runs
+            sweep_seconds: Wake-up interval for expired leases when idle
+            coalesce_seconds: Pause after a wake-up so a burst of clicks
+                lands in one batch
+            data_dir: Email store directory, for looking up subjects
+            device: Serial of the executor's device; None leases every action
+        """
+        self.queue = queue
+        self.executor = executor
+        self.owner = owner
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.sweep_seconds = sweep_seconds
+        self.coalesce_seconds = coalesce_seconds
+        self.data_dir = data_dir
+        self.device = device
+
+        self.stats: Dict[str, StageStats] = {}
+        self.wait_stats = StageStats("queue_wait")
+        self.started_at: Optional[float] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        # Ids of the current batch whose lease this worker still holds, and of those running
+        self._held: Set[str] = set()
+        self._running: Set[str] = set()
+        self.lost_leases = 0
+
+    def _on_enqueue(self, action: Dict):
+        # Called from whichever thread enqueued
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def start(self):
+        """Start the worker on the running event loop."""
+        if self._task is not None and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self.started_at = time.time()
+        self.queue.add_listener(self._on_enqueue)
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self):
+        """Stop the worker; actions in flight keep their lease and are retried later."""
+        self.queue.remove_listener(self._on_enqueue)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                if await self.run_once():
+                    continue
+            except Exception:
+                # Unfinished actions keep their lease and come back once it expires
+                logger.exception(f"✗ Action worker {self.owner} failed a round")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.sweep_seconds)
+            except asyncio.TimeoutError:
+                continue
+            await asyncio.sleep(self.coalesce_seconds)
+
+    async def drain(self) -> int:
+        """Process actions until none are claimable. Returns the number processed."""
+        if self.started_at is None:
+            self.started_at = time.time()
+        total = 0
+        while True:
+            processed = await self.run_once()
+            if not processed:
+                return total
+            total += processed
+
+    async def run_once(self) -> int:
+        """Lease and execute one batch. Returns the number of actions leased."""
+        leased = self.queue.lease(
+            self.owner, limit=self.batch_size, lease_seconds=self.lease_seconds, device=self.device
+        )
+        if not leased:
+            return 0
+
+        now = time.time()
+        for item in leased:
+            self.wait_stats.record(max(0.0, now - item["createdAt"]))
+        self._held = {item["id"] for item in leased}
+        execution = asyncio.ensure_future(self._execute(leased))
+        heartbeat = asyncio.ensure_future(self._keep_leases(execution))
+        try:
+            await execution
+        except asyncio.CancelledError:
+            # Only swallow the heartbeat abandoning the batch, not a stop()
+            if not heartbeat.done() or heartbeat.cancelled():
+                raise
+        finally:
+            heartbeat.cancel()
+            self._held = set()
+            self._running = set()
+        return len(leased)
+
+    async def _keep_leases(self, execution: asyncio.Future):
+        """
+        Renew the current batch's leases until it is done. Cancels the
+        batch when the action in flight lost its lease, or when renewal
+        failed until the leases may have expired.
+        """
+        interval = max(1.0, self.lease_seconds / 3)
+        renewed_at = time.monotonic()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                held = set(self.queue.renew(sorted(self._held), self.owner, lease_seconds=self.lease_seconds))
+            except Exception:
+                logger.exception(f"✗ {self.owner} could not renew its leases")
+                if time.monotonic() - renewed_at + interval < self.lease_seconds:
+                    # The leases outlast the next attempt
+                    continue
+                held = set()
+            else:
+                renewed_at = time.monotonic()
+            lost = self._held - held
+            if not lost:
+                continue
+            self.lost_leases += len(lost)
+            self._held &= held
+            if lost & self._running:
+                # Another executor may run it too; stop here rather than ack a lease we don't own
+                logger.warning(f"⚠️  {self.owner} lost the lease on an action in flight; abandoning the batch")
+                execution.cancel()
+                return
+            logger.warning(f"⚠️  {self.owner} lost the lease on {len(lost)} action(s); not running them")
+
+    async def _execute(self, leased: List[Dict]):
+        """Run a leased batch: coalesced archive/delete sessions first, then the rest."""
+        groups: Dict[str, List[Dict]] = {}
+        singles: List[Dict] = []
+        for item in leased:
+            if item["action"] in COALESCIBLE_ACTIONS and self._subject(item):
+                groups.setdefault(item["action"], []).append(item)
+            else:
+                singles.append(item)
+
+        for action, items in groups.items():
+            items = [item for item in items if item["id"] in self._held]
+            if items:
+                await self._run_group(action, items)
+        for item in singles:
+            if item["id"] in self._held:
+                await self._run_single(item)
+
+    def _subject(self, item: Dict) -> Optional[str]:
+        """Subject line for an action: from its payload, else from the email store."""
+        payload = item.get("payload") or {}
+        if payload.get("subject"):
+            return payload["subject"]
+        if item.get("emailId") and self.data_dir is not None:
+            record = get_email_store(self.data_dir).get_email(item["emailId"])
+            if record and record.get("subject"):
+                return record["subject"]
+        return None
+
+    async def _run_group(self, action: str, items: List[Dict]):
+        started = time.monotonic()
+        subjects = [self._subject(item) for item in items]
+        self._running = {item["id"] for item in items}
+        try:
+            outcomes = await self.executor.execute_batch(
+                action, subjects, keys=[item["id"] for item in items]
+            )
+        except Exception as e:
+            outcomes = {}
+            error = str(e)
+        else:
+            error = None
+        # Every action in the session shares its wall time
+        elapsed = time.monotonic() - started
+        self._running = set()
+        for item in items:
+            self._finish(item, outcomes.get(item["id"], False), elapsed, error)
+
+    async def _run_single(self, item: Dict):
+        started = time.monotonic()
+        error = None
+        self._running = {item["id"]}
+        try:
+            if item["action"] == "purge_spam":
+                ok = await self.executor.purge_spam()
+            else:
+                ok = await self.executor.execute_action(item["emailId"], item["action"], self._subject(item))
+        except Exception as e:
+            ok, error = False, str(e)
+        self._running = set()
+        self._finish(item, ok, time.monotonic() - started, error)
+
+    def _finish(self, item: Dict, ok: bool, elapsed: float, error: Optional[str]):
+        self.stats.setdefault(item["action"], StageStats(item["action"])).record(elapsed, ok=ok)
+        label = f"{item['action']} {item.get('emailId') or ''}".strip()
+        if item["id"] not in self._held:
+            # The lease was lost mid-run; whoever holds it now records the outcome
+            logger.warning(f"⚠️  {self.owner} no longer holds the lease on {label}; outcome not recorded")
+            return
+        self._held.discard(item["id"])
+        if ok:
+            recorded = self.queue.ack(item["id"], owner=self.owner)
+            logger.info(f"✓ Completed: {label} ({elapsed:.1f}s)")
+        else:
+            recorded = self.queue.nack(item["id"], owner=self.owner, error=error or "Agent reported failure")
+            logger.warning(f"✗ Failed: {label} ({elapsed:.1f}s)")
+        if not recorded:
+            # The lease lapsed mid-run; another executor may have run the action too
+            self.lost_leases += 1
+            logger.warning(f"⚠️  {self.owner} no longer held the lease on {label}; outcome not recorded")
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def get_stats(self) -> Dict:
+        """Per-action-type latency and success counts, plus queue wait times."""
+        wall = time.time() - self.started_at if self.started_at else 0.0
+        return {
+            "running": self.running,
+            "owner": self.owner,
+            "device": self.device,
+            "queue": self.queue.counts(),
+            "queue_wait": self.wait_stats.as_dict(wall),
+            "lost_leases": self.lost_leases,
+            "actions": {name: stats.as_dict(wall) for name, stats in self.stats.items()},
+        }
+
+
+async def create_device_workers(queue: ActionQueue, owner: str = "api-worker", **kwargs) -> List[ActionWorker]:
+    """
+    Create one worker per attached device, rediscovering the device pool.
+
+    Args:
+        queue: Action queue to consume
+        owner: Lease owner prefix; each worker appends its device serial
+        **kwargs: Passed on to ActionWorker
+
+    Returns:
+        The workers (not started)
+    """
+    from api.droidrun_executor import DroidRunExecutor
+
+    pool = get_device_pool()
+    await pool.discover()
+    return [
+        ActionWorker(
+            queue,
+            DroidRunExecutor(serial=serial),
+            owner=f"{owner}-{serial}" if serial else owner,
+            device=serial,
+            **kwargs
+        )
+        for serial in pool.serials
+    ]
@@ -4,93 +4,122 @@ Connects the web dashboard with DroidRun email processing
 """
 
 import asyncio
+import os
 import sys
 from pathlib import Path
+from typing import Dict, Hashable, List, Optional
 
-# Add parent directory to path to import main.py
+# Add parent directory to path to import src
 sys.path.append(str(Path(__file__).parent.parent))
 
-from main import CalendarEventScheduler
-from droidrun import DroidAgent, DroidrunConfig
+from src.utils import get_device_pool
+from src.prompts import (
+    get_archive_email_by_id_goal,
+    get_archive_email_goal,
+    get_delete_email_goal,
+    get_delete_inbox_email_goal,
+    get_purge_spam_goal,
+    get_reply_email_goal,
+    get_restore_email_goal,
+)
 
 
 class DroidRunExecutor:
-    """Executes actions queued from the web dashboard."""
-    
-    def __init__(self, config_path: str = "config.yaml"):
-        self.config = DroidrunConfig.from_yaml(config_path)
-        
-    async def execute_action(self, email_id: str, action: str) -> bool:
+    """Executes actions queued from the web dashboard on one device."""
+
+    def __init__(self, config_path: str = "config.yaml", serial: Optional[str] = None):
+        """
+        Args:
+            config_path: Path to config.yaml
+            serial: ADB serial of the device to drive (None: any free device)
+        """
+        self.config_path = config_path
+        self.serial = serial
+        self.device_pool = get_device_pool()
+
+    async def _run_agent(self, goal: str, max_steps: int = 30, output_model=None, task: str = "action"):
+        """Run one DroidAgent on this executor's device (one agent per device at a time)."""
+        return await self.device_pool.run_agent(
+            goal,
+            max_steps=max_steps,
+            output_model=output_model,
+            config_path=self.config_path,
+            serial=self.serial,
+            task=task
+        )
+
+    async def execute_action(self, email_id: str, action: str, subject: Optional[str] = None) -> bool:
         """
         Execute a single action on an email.
-        
+
         Args:
             email_id: Email identifier
-            action: Action to perform ("archive", "delete", "reply")
-            
+            action: Action to perform ("archive", "delete", "reply", "restore")
+            subject: Subject line, if known (lets the agent find the email)
+
         Returns:
             True if successful, False otherwise
         """
-        goal = self._build_action_goal(email_id, action)
-        
+        goal = self._build_action_goal(email_id, action, subject)
+
         try:
-            agent = DroidAgent(goal=goal, config=self.config)
-            result = await agent.run()
+            result = await self._run_agent(goal, task=f"action_{action}")
             return result.success
         except Exception as e:
             print(f"Error executing action: {e}")
             return False
-    
-    def _build_action_goal(self, email_id: str, action: str) -> str:
+
+    async def execute_batch(
+        self,
+        action: str,
+        subjects: List[str],
+        keys: Optional[List[Hashable]] = None
+    ) -> Dict[Hashable, bool]:
+        """
+        Archive or delete several inbox emails in one multi-select session.
+
+        Args:
+            action: "archive" or "delete"
+            subjects: Subject lines of the emails
+            keys: One key per email for the outcomes (e.g. queued action
+                ids, so emails sharing a subject don't collide); default
+                the subjects
+
+        Returns:
+            key -> succeeded (emails left pending after an aborted run are missing)
+        """
+        os.environ["INBOXPILOT_WEBAPP_MODE"] = "1"
+        from src.modules import InboxActionBuffer
+
+        buffer = InboxActionBuffer(
+            run_agent=self._run_agent,
+            single_action=lambda single, subject: self.execute_action(subject, single, subject),
+            batch_size=max(1, len(subjects))
+        )
+        keys = keys if keys is not None else subjects
+        for key, subject in zip(keys, subjects):
+            buffer.add_action(action, subject, key=key)
+
+        outcomes = await buffer.flush()
+        return outcomes.get(action, {})
+
+    def _build_action_goal(self, email_id: str, action: str, subject: Optional[str] = None) -> str:
         """Build goal string for email action."""
         if action == "archive":
-            return f"""
-Open Gmail app and find the email with ID {email_id}.
-Select the email and tap the Archive button.
-Return to inbox.
-            """.strip()
+            return get_archive_email_goal(subject) if subject else get_archive_email_by_id_goal(email_id)
         elif action == "delete":
-            return f"""
-Open Gmail app and find the email with ID {email_id}.
-Select the email and tap the Delete button.
-Confirm deletion if prompted.
-Return to inbox.
-            """.strip()
+            return get_delete_inbox_email_goal(subject) if subject else get_delete_email_goal(email_id)
         elif action == "reply":
-            return f"""
-Open Gmail app and find the email with ID {email_id}.
-Tap on the email to open it.
-Tap the Reply button.
-Wait for the compose screen to open.
-            """.strip()
+            return get_reply_email_goal(email_id)
         elif action == "restore":
-            return f"""
-Open Gmail app.
-Tap the menu icon (three horizontal lines) at the top left.
-Scroll down and tap "Trash" or "Bin".
-Find the email with ID {email_id} or the most recent spam email.
-Long press to select the email.
-Tap the "Move to" icon (usually a folder icon) at the top.
-Select "Inbox" from the options.
-Tap the back button to return to the main screen.
-            """.strip()
+            return get_restore_email_goal(email_id)
         else:
             raise ValueError(f"Unknown action: {action}")
-    
+
     async def purge_spam(self) -> bool:
         """Delete all emails in the spam category."""
-        goal = """
-Open Gmail app.
-Navigate to the Spam folder.
-Tap 'Select All' or select all visible spam emails.
-Tap 'Delete Forever' or 'Empty Spam Now'.
-Confirm the action if prompted.
-Return to inbox.
-        """.strip()
-        
         try:
-            agent = DroidAgent(goal=goal, config=self.config)
-            result = await agent.run()
+            result = await self._run_agent(get_purge_spam_goal(), task="purge_spam")
             return result.success
         except Exception as e:
             print(f"Error purging spam: {e}")
@@ -99,46 +128,19 @@ Return to inbox.
 
 async def process_action_queue():
     """
-    Main loop to process queued actions from the web dashboard.
-    This should be run periodically (e.g., via cron or as a background service).
+    Drain the action queue once, outside the API server, with one worker per device.
+    The API server runs the same workers continuously (see api/action_worker.py).
     """
-    import requests
-    
-    executor = DroidRunExecutor()
-    
-    # Fetch action queue from API
-    try:
-        response = requests.get("http://localhost:8000/api/actions/queue")
-        data = response.json()
-        actions = data.get("actions", [])
-        
-        print(f"Processing {len(actions)} queued actions...")
-        
-        for idx, action_item in enumerate(actions):
-            if action_item["status"] != "queued":
-                continue
-            
-            action = action_item.get("action")
-            email_id = action_item.get("emailId")
-            
-            print(f"Executing: {action} on {email_id}")
-            
-            if action == "purge_spam":
-                success = await executor.purge_spam()
-            else:
-                success = await executor.execute_action(email_id, action)
-            
-            if success:
-                # Mark action as completed
-                requests.post(f"http://localhost:8000/api/actions/complete/{idx}")
-                print(f"✓ Completed: {action}")
-            else:
-                print(f"✗ Failed: {action}")
-        
-        print("Action queue processing complete")
-        
-    except Exception as e:
-        print(f"Error processing action queue: {e}")
+    from api.action_worker import create_device_workers
+    from src.storage import get_action_queue
+
+    data_dir = Path(__file__).parent.parent / "data"
+    workers = await create_device_workers(get_action_queue(data_dir), owner="cli-executor", data_dir=data_dir)
+
+    processed = await asyncio.gather(*(worker.drain() for worker in workers))
+    print(f"Action queue processing complete: {sum(processed)} action(s)")
+    for worker in workers:
+        print(worker.get_stats())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,81 @@
+"""
+Change Feed
+Fans store changes and job progress out to Server-Sent Events subscribers
+"""
+
+import asyncio
+import itertools
+import json
+import threading
+from typing import Dict, Optional, Set
+
+# Events buffered per subscriber before it is considered too slow
+SUBSCRIBER_QUEUE_SIZE = 256
+
+
+class EventBroker:
+    """
+    Thread-safe publish/subscribe hub for dashboard events.
+
+    Store writes happen both on the event loop (scans) and in threadpool
+    handlers (restore), so publish() hands events to the loop with
+    call_soon_threadsafe. A subscriber that falls too far behind gets a
+    single "resync" event telling it to refetch /api/emails instead.
+    """
+
+    def __init__(self):
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def subscribe(self) -> asyncio.Queue:
+        """Register a subscriber on the running loop and return its queue."""
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        with self._lock:
+            self._subscribers.discard(queue)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, event: Dict):
+        """Send an event to every subscriber (callable from any thread)."""
+        with self._lock:
+            if not self._subscribers or self._loop is None or self._loop.is_closed():
+                return
+            loop = self._loop
+            event = dict(event, seq=next(self._ids))
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._deliver(event)
+        else:
+            loop.call_soon_threadsafe(self._deliver, event)
+
+    def _deliver(self, event: Dict):
+        for queue in list(self._subscribers):
+            if queue.full():
+                # Too slow: drop its backlog and ask it to resync from a snapshot
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"type": "resync", "seq": event["seq"]})
+            else:
+                queue.put_nowait(event)
+
+
+def format_sse(event: Dict) -> str:
+    """Encode an event as a Server-Sent Events frame."""
+    return f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+# Process-wide broker shared by the store listener, job manager and stream route
+event_broker = EventBroker()
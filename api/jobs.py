@@ -0,0 +1,187 @@
+"""
+Background Job Manager
+Runs long workloads (inbox scans, recategorization, calendar scheduling)
+as asyncio tasks so API requests return immediately with a job ID
+"""
+
+import asyncio
+import time
+import traceback
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from api.events import event_broker
+
+# Finished jobs kept for status lookups
+MAX_FINISHED_JOBS = 100
+
+ACTIVE_STATUSES = ("queued", "running")
+
+# Device key for jobs that fan out over every device in the pool
+ALL_DEVICES = "all"
+
+# Kinds that can't run alongside each other on any device: a recategorize
+# rewrites the categorized records a scan is adding to
+EXCLUSIVE_KINDS = {
+    "scan": ("recategorize",),
+    "recategorize": ("scan",),
+}
+
+
+class JobConflictError(Exception):
+    """Raised when a conflicting job (same kind on an overlapping device, or an exclusive kind) is active."""
+
+    def __init__(self, job: "Job"):
+        super().__init__(f"A {job.kind} job is already running on {job.device or 'this server'}")
+        self.job = job
+
+
+class Job:
+    """State of one background job."""
+
+    def __init__(self, kind: str, device: Optional[str] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.device = device
+        self.status = "queued"
+        self.done = 0
+        self.total: Optional[int] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def update(self, done: int, total: Optional[int] = None):
+        """Progress callback handed to the workload."""
+        self.done = done
+        if total is not None:
+            self.total = total
+        self.publish()
+
+    def publish(self):
+        """Push the job's current state to change feed subscribers."""
+        event_broker.publish({"type": "job_progress", "job": self.as_dict()})
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        """Remaining time extrapolated from the average time per item so far."""
+        if self.status != "running" or not self.total or not self.done or not self.started_at:
+            return None
+        per_item = (time.time() - self.started_at) / self.done
+        return round(per_item * max(0, self.total - self.done), 1)
+
+    def as_dict(self) -> Dict[str, Any]:
+        end = self.finished_at or time.time()
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "device": self.device,
+            "status": self.status,
+            "progress": {
+                "done": self.done,
+                "total": self.total,
+                "percent": round(self.done / self.total * 100, 1) if self.total else None,
+            },
+            "eta_seconds": self.eta_seconds,
+            "elapsed_seconds": round(end - self.started_at, 1) if self.started_at else 0.0,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """Tracks background jobs and refuses duplicate concurrent runs."""
+
+    def __init__(self):
+        self.jobs: Dict[str, Job] = {}
+
+    def find_active(self, kind: str, device: Optional[str] = None) -> Optional[Job]:
+        """
+        Active job that conflicts with a new one, if any: the same kind on
+        this device (or on all devices), or an exclusive kind on any device.
+        """
+        for job in self.jobs.values():
+            if job.status not in ACTIVE_STATUSES:
+                continue
+            if job.kind in EXCLUSIVE_KINDS.get(kind, ()):
+                return job
+            if job.kind == kind and (job.device == device or ALL_DEVICES in (job.device, device)):
+                return job
+        return None
+
+    def submit(
+        self,
+        kind: str,
+        runner: Callable[[Job], Awaitable[Any]],
+        device: Optional[str] = None
+    ) -> Job:
+        """
+        Start a job in the background.
+
+        Args:
+            kind: Job type, e.g. "scan"
+            runner: Coroutine function taking the Job (for progress updates)
+                and returning the job result
+            device: Device serial the job drives, or ALL_DEVICES; one job
+                per kind and device, and never a scan next to a recategorize
+
+        Returns:
+            The new Job
+
+        Raises:
+            JobConflictError: If the same kind of job is active on the
+                device (or on all devices), or an exclusive kind is active
+        """
+        active = self.find_active(kind, device)
+        if active:
+            raise JobConflictError(active)
+
+        job = Job(kind, device)
+        self.jobs[job.id] = job
+        job.task = asyncio.get_running_loop().create_task(self._run(job, runner))
+        self._prune()
+        return job
+
+    async def _run(self, job: Job, runner: Callable[[Job], Awaitable[Any]]):
+        job.status = "running"
+        job.started_at = time.time()
+        job.publish()
+        try:
+            job.result = await runner(job)
+            job.status = "succeeded"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+        except Exception as e:
+            traceback.print_exc()
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            job.publish()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        return sorted(self.jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel an active job. Returns False if it is unknown or already finished."""
+        job = self.jobs.get(job_id)
+        if job is None or job.status not in ACTIVE_STATUSES or job.task is None:
+            return False
+        job.task.cancel()
+        return True
+
+    def _prune(self):
+        finished = [job for job in self.list() if job.status not in ACTIVE_STATUSES]
+        for job in finished[MAX_FINISHED_JOBS:]:
+            del self.jobs[job.id]
+
+
+# Process-wide job manager shared by all routes
+job_manager = JobManager()
@@ -5,6 +5,8 @@ Refactored FastAPI server with modular routes
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+import os
 import sys
 from pathlib import Path
 
@@ -12,7 +14,9 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 # Import route modules
-from api.routes import emails_router, actions_router, scheduler_router
+from api.routes import emails_router, actions_router, scheduler_router, jobs_router, devices_router
+from api.routes.actions import start_action_workers, stop_action_workers
+from src.utils import render_metrics
 
 app = FastAPI(
     title="InboxPilot API",
@@ -29,10 +33,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.on_event("startup")
+async def start_action_worker():
+    """Execute queued dashboard actions in the background, one worker per device."""
+    if os.getenv("INBOXPILOT_ACTION_WORKER", "1") != "0":
+        await start_action_workers()
+
+
+@app.on_event("shutdown")
+async def stop_action_worker():
+    await stop_action_workers()
+
+
 # Include route modules
 app.include_router(emails_router)
 app.include_router(actions_router)
 app.include_router(scheduler_router)
+app.include_router(jobs_router)
+app.include_router(devices_router)
 
 
 @app.get("/")
@@ -43,11 +62,17 @@ def read_root():
         "version": "2.0.0",
         "endpoints": {
             "emails": "/api/emails",
+            "email_stream": "/api/emails/stream",
             "scan_inbox": "/api/emails/scan",
             "recategorize": "/api/emails/recategorize",
+            "categorization_cache": "/api/emails/cache",
             "actions": "/api/actions",
+            "action_worker": "/api/actions/worker",
             "scheduler": "/api/scheduler/run",
-            "stats": "/api/stats"
+            "jobs": "/api/jobs",
+            "devices": "/api/devices",
+            "stats": "/api/stats",
+            "metrics": "/metrics"
         }
     }
 
@@ -57,6 +82,12 @@ def health_check():
     return {"status": "healthy", "service": "inboxpilot-api"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Agent run, Gemini and pipeline phase metrics in the Prometheus text format."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
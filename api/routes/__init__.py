@@ -3,9 +3,13 @@
 from .emails import router as emails_router
 from .actions import router as actions_router
 from .scheduler import router as scheduler_router
+from .jobs import router as jobs_router
+from .devices import router as devices_router
 
 __all__ = [
     'emails_router',
     'actions_router',
     'scheduler_router',
+    'jobs_router',
+    'devices_router',
 ]
@@ -1,20 +1,18 @@
 """Action-related API endpoints (archive, delete, restore, etc.)"""
 
 import os
-import json
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
-from datetime import datetime
 from pathlib import Path
+from typing import List, Optional, Tuple
+
+from src.storage import get_action_queue, get_email_store
+from src.utils import get_device_pool
 
 router = APIRouter(prefix="/api", tags=["actions"])
 
-# Paths to JSON data files
+# Directory holding the email store and action queue
 DATA_DIR = Path(__file__).parent.parent.parent / "data"
-PROCESSED_EMAILS_PATH = DATA_DIR / "processed_emails.json"
-
-# Action queue storage (in production, use a database)
-action_queue = []
 
 
 # Pydantic Models
@@ -27,80 +25,156 @@ class RestoreRequest(BaseModel):
     emailId: str
 
 
+class LeaseRequest(BaseModel):
+    owner: str  # Executor identifier
+    limit: int = 1
+    lease_seconds: float = 120.0
+    device: Optional[str] = None  # Executor's device serial; None leases any action
+
+
+class FailRequest(BaseModel):
+    owner: Optional[str] = None
+    error: Optional[str] = None
+
+
+def _email_target(email_id: str) -> Tuple[Optional[dict], Optional[str]]:
+    """
+    Subject of the email and the device it was read on, saved with the action
+    so the right device can find it later.
+    """
+    record = get_email_store(DATA_DIR).get_email(email_id)
+    if not record:
+        return None, None
+    payload = {"subject": record["subject"]} if record.get("subject") else None
+    return payload, record.get("device")
+
+
 @router.post("/actions")
 def queue_action(action: ActionRequest):
     """Queue an action for DroidRun to execute."""
-    action_queue.append({
-        "emailId": action.emailId,
-        "action": action.action,
-        "timestamp": datetime.now().isoformat(),
-        "status": "queued"
-    })
+    payload, device = _email_target(action.emailId)
+    queued = get_action_queue(DATA_DIR).enqueue(
+        action.action, email_id=action.emailId, payload=payload, device=device
+    )
     return {
         "success": True,
-        "message": f"Action '{action.action}' queued for email {action.emailId}"
+        "message": f"Action '{action.action}' queued for email {action.emailId}",
+        "actionId": queued["id"]
     }
 
 
 @router.get("/actions/queue")
-def get_action_queue():
-    """Get pending actions for DroidRun to execute."""
-    return {"actions": action_queue}
+def get_action_queue_items(limit: int = Query(50, ge=1, le=500), device: Optional[str] = None):
+    """Get claimable actions (queued, or leased with an expired lease), oldest first."""
+    return {"actions": get_action_queue(DATA_DIR).claimable(limit=limit, device=device)}
+
+
+@router.post("/actions/lease")
+def lease_actions(request: LeaseRequest):
+    """Lease actions for an executor; they must be completed before the lease expires."""
+    actions = get_action_queue(DATA_DIR).lease(
+        request.owner, limit=request.limit, lease_seconds=request.lease_seconds, device=request.device
+    )
+    return {"actions": actions}
 
 
 @router.post("/actions/purge-spam")
 def purge_spam():
-    """Queue deletion of all spam emails."""
-    action_queue.append({
-        "action": "purge_spam",
-        "timestamp": datetime.now().isoformat(),
-        "status": "queued"
-    })
-    return {"success": True, "message": "Spam purge queued"}
+    """Queue deletion of all spam emails, once per device (each holds its own mailbox)."""
+    queue = get_action_queue(DATA_DIR)
+    queued = [queue.enqueue("purge_spam", device=serial) for serial in get_device_pool().serials or [None]]
+    return {
+        "success": True,
+        "message": "Spam purge queued",
+        "actionId": queued[0]["id"],
+        "actionIds": [action["id"] for action in queued]
+    }
 
 
 @router.post("/actions/restore")
 def restore_email(request: RestoreRequest):
     """Restore an email from spam/trash to inbox."""
+    from src.categorization import get_sender_memo
+    
     email_id = request.emailId
-    action_queue.append({
-        "emailId": email_id,
-        "action": "restore",
-        "timestamp": datetime.now().isoformat(),
-        "status": "queued"
-    })
+    payload, device = _email_target(email_id)
+    queued = get_action_queue(DATA_DIR).enqueue(
+        "restore", email_id=email_id, payload=payload, device=device
+    )
     
-    # Also remove from spam list in processed_emails.json
+    # The user disagreed with the sender's past categories; stop trusting them
+    record = get_email_store(DATA_DIR).get_email(email_id)
+    if record and record.get("email"):
+        get_sender_memo(DATA_DIR).invalidate(record["email"], reason=f"restored {email_id}")
+    
+    # Also remove from the spam list in the email store
     try:
-        if PROCESSED_EMAILS_PATH.exists():
-            with open(PROCESSED_EMAILS_PATH, 'r') as f:
-                data = json.load(f)
-            
-            if "spam" in data:
-                data["spam"] = [email for email in data["spam"] if email.get("id") != email_id]
-                
-            with open(PROCESSED_EMAILS_PATH, "w") as f:
-                json.dump(data, f, indent=2)
+        get_email_store(DATA_DIR).remove_email(email_id, category="spam")
     except Exception as e:
-        print(f"Error updating processed_emails.json: {e}")
+        print(f"Error updating email store: {e}")
     
-    return {"success": True, "message": f"Restore queued for email {email_id}"}
+    return {"success": True, "message": f"Restore queued for email {email_id}", "actionId": queued["id"]}
 
 
 @router.post("/actions/complete/{action_id}")
-def complete_action(action_id: int):
-    """Mark an action as completed by DroidRun."""
-    if action_id < len(action_queue):
-        action_queue[action_id]["status"] = "completed"
+def complete_action(action_id: str, owner: Optional[str] = None):
+    """Mark an action as completed by DroidRun (only by the lease owner, if given)."""
+    queue = get_action_queue(DATA_DIR)
+    if queue.ack(action_id, owner=owner):
         return {"success": True, "message": "Action marked as completed"}
-    raise HTTPException(status_code=404, detail="Action not found")
+    if queue.get(action_id) is None:
+        raise HTTPException(status_code=404, detail="Action not found")
+    raise HTTPException(status_code=409, detail="Action is not pending or the lease is held by another executor")
+
+
+@router.post("/actions/fail/{action_id}")
+def fail_action(action_id: str, request: FailRequest):
+    """Report a failed attempt; the action is retried until it runs out of attempts."""
+    queue = get_action_queue(DATA_DIR)
+    if queue.nack(action_id, owner=request.owner, error=request.error):
+        return {"success": True, "action": queue.get(action_id)}
+    if queue.get(action_id) is None:
+        raise HTTPException(status_code=404, detail="Action not found")
+    raise HTTPException(status_code=409, detail="Action is not pending or the lease is held by another executor")
 
 
 @router.get("/actions/stats")
 def get_action_stats():
     """Get action queue statistics."""
+    counts = get_action_queue(DATA_DIR).counts()
     return {
-        "total_actions": len(action_queue),
-        "queued": len([a for a in action_queue if a["status"] == "queued"]),
-        "completed": len([a for a in action_queue if a["status"] == "completed"])
+        "total_actions": sum(counts.values()),
+        **counts
     }
+
+
+# In-process workers executing queued actions, one per device (started with the app)
+_action_workers: List = []
+
+
+def get_action_workers() -> List:
+    """The API server's running action workers."""
+    return list(_action_workers)
+
+
+async def start_action_workers():
+    """(Re)start one action worker per attached device."""
+    from api.action_worker import create_device_workers
+    
+    await stop_action_workers()
+    workers = await create_device_workers(get_action_queue(DATA_DIR), data_dir=DATA_DIR)
+    for worker in workers:
+        worker.start()
+    _action_workers.extend(workers)
+
+
+async def stop_action_workers():
+    """Stop all action workers; actions in flight are retried after their lease expires."""
+    while _action_workers:
+        await _action_workers.pop().stop()
+
+
+@router.get("/actions/worker")
+def get_action_worker_stats():
+    """Get each action worker's per-action latency and success counts."""
+    return {"workers": [worker.get_stats() for worker in get_action_workers()]}
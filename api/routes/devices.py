@@ -0,0 +1,24 @@
+"""Device pool API endpoints"""
+
+from fastapi import APIRouter
+
+from src.utils import get_device_pool
+from api.routes.actions import get_action_workers, start_action_workers
+
+router = APIRouter(prefix="/api", tags=["devices"])
+
+
+@router.get("/devices")
+def list_devices():
+    """Get health, current work and throughput for each device in the pool."""
+    return {"devices": get_device_pool().get_stats()}
+
+
+@router.post("/devices/refresh")
+async def refresh_devices():
+    """Rediscover attached devices and give each one an action worker."""
+    if get_action_workers():
+        await start_action_workers()
+    else:
+        await get_device_pool().discover()
+    return {"devices": get_device_pool().get_stats()}
@@ -1,19 +1,25 @@
 """Email-related API endpoints"""
 
+import asyncio
+import base64
+import hashlib
 import os
-from fastapi import APIRouter, HTTPException
+import threading
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List
-import json
+from typing import Any, Dict, List, Optional, Union
 from pathlib import Path
 from datetime import datetime
 
+from src.storage import CATEGORIES, get_email_store, get_scan_journal
+from api.events import event_broker, format_sse
+from api.jobs import ALL_DEVICES, Job, JobConflictError, job_manager
+
 router = APIRouter(prefix="/api", tags=["emails"])
 
-# Paths to JSON data files
+# Directory holding the email store
 DATA_DIR = Path(__file__).parent.parent.parent / "data"
-PROCESSED_EMAILS_PATH = DATA_DIR / "processed_emails.json"
-EXTRACTED_EMAILS_PATH = DATA_DIR / "extracted_email_threads.json"
 
 
 # Pydantic Models
@@ -36,34 +42,33 @@ class EmailData(BaseModel):
     lastSync: str
 
 
+class EmailPage(BaseModel):
+    items: List[Dict[str, Any]]  # Email objects, only the requested fields when `fields` is set
+    next_cursor: Optional[str] = None  # Pass back as `cursor` for the next page; None on the last
+
+
+class EmailPages(BaseModel):
+    pages: Dict[str, EmailPage]  # One page per requested category
+    lastSync: str
+
+
 class TriggerEmailReaderRequest(BaseModel):
-    max_emails: int = None  # Optional limit
+    max_emails: int = None  # Optional limit (per device)
+    device: Optional[str] = None  # Device serial (defaults to every attached device)
+    extract_batch_size: int = 5  # Unread emails walked per extraction agent session
+    resume: bool = True  # Finish emails an interrupted scan left unfinished first
 
 
 class TriggerCategorizerRequest(BaseModel):
-    pass  # No parameters needed
+    bypass_cache: bool = False  # Ignore cached categorization results
 
 
 def load_json_data() -> dict:
-    """Load pre-categorized email data from JSON files."""
+    """Load pre-categorized email data from the email store."""
     try:
-        if PROCESSED_EMAILS_PATH.exists():
-            with open(PROCESSED_EMAILS_PATH, 'r') as f:
-                return json.load(f)
-        elif EXTRACTED_EMAILS_PATH.exists():
-            with open(EXTRACTED_EMAILS_PATH, 'r') as f:
-                return json.load(f)
-        else:
-            # Return empty structure for development
-            return {
-                "urgent": [],
-                "info": [],
-                "calendar": [],
-                "spam": [],
-                "decisions": []
-            }
+        return get_email_store(DATA_DIR).load_dashboard()
     except Exception as e:
-        print(f"Error loading JSON data: {e}")
+        print(f"Error loading email store: {e}")
         return {
             "urgent": [],
             "info": [],
@@ -73,6 +78,19 @@ def load_json_data() -> dict:
         }
 
 
+def to_api_email(email_data: dict, category: str, idx: int = 0) -> Email:
+    """Map a stored record to the frontend Email shape."""
+    return Email(
+        id=email_data.get("id", f"{category}_{idx}"),
+        sender=email_data.get("name", email_data.get("sender", "Unknown")),
+        subject=email_data.get("subject", "No Subject"),
+        preview=email_data.get("summary", email_data.get("purpose", email_data.get("preview", ""))),
+        timestamp=f"{email_data.get('date', 'TBD')} {email_data.get('time', '')}".strip(),
+        category=category,
+        read=email_data.get("read", False)
+    )
+
+
 def parse_emails(raw_data: dict) -> EmailData:
     """
     Parse pre-categorized email data from DroidRun output.
@@ -91,16 +109,7 @@ def parse_emails(raw_data: dict) -> EmailData:
         if category in raw_data:
             for idx, email_data in enumerate(raw_data[category]):
                 # Map backend fields to frontend fields
-                email = Email(
-                    id=email_data.get("id", f"{category}_{idx}"),
-                    sender=email_data.get("name", email_data.get("sender", "Unknown")),
-                    subject=email_data.get("subject", "No Subject"),
-                    preview=email_data.get("summary", email_data.get("purpose", email_data.get("preview", ""))),
-                    timestamp=f"{email_data.get('date', 'TBD')} {email_data.get('time', '')}".strip(),
-                    category=category,
-                    read=email_data.get("read", False)
-                )
-                categorized[category].append(email)
+                categorized[category].append(to_api_email(email_data, category, idx))
     
     return EmailData(
         urgent=categorized["urgent"],
@@ -112,101 +121,354 @@ def parse_emails(raw_data: dict) -> EmailData:
     )
 
 
-@router.get("/emails", response_model=EmailData)
-def get_emails():
-    """Get pre-categorized email data from DroidRun."""
+# Serialized /api/emails body, rebuilt only when the store version changes
+_snapshot = {"version": None, "etag": None, "body": b""}
+_snapshot_lock = threading.Lock()
+
+
+def get_dashboard_snapshot() -> dict:
+    """
+    Get the pre-serialized dashboard payload.
+    
+    Polling dashboards hit this every few seconds, so the JSON is built
+    once per store change and reused (with a content hash as its ETag).
+    """
+    store = get_email_store(DATA_DIR)
+    with _snapshot_lock:
+        if _snapshot["version"] != store.version or _snapshot["etag"] is None:
+            # Read the version first so a concurrent write triggers another rebuild
+            version = store.version
+            body = parse_emails(load_json_data()).model_dump_json().encode("utf-8")
+            _snapshot["version"] = version
+            _snapshot["body"] = body
+            _snapshot["etag"] = '"' + hashlib.sha1(body).hexdigest() + '"'
+        return dict(_snapshot)
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match header covers the ETag."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def encode_cursor(seq: int) -> str:
+    return base64.urlsafe_b64encode(f"seq:{seq}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        kind, _, value = base64.urlsafe_b64decode(padded).decode().partition(":")
+        if kind != "seq":
+            raise ValueError(cursor)
+        return int(value)
+    except Exception:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {cursor}")
+
+
+def query_email_pages(
+    category: Optional[str],
+    cursor: Optional[str],
+    limit: int,
+    sender: Optional[str],
+    since: Optional[str],
+    until: Optional[str],
+    q: Optional[str],
+    fields: Optional[str]
+) -> dict:
+    """One page per requested category, with filters and sparse fields applied."""
+    if category and category not in CATEGORIES:
+        raise HTTPException(status_code=400, detail=f"Unknown category: {category}")
+    if cursor and not category:
+        raise HTTPException(status_code=400, detail="cursor requires category (cursors are per category)")
+    
+    selected = None
+    if fields:
+        selected = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = set(selected) - set(Email.model_fields)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    
+    store = get_email_store(DATA_DIR)
+    after = decode_cursor(cursor) if cursor else None
+    pages = {}
+    for name in ([category] if category else CATEGORIES):
+        records, next_seq = store.query_emails(
+            name, limit=limit, after=after, sender=sender, since=since, until=until, text=q
+        )
+        items = [to_api_email(record, name).model_dump(include=set(selected) if selected else None) for record in records]
+        pages[name] = {
+            "items": items,
+            "next_cursor": encode_cursor(next_seq) if next_seq is not None else None
+        }
+    return {"pages": pages, "lastSync": datetime.now().isoformat()}
+
+
+@router.get("/emails", response_model=Union[EmailData, EmailPages])
+def get_emails(
+    request: Request,
+    category: Optional[str] = Query(None, description="Only this category"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page (requires category)"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Page size per category"),
+    sender: Optional[str] = Query(None, description="Exact sender name or address"),
+    since: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$", description="Earliest email date (YYYY-MM-DD)"),
+    until: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$", description="Latest email date (YYYY-MM-DD)"),
+    q: Optional[str] = Query(None, description="Words to search in subject, summary and sender"),
+    fields: Optional[str] = Query(None, description="Comma-separated Email fields to return")
+):
+    """
+    Get pre-categorized email data from DroidRun (304 if unchanged).
+    
+    Without query parameters this returns every bucket in full (EmailData).
+    Any of category, cursor, limit, sender, since, until, q or fields
+    selects the paged shape (EmailPages): {"pages": {category: {"items",
+    "next_cursor"}}, "lastSync"}, one page per category (default 50 items).
+    """
+    if any(value is not None for value in (category, cursor, limit, sender, since, until, q, fields)):
+        return JSONResponse(query_email_pages(
+            category, cursor, limit or 50, sender, since, until, q, fields
+        ))
+    
     try:
-        raw_data = load_json_data()
-        parsed_data = parse_emails(raw_data)
-        return parsed_data
+        snapshot = get_dashboard_snapshot()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    headers = {"ETag": snapshot["etag"], "Cache-Control": "no-cache"}
+    if _etag_matches(request, snapshot["etag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot["body"], media_type="application/json", headers=headers)
+
+
+_store_listener_lock = threading.Lock()
+_store_listener_registered = False
+
+
+def _publish_store_event(event: dict):
+    """Store listener: forward changes to stream subscribers in the frontend shape."""
+    if "email" in event:
+        event = dict(event, email=to_api_email(event["email"], event["category"]).model_dump())
+    event_broker.publish(event)
+
+
+def _ensure_store_listener():
+    global _store_listener_registered
+    with _store_listener_lock:
+        if not _store_listener_registered:
+            get_email_store(DATA_DIR).add_listener(_publish_store_event)
+            _store_listener_registered = True
+
+
+@router.get("/emails/stream")
+async def stream_email_changes(request: Request):
+    """
+    Server-Sent Events feed of dashboard changes.
+    
+    Events: connected, email_added, email_removed, email_moved,
+    emails_replaced, job_progress and resync (client fell behind and
+    should refetch /api/emails).
+    """
+    _ensure_store_listener()
+    queue = event_broker.subscribe()
+    store = get_email_store(DATA_DIR)
+    
+    async def events():
+        try:
+            yield format_sse({"type": "connected", "seq": 0, "version": store.version})
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    # Comment frame keeps proxies from closing an idle stream
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            event_broker.unsubscribe(queue)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @router.get("/stats")
 def get_stats():
     """Get email statistics."""
-    data = load_json_data()
-    parsed = parse_emails(data)
+    counts = get_email_store(DATA_DIR).counts()
     
     return {
-        "total_emails": sum([
-            len(parsed.urgent),
-            len(parsed.info),
-            len(parsed.calendar),
-            len(parsed.spam),
-            len(parsed.decisions)
-        ]),
+        "total_emails": sum(counts.values()),
         "by_category": {
-            "urgent": len(parsed.urgent),
-            "info": len(parsed.info),
-            "calendar": len(parsed.calendar),
-            "spam": len(parsed.spam),
-            "decisions": len(parsed.decisions)
+            "urgent": counts["urgent"],
+            "info": counts["info"],
+            "calendar": counts["calendar"],
+            "spam": counts["spam"],
+            "decisions": counts["decisions"]
         }
     }
 
 
-@router.post("/emails/scan")
+@router.post("/emails/scan", status_code=202)
 async def trigger_email_reader(request: TriggerEmailReaderRequest):
     """
     Trigger the email reader to scan Gmail inbox.
-    This endpoint starts the DroidRun email extraction process.
+    Starts the DroidRun email extraction as a background job and returns
+    its ID; poll /api/jobs/{id} for progress. Without a device, every
+    attached device scans its own mailbox concurrently in the same job.
+    Emails an interrupted scan of a device left unfinished are finished
+    first, from their last journaled stage. Refused (409) while a
+    recategorization is running.
     """
     # Set environment variable to allow module import
     os.environ["INBOXPILOT_WEBAPP_MODE"] = "1"
     
-    try:
-        # Import here to avoid circular dependencies and allow environment check
-        from src.modules import create_email_reader
+    # Import here to avoid circular dependencies and allow environment check
+    from src.modules import create_email_reader
+    from src.utils import get_device_pool
+    
+    async def run(job: Job):
+        if request.device:
+            serials = [request.device]
+        else:
+            pool = get_device_pool()
+            await pool.discover()
+            serials = pool.serials
+            if not serials:
+                states = ", ".join(f"{d.serial or 'default'} ({d.state})" for d in pool.devices.values())
+                raise LookupError(f"No usable devices to scan: {states or 'none attached'}")
         
-        reader = create_email_reader(data_dir="data")
+        processed = {serial: 0 for serial in serials}
+        total = request.max_emails * len(serials) if request.max_emails else None
         
-        # Run email processing (async)
-        import asyncio
-        stats = await reader.process_emails(max_emails=request.max_emails)
+        async def scan(serial: Optional[str]):
+            def on_progress(done: int, _total: Optional[int]):
+                processed[serial] = done
+                job.update(sum(processed.values()), total)
+            
+            reader = create_email_reader(data_dir="data", device_serial=serial)
+            return await reader.process_emails(
+                max_emails=request.max_emails,
+                extract_batch_size=request.extract_batch_size,
+                resume=request.resume,
+                on_progress=on_progress
+            )
         
+        results = await asyncio.gather(*(scan(serial) for serial in serials), return_exceptions=True)
+        if len(serials) == 1:
+            if isinstance(results[0], BaseException):
+                raise results[0]
+            return results[0]
+        if all(isinstance(result, BaseException) for result in results):
+            raise results[0]
         return {
-            "success": True,
-            "message": f"Email scan completed. Processed {stats['processed']} emails.",
-            "stats": stats
-        }
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return {
-            "success": False,
-            "message": f"Email scan failed: {str(e)}",
-            "stats": {"processed": 0, "errors": 1}
+            "processed": sum(processed.values()),
+            "devices": {
+                str(serial): {"error": str(result)} if isinstance(result, BaseException) else result
+                for serial, result in zip(serials, results)
+            }
         }
+    
+    try:
+        job = job_manager.submit("scan", run, device=request.device or ALL_DEVICES)
+    except JobConflictError as e:
+        raise HTTPException(status_code=409, detail={"message": str(e), "job_id": e.job.id})
+    
+    return {
+        "success": True,
+        "message": "Email scan started",
+        "job_id": job.id,
+        "job": job.as_dict()
+    }
+
+
+@router.get("/emails/scan/sessions")
+def get_scan_sessions(limit: int = Query(20, ge=1, le=200)):
+    """Get recent scan sessions with their emails counted by stage, and how many wait to be resumed."""
+    journal = get_scan_journal(DATA_DIR)
+    return {
+        "sessions": journal.sessions(limit=limit),
+        "unfinished": journal.unfinished_count()
+    }
 
 
-@router.post("/emails/recategorize")
+@router.post("/emails/recategorize", status_code=202)
 async def trigger_email_categorizer(request: TriggerCategorizerRequest):
     """
     Trigger email recategorization.
-    Reprocesses emails in extracted_email_threads.json without running DroidRun.
+    Reprocesses the stored raw emails without running DroidRun, as a
+    background job; poll /api/jobs/{id} for progress. Refused (409) while
+    a scan is running.
     """
     # Set environment variable to allow module import
     os.environ["INBOXPILOT_WEBAPP_MODE"] = "1"
     
-    try:
-        # Import here to avoid circular dependencies
-        from src.modules import create_email_categorizer
-        
+    # Import here to avoid circular dependencies
+    from src.modules import create_email_categorizer
+    
+    async def run(job: Job):
         categorizer = create_email_categorizer(data_dir="data")
-        stats = categorizer.reprocess_emails()
-        
-        return {
-            "success": True,
-            "message": f"Recategorization completed. Processed {stats['total']} emails.",
-            "stats": stats
-        }
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return {
-            "success": False,
-            "message": f"Recategorization failed: {str(e)}",
-            "stats": {"total": 0, "errors": 1}
-        }
+        return await categorizer.reprocess_emails(bypass_cache=request.bypass_cache, on_progress=job.update)
+    
+    try:
+        job = job_manager.submit("recategorize", run)
+    except JobConflictError as e:
+        raise HTTPException(status_code=409, detail={"message": str(e), "job_id": e.job.id})
+    
+    return {
+        "success": True,
+        "message": "Recategorization started",
+        "job_id": job.id,
+        "job": job.as_dict()
+    }
+
+
+@router.get("/emails/cache")
+def get_categorization_cache_stats():
+    """Get categorization cache hit/miss counters."""
+    from src.categorization import get_categorization_cache
+    
+    return get_categorization_cache(DATA_DIR).get_stats()
+
+
+@router.get("/emails/rules")
+def get_rules_classifier_stats():
+    """Get the rules pre-classifier's hit rate and agreement with Gemini per confidence band."""
+    from src.categorization import get_rules_classifier
+    
+    return get_rules_classifier(DATA_DIR).get_stats()
+
+
+@router.get("/emails/local-model")
+def get_local_model_stats():
+    """Get the local model's accuracy report against Gemini's labels and its live usage."""
+    from src.categorization import get_local_model
+    
+    model = get_local_model(DATA_DIR)
+    if model is None:
+        raise HTTPException(status_code=404, detail="No local model trained yet")
+    return model.get_stats()
+
+
+@router.post("/emails/local-model/retrain")
+async def retrain_local_model():
+    """Retrain the local model on the current categorized emails and return its report."""
+    from src.categorization import train_local_model
+    
+    try:
+        model = await asyncio.to_thread(train_local_model, DATA_DIR)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return model.report
+
+
+@router.get("/emails/sender-memo")
+def get_sender_memo_stats():
+    """Get the sender memo's size, hit rate and agreement with Gemini on shadowed hits."""
+    from src.categorization import get_sender_memo
+    
+    return get_sender_memo(DATA_DIR).get_stats()
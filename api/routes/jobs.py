@@ -0,0 +1,33 @@
+"""Background job API endpoints"""
+
+from fastapi import APIRouter, HTTPException
+
+from api.jobs import job_manager
+
+router = APIRouter(prefix="/api", tags=["jobs"])
+
+
+@router.get("/jobs")
+def list_jobs():
+    """List recent background jobs, newest first."""
+    return {"jobs": [job.as_dict() for job in job_manager.list()]}
+
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Get progress, counts and ETA for a background job."""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job.as_dict()
+
+
+@router.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    """Cancel a queued or running background job."""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    if not job_manager.cancel(job_id):
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is already {job.status}")
+    return {"success": True, "message": f"Cancelling job {job_id}"}
@@ -5,55 +5,65 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Optional
 
+from api.jobs import ALL_DEVICES, Job, JobConflictError, job_manager
+
 router = APIRouter(prefix="/api", tags=["scheduler"])
 
 
 # Pydantic Models
 class ScheduleEventsRequest(BaseModel):
     json_path: Optional[str] = None  # Optional path to JSON file
-    delay: float = 1.5  # Delay between events in seconds
+    delay: float = 1.5  # Max wait for a device UI to settle between events, in seconds
+    device: Optional[str] = None  # Only this device's events (defaults to every device)
+    batch_size: int = 5  # Max events created per agent run (1 = one run per event)
 
 
-@router.post("/scheduler/run")
+@router.post("/scheduler/run", status_code=202)
 async def run_calendar_scheduler(request: ScheduleEventsRequest):
     """
     Trigger the calendar scheduler to create events from calendar emails.
-    This endpoint starts the DroidRun calendar event creation process.
+    Starts the DroidRun calendar event creation as a background job and
+    returns its ID; poll /api/jobs/{id} for progress.
     """
     # Set environment variable to allow module import
     os.environ["INBOXPILOT_WEBAPP_MODE"] = "1"
     
-    try:
-        # Import here to avoid circular dependencies and allow environment check
-        from src.modules import create_calendar_scheduler
-        
+    # Import here to avoid circular dependencies and allow environment check
+    from src.modules import create_calendar_scheduler
+    
+    async def run(job: Job):
         scheduler = create_calendar_scheduler(data_dir="data")
-        
-        # Run calendar scheduling (async)
-        stats = await scheduler.run(
+        return await scheduler.run(
             json_path=request.json_path,
-            delay=request.delay
+            delay=request.delay,
+            on_progress=job.update,
+            device=request.device,
+            batch_size=request.batch_size
         )
-        
-        return {
-            "success": True,
-            "message": f"Calendar scheduling completed. Processed {stats['total']} events.",
-            "stats": stats
-        }
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return {
-            "success": False,
-            "message": f"Calendar scheduling failed: {str(e)}",
-            "stats": {"total": 0, "succeeded": 0, "failed": 1}
-        }
+    
+    try:
+        job = job_manager.submit("schedule", run, device=request.device or ALL_DEVICES)
+    except JobConflictError as e:
+        raise HTTPException(status_code=409, detail={"message": str(e), "job_id": e.job.id})
+    
+    return {
+        "success": True,
+        "message": "Calendar scheduling started",
+        "job_id": job.id,
+        "job": job.as_dict()
+    }
 
 
 @router.get("/scheduler/status")
 def get_scheduler_status():
     """Get current scheduler status."""
-    # In a production system, this would check if scheduler is currently running
+    active = job_manager.find_active("schedule", ALL_DEVICES)
+    if active:
+        return {
+            "status": "running",
+            "message": f"Scheduling calendar events ({active.done}/{active.total or '?'})",
+            "job_id": active.id
+        }
     return {
         "status": "idle",
         "message": "Scheduler is ready to process calendar events"
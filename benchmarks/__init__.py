@@ -0,0 +1,9 @@
+"""
+Offline benchmarks for InboxPilot
+
+Drives the email reader, the categorizer, the calendar scheduler and the
+dashboard API against a simulated device and a stub Gemini model, so
+throughput can be tracked without a phone or an API key:
+
+    python -m benchmarks --scenario all --sizes 10,1000
+"""
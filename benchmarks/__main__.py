@@ -0,0 +1,135 @@
+"""
+Benchmark runner
+Runs each (scenario, size) in its own process, so peak RSS is per run,
+and appends the results to a JSON-lines file for tracking over time
+"""
+
+import argparse
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_OUTPUT = PROJECT_ROOT / "bench_output.txt"
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run_child(args) -> Dict:
+    """Run one scenario in this process and summarize it."""
+    os.environ["INBOXPILOT_WEBAPP_MODE"] = "1"
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+    os.environ["INBOXPILOT_DEVICES"] = ",".join(args.serials)
+    sys.path.insert(0, str(PROJECT_ROOT))
+    if not args.verbose:
+        # Per-email INFO logs would dominate the measurement
+        logging.disable(logging.WARNING)
+
+    from benchmarks.scenarios import run_scenario
+
+    options = {
+        "seed": args.seed,
+        "serials": args.serials,
+        "step_latency": args.step_latency,
+        "llm_latency": args.llm_latency,
+        "calendar_batch_size": args.calendar_batch_size,
+        "extract_batch_size": args.extract_batch_size,
+    }
+    with tempfile.TemporaryDirectory(prefix="inboxpilot-bench-") as data_dir:
+        result = run_scenario(args.scenario, Path(data_dir), args.size, options)
+
+    latencies = result.pop("latencies")
+    seconds = result["seconds"]
+    return {
+        "scenario": args.scenario,
+        "size": args.size,
+        **result,
+        "seconds": round(seconds, 4),
+        "emails_per_second": round(result["emails"] / seconds, 2) if seconds else None,
+        "latency_p50": round(_percentile(latencies, 50), 6) if latencies else None,
+        "latency_p99": round(_percentile(latencies, 99), 6) if latencies else None,
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    from benchmarks.scenarios import SCENARIOS
+
+    parser = argparse.ArgumentParser(description="Offline InboxPilot benchmarks")
+    parser.add_argument("--scenario", default="all", help=f"all or one of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--sizes", default="10,1000", help="Comma-separated inbox sizes (10 to 100000)")
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--devices", type=int, default=1, help="Simulated devices")
+    parser.add_argument("--step-latency", type=float, default=0.0, help="Seconds per simulated agent step")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds per stub Gemini request")
+    parser.add_argument("--calendar-batch-size", type=int, default=5)
+    parser.add_argument("--extract-batch-size", type=int, default=5, help="Emails per extraction agent run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT), help="JSON-lines file results are appended to")
+    parser.add_argument("--verbose", action="store_true", help="Keep InboxPilot's logging")
+    args = parser.parse_args(argv)
+    args.serials = [f"bench-{i}" for i in range(1, args.devices + 1)]
+
+    if args.child:
+        print(json.dumps(run_child(args)))
+        return
+
+    scenarios = list(SCENARIOS) if args.scenario == "all" else args.scenario.split(",")
+    sizes = [int(size) for size in args.sizes.split(",")]
+    run = {"timestamp": time.time(), "revision": _git_revision(), "step_latency": args.step_latency,
+           "llm_latency": args.llm_latency, "devices": args.devices}
+
+    results = []
+    for scenario in scenarios:
+        for size in sizes:
+            command = [
+                sys.executable, "-m", "benchmarks", "--child", "--scenario", scenario, "--size", str(size),
+                "--devices", str(args.devices), "--step-latency", str(args.step_latency),
+                "--llm-latency", str(args.llm_latency), "--calendar-batch-size", str(args.calendar_batch_size),
+                "--extract-batch-size", str(args.extract_batch_size),
+                "--seed", str(args.seed),
+            ] + (["--verbose"] if args.verbose else [])
+            completed = subprocess.run(command, cwd=PROJECT_ROOT, capture_output=True, text=True)
+            if completed.returncode != 0:
+                print(f"✗ {scenario} x{size} failed:\n{completed.stderr[-2000:]}", file=sys.stderr)
+                continue
+            result = {**run, **json.loads(completed.stdout.strip().splitlines()[-1])}
+            results.append(result)
+            print(
+                f"✓ {scenario:<10} {size:>7} emails  {result['emails_per_second'] or 0:>10.1f} emails/s  "
+                f"p50 {result['latency_p50'] or 0:.4f}s  p99 {result['latency_p99'] or 0:.4f}s "
+                f"per {result['latency_unit']}  peak RSS {result['peak_rss_mb']} MB"
+            )
+
+    if results and args.output:
+        with open(args.output, "a") as f:
+            for result in results:
+                f.write(json.dumps(result) + "\n")
+        print(f"💾 Appended {len(results)} result(s) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Fakes
+Simulated DroidAgent, ADB client and Gemini model for offline benchmarks
+"""
+
+import asyncio
+import json
+import re
+import time
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+from src.models import CalendarBatchResult, CalendarEventItem, EmailInfo, EmailList, InboxActionItem, InboxActionResult
+from .inbox import categorized_entry
+
+BATCH_SUBJECT_PATTERN = re.compile(r'^\s+\d+\. "(.*)"$', re.MULTILINE)
+EXTRACT_COUNT_PATTERN = re.compile(r"extracting up to (\d+) emails")
+BATCH_EVENT_PATTERN = re.compile(r'Title: "(.*)"\n\s+Date & Time: (.*) at (.*)')
+EMAILS_JSON_MARKER = '{"emails": '
+
+
+class Recorder:
+    """Latencies of simulated agent runs and model calls, per kind."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.extracted_at: Dict[str, float] = {}
+
+    def record(self, kind: str, seconds: float):
+        self.latencies.setdefault(kind, []).append(seconds)
+
+
+class FakeInbox:
+    """Unread emails a simulated device hands out, one extraction run at a time."""
+
+    def __init__(self, emails: List[Dict]):
+        self.emails = emails
+        self.cursor = 0
+        self.labels = {email["Subject"]: email["_bucket"] for email in emails}
+
+    def take(self, count: int) -> List[Dict]:
+        batch = self.emails[self.cursor:self.cursor + count]
+        self.cursor += len(batch)
+        return batch
+
+
+class FakeDroidAgent:
+    """
+    Stand-in for droidrun.DroidAgent with the same constructor and run().
+
+    The kind of run is inferred from the output model (extraction, batch
+    inbox action, batch calendar) or the goal text. Each simulated step
+    sleeps `step_latency`; structured outputs echo what the goal asked for,
+    so every action and event succeeds.
+    """
+
+    inbox: Optional[FakeInbox] = None
+    recorder: Optional[Recorder] = None
+    step_latency = 0.0
+    emails_per_run = 1
+
+    def __init__(self, goal: str, config=None, llms=None, output_model=None, **kwargs):
+        self.goal = goal
+        self.output_model = output_model
+
+    async def _steps(self, count: int):
+        if self.step_latency:
+            await asyncio.sleep(self.step_latency * count)
+        return count
+
+    async def run(self):
+        started = time.perf_counter()
+        structured = None
+        if self.output_model is EmailList:
+            kind = "extract"
+            requested = EXTRACT_COUNT_PATTERN.search(self.goal)
+            count = int(requested.group(1)) if requested else self.emails_per_run
+            emails = self.inbox.take(count) if self.inbox else []
+            # App launch and search once per run, then open/read/back per email
+            steps = await self._steps(3 + 3 * max(1, len(emails)))
+            now = time.perf_counter()
+            for email in emails:
+                self.recorder.extracted_at[email["Subject"]] = now
+            structured = EmailList(emails=[
+                EmailInfo(**{k: v for k, v in email.items() if not k.startswith("_")}) for email in emails
+            ])
+        elif self.output_model is InboxActionResult:
+            kind = "batch_action"
+            subjects = BATCH_SUBJECT_PATTERN.findall(self.goal)
+            steps = await self._steps(3 + 2 * len(subjects))
+            structured = InboxActionResult(results=[
+                InboxActionItem(Index=i, Subject=s, Done=True) for i, s in enumerate(subjects, 1)
+            ])
+        elif self.output_model is CalendarBatchResult:
+            kind = "calendar_batch"
+            events = BATCH_EVENT_PATTERN.findall(self.goal)
+            steps = await self._steps(2 + 8 * len(events))
+            structured = CalendarBatchResult(results=[
+                CalendarEventItem(Subject=title, Date=date, Time=time_, Created=True)
+                for title, date, time_ in events
+            ])
+        elif "calendar" in self.goal.lower():
+            kind = "calendar"
+            steps = await self._steps(10)
+        else:
+            kind = "action"
+            steps = await self._steps(4)
+        if self.recorder is not None:
+            self.recorder.record(kind, time.perf_counter() - started)
+        return SimpleNamespace(success=True, reason="", steps=steps, structured_output=structured)
+
+
+class FakeDeviceHandle:
+    async def shell(self, command: str, timeout: float = None) -> str:
+        return "mCurrentFocus=Window{bench}"
+
+    async def app_stop(self, package: str):
+        return None
+
+
+class FakeAdb:
+    """Stand-in for async_adbutils.adb: every device is attached and idle."""
+
+    def __init__(self, serials: List[str]):
+        self.serials = serials
+
+    async def list(self):
+        return [SimpleNamespace(serial=serial, state="device") for serial in self.serials]
+
+    async def device(self, serial: Optional[str] = None):
+        return FakeDeviceHandle()
+
+
+class StubGenerativeModel:
+    """
+    Stand-in for genai.GenerativeModel that answers in the five-bucket JSON
+    format, using the synthetic inbox's known labels.
+
+    Emails are read back from the prompt (every categorization prompt embeds
+    the {"emails": [...]} payload), and batch ids are echoed.
+    """
+
+    inbox: Optional[FakeInbox] = None
+    recorder: Optional[Recorder] = None
+    latency = 0.0
+
+    def __init__(self, model_name: str = "stub", generation_config=None, **kwargs):
+        self.model_name = model_name
+
+    @staticmethod
+    def _emails(prompt: str) -> List[Dict]:
+        start = prompt.find(EMAILS_JSON_MARKER)
+        if start < 0:
+            return []
+        payload, _ = json.JSONDecoder().raw_decode(prompt, start)
+        return payload.get("emails", [])
+
+    async def generate_content_async(self, prompt: str):
+        started = time.perf_counter()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        result = {bucket: [] for bucket in (
+            "urgent_emails", "decision_emails", "calendar_emails", "information_emails", "spam_emails"
+        )}
+        labels = self.inbox.labels if self.inbox else {}
+        for email in self._emails(prompt):
+            bucket = labels.get(email.get("Subject"), "information_emails")
+            entry = categorized_entry(email, bucket)
+            if "id" in email:
+                entry["id"] = email["id"]
+            result[bucket].append(entry)
+        text = json.dumps(result)
+        if self.recorder is not None:
+            self.recorder.record("llm", time.perf_counter() - started)
+        usage = SimpleNamespace(
+            prompt_token_count=len(prompt) // 4,
+            candidates_token_count=len(text) // 4,
+            total_token_count=(len(prompt) + len(text)) // 4
+        )
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+
+def install_fakes(
+    inbox: FakeInbox,
+    recorder: Recorder,
+    serials: List[str],
+    step_latency: float = 0.0,
+    llm_latency: float = 0.0,
+    emails_per_run: int = 1
+):
+    """
+    Point InboxPilot's device and Gemini layers at the fakes.
+
+    Patches the device pool (DroidAgent, config and ADB), genai's model
+    class and the shared categorization service's quotas, which would
+    otherwise dominate any offline measurement.
+    """
+    import google.generativeai as genai
+    import src.utils.device_pool as device_pool
+    from src.categorization import get_categorization_service
+
+    FakeDroidAgent.inbox = inbox
+    FakeDroidAgent.recorder = recorder
+    FakeDroidAgent.step_latency = step_latency
+    FakeDroidAgent.emails_per_run = emails_per_run
+    StubGenerativeModel.inbox = inbox
+    StubGenerativeModel.recorder = recorder
+    StubGenerativeModel.latency = llm_latency
+
+    device_pool.DroidAgent = FakeDroidAgent
+    device_pool.adb = FakeAdb(serials)
+    device_pool.get_llm = lambda: None
+    device_pool.get_droidrun_config = lambda max_steps=20, config_path=None: SimpleNamespace(
+        device=SimpleNamespace(serial=None)
+    )
+    genai.GenerativeModel = StubGenerativeModel
+
+    service = get_categorization_service()
+    service.requests_per_minute = 10 ** 9
+    service.tokens_per_minute = 10 ** 12
+    service.max_concurrency = 16
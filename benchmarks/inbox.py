@@ -0,0 +1,109 @@
+"""
+Synthetic Inbox
+Deterministic raw emails with a known category, from 10 to 100k messages
+"""
+
+import random
+from datetime import date, timedelta
+from typing import Dict, Iterator, List
+
+# Share of each Gemini bucket in a generated inbox
+BUCKET_MIX = {
+    "urgent_emails": 0.08,
+    "decision_emails": 0.1,
+    "calendar_emails": 0.12,
+    "information_emails": 0.35,
+    "spam_emails": 0.35,
+}
+
+FILLER = (
+    "project update team review notes quarter plan status details schedule client budget "
+    "report draft feedback numbers launch timeline followup summary agenda thanks regards"
+).split()
+
+TEMPLATES = {
+    "urgent_emails": (
+        ("oncall", "ops.example.com"),
+        "URGENT: production outage #{n}",
+        "The payment service is down and customers are affected. We need a fix immediately.",
+    ),
+    "decision_emails": (
+        ("manager", "corp.example.com"),
+        "Approval needed: vendor contract {n}",
+        "Please approve option A or option B for the vendor contract. Let me know if you agree.",
+    ),
+    "calendar_emails": (
+        ("assistant", "corp.example.com"),
+        "Meeting invitation: planning session {n}",
+        "Let's meet on {date} at 15:00 in room 4 to go through the roadmap.",
+    ),
+    "information_emails": (
+        ("newsletter", "news.example.org"),
+        "Weekly digest #{n}",
+        "Here is this week's newsletter with the latest articles. Unsubscribe at any time.",
+    ),
+    "spam_emails": (
+        ("deals", "promo.example.biz"),
+        "{n}% off everything - limited time offer!!",
+        "Exclusive deal just for you. Buy now and use promo code SAVE{n}. Unsubscribe here.",
+    ),
+}
+
+
+def synthetic_inbox(size: int, seed: int = 0, senders_per_bucket: int = 20) -> List[Dict]:
+    """
+    Generate raw emails (EmailInfo fields) with unique subjects.
+
+    Each email carries its intended bucket under "_bucket" (stripped before
+    it reaches InboxPilot by the fakes). Senders repeat, as in a real inbox.
+
+    Args:
+        size: Number of emails
+        seed: Random seed; the same seed gives the same inbox
+        senders_per_bucket: Distinct sender addresses per bucket
+
+    Returns:
+        List of raw email dicts
+    """
+    rng = random.Random(seed)
+    buckets = list(BUCKET_MIX)
+    weights = [BUCKET_MIX[bucket] for bucket in buckets]
+    start = date(2026, 1, 5)
+    emails = []
+    for n in range(size):
+        bucket = rng.choices(buckets, weights)[0]
+        (local, domain), subject, body = TEMPLATES[bucket]
+        sender = rng.randrange(senders_per_bucket)
+        when = start + timedelta(days=n % 90)
+        filler = " ".join(rng.choices(FILLER, k=rng.randint(20, 120)))
+        emails.append({
+            "Name": f"{local.capitalize()} {sender}",
+            "Email": f"{local}{sender}@{domain}",
+            "Time": when.isoformat(),
+            "Subject": subject.format(n=n, date=when.isoformat()),
+            "Text": f"{body.format(n=n, date=when.isoformat())} {filler}",
+            "IsThread": False,
+            "ThreadCount": 1,
+            "_bucket": bucket,
+        })
+    return emails
+
+
+def categorized_entry(email: Dict, bucket: str) -> Dict:
+    """Gemini-shaped output entry for an email (what the stub model answers)."""
+    entry = {
+        "name": email.get("Name", "Unknown"),
+        "email": email.get("Email", ""),
+        "subject": email.get("Subject", ""),
+        "date": email.get("Time", "TBD"),
+        "time": "15:00" if bucket == "calendar_emails" else "TBD",
+        "summary": (email.get("Text") or "")[:120],
+    }
+    if bucket == "calendar_emails":
+        entry["purpose"] = entry["summary"]
+    return entry
+
+
+def chunked(items: List, size: int) -> Iterator[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
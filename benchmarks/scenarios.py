@@ -0,0 +1,195 @@
+"""
+Benchmark Scenarios
+Each scenario drives one InboxPilot entry point against the fakes and
+returns the units it processed and their latencies
+"""
+
+import asyncio
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from src.storage import build_dashboard_records, get_email_store
+from .fakes import FakeInbox, Recorder, install_fakes
+from .inbox import categorized_entry, chunked, synthetic_inbox
+
+
+def _strip(email: Dict) -> Dict:
+    return {k: v for k, v in email.items() if not k.startswith("_")}
+
+
+def _seed_store(data_dir: Path, emails: List[Dict], categorized: bool = True):
+    """Fill the store with raw emails and (optionally) their categorized records, in bulk."""
+    store = get_email_store(data_dir)
+    raw_ids = []
+    for chunk in chunked([_strip(email) for email in emails], 5000):
+        raw_ids.extend(store.add_raw_emails(chunk))
+    if categorized:
+        entries = []
+        # The synthetic labels stand in for Gemini's
+        origins = {raw_id: "gemini" for raw_id in raw_ids}
+        for raw_id, email in zip(raw_ids, emails):
+            bucket = email["_bucket"]
+            for record in build_dashboard_records({bucket: [categorized_entry(email, bucket)]}, source=email):
+                entries.append((record, raw_id))
+        store.replace_emails(entries, origins=origins)
+    return store
+
+
+async def bench_reader(data_dir: Path, size: int, options: Dict) -> Dict:
+    """EmailReader.process_emails over a synthetic inbox: extract, categorize, save, archive."""
+    from src.modules import create_email_reader
+
+    emails = synthetic_inbox(size, seed=options["seed"])
+    inbox, recorder = FakeInbox(emails), Recorder()
+    install_fakes(inbox, recorder, options["serials"], options["step_latency"], options["llm_latency"])
+
+    reader = create_email_reader(data_dir=str(data_dir))
+    latencies = []
+    action_stage = reader._action_stage
+
+    async def timed_action_stage(item: Dict):
+        # End-to-end latency of one email: extracted -> categorized -> saved -> archived
+        await action_stage(item)
+        extracted = recorder.extracted_at.get(item["email"].Subject)
+        if extracted is not None:
+            latencies.append(time.perf_counter() - extracted)
+
+    reader._action_stage = timed_action_stage
+    started = time.perf_counter()
+    stats = await reader.process_emails(
+        max_emails=size, batch_actions=True, extract_batch_size=options["extract_batch_size"]
+    )
+    elapsed = time.perf_counter() - started
+    return {
+        "emails": stats["processed"],
+        "seconds": elapsed,
+        "latency_unit": "email",
+        "latencies": latencies,
+        "agent_runs": sum(len(v) for k, v in recorder.latencies.items() if k != "llm"),
+        "extract_runs": stats["extraction"]["sessions"],
+        "llm_requests": len(recorder.latencies.get("llm", [])),
+    }
+
+
+async def bench_reprocess(data_dir: Path, size: int, options: Dict) -> Dict:
+    """EmailCategorizer.reprocess_emails over raw emails already in the store."""
+    from src.modules import create_email_categorizer
+
+    emails = synthetic_inbox(size, seed=options["seed"])
+    inbox, recorder = FakeInbox(emails), Recorder()
+    install_fakes(inbox, recorder, options["serials"], options["step_latency"], options["llm_latency"])
+    _seed_store(data_dir, emails, categorized=False)
+
+    categorizer = create_email_categorizer(data_dir=str(data_dir))
+    started = time.perf_counter()
+    stats = await categorizer.reprocess_emails(bypass_cache=True)
+    elapsed = time.perf_counter() - started
+    return {
+        "emails": stats["total"],
+        "seconds": elapsed,
+        "latency_unit": "llm_request",
+        "latencies": recorder.latencies.get("llm", []),
+        "llm_requests": len(recorder.latencies.get("llm", [])),
+    }
+
+
+async def bench_calendar(data_dir: Path, size: int, options: Dict) -> Dict:
+    """CalendarScheduler.run over calendar records in the store (size = number of events)."""
+    from src.modules import create_calendar_scheduler
+
+    emails = [dict(email, _bucket="calendar_emails") for email in synthetic_inbox(size, seed=options["seed"])]
+    inbox, recorder = FakeInbox(emails), Recorder()
+    install_fakes(inbox, recorder, options["serials"], options["step_latency"], options["llm_latency"])
+    _seed_store(data_dir, emails)
+
+    scheduler = create_calendar_scheduler(data_dir=str(data_dir))
+    started = time.perf_counter()
+    stats = await scheduler.run(delay=0.0, batch_size=options["calendar_batch_size"])
+    elapsed = time.perf_counter() - started
+    return {
+        "emails": stats["succeeded"],
+        "seconds": elapsed,
+        "latency_unit": "agent_run",
+        "latencies": [s for kind, runs in recorder.latencies.items() if kind != "llm" for s in runs],
+        "agent_runs": stats.get("agent_runs"),
+    }
+
+
+def bench_api(data_dir: Path, size: int, options: Dict) -> Dict:
+    """
+    Dashboard API routes over a store of `size` categorized emails: a full
+    snapshot, a 304 revalidation, paging through every category, stats,
+    searches and queued actions.
+    """
+    import os
+
+    os.environ["INBOXPILOT_ACTION_WORKER"] = "0"
+    from fastapi.testclient import TestClient
+    import api.routes.actions as actions_routes
+    import api.routes.emails as emails_routes
+    from api.main import app
+    from src.storage import CATEGORIES
+
+    emails = synthetic_inbox(size, seed=options["seed"])
+    inbox, recorder = FakeInbox(emails), Recorder()
+    install_fakes(inbox, recorder, options["serials"], options["step_latency"], options["llm_latency"])
+    _seed_store(data_dir, emails)
+    emails_routes.DATA_DIR = actions_routes.DATA_DIR = data_dir
+
+    latencies = []
+    served = 0
+
+    def timed(call: Callable):
+        began = time.perf_counter()
+        response = call()
+        latencies.append(time.perf_counter() - began)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{response.request.url} -> {response.status_code}: {response.text[:200]}")
+        return response
+
+    started = time.perf_counter()
+    with TestClient(app) as client:
+        full = timed(lambda: client.get("/api/emails"))
+        served += sum(len(full.json().get(category, [])) for category in CATEGORIES)
+        timed(lambda: client.get("/api/emails", headers={"If-None-Match": full.headers["ETag"]}))
+        for category in CATEGORIES:
+            cursor = None
+            while True:
+                params = {"category": category, "limit": 500}
+                if cursor:
+                    params["cursor"] = cursor
+                page = timed(lambda: client.get("/api/emails", params=params)).json()["pages"][category]
+                served += len(page["items"])
+                cursor = page["next_cursor"]
+                if not cursor:
+                    break
+        timed(lambda: client.get("/api/stats"))
+        for word in ("outage", "contract", "planning", "digest", "offer") * 10:
+            timed(lambda: client.get("/api/emails", params={"q": word, "limit": 20}))
+        for email_id in [f"info_{i}" for i in range(min(size, 50))]:
+            timed(lambda: client.post("/api/actions", json={"emailId": email_id, "action": "archive"}))
+    elapsed = time.perf_counter() - started
+    return {
+        "emails": served,
+        "seconds": elapsed,
+        "latency_unit": "request",
+        "latencies": latencies,
+        "requests": len(latencies),
+    }
+
+
+SCENARIOS = {
+    "reader": bench_reader,
+    "reprocess": bench_reprocess,
+    "calendar": bench_calendar,
+    "api": bench_api,
+}
+
+
+def run_scenario(name: str, data_dir: Path, size: int, options: Dict) -> Dict:
+    """Run one scenario (async or not) to completion."""
+    scenario = SCENARIOS[name]
+    if asyncio.iscoroutinefunction(scenario):
+        return asyncio.run(scenario(data_dir, size, options))
+    return scenario(data_dir, size, options)
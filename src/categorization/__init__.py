@@ -0,0 +1,34 @@
+"""Email categorization helpers for InboxPilot"""
+
+from .batching import BatchCategorizer, CategorizationError, empty_buckets, estimate_tokens
+from .compaction import DEFAULT_EMAIL_TOKEN_BUDGET, compact_payload, compact_text
+from .cache import CategorizationCache, cache_key, get_categorization_cache
+from .local_model import LocalCategorizer, get_local_model, train_local_model
+from .rules import RulesClassifier, get_rules_classifier, local_buckets, primary_bucket
+from .sender_memo import SenderMemo, get_sender_memo
+from .service import CategorizationService, TokenBucket, get_categorization_service
+
+__all__ = [
+    'DEFAULT_EMAIL_TOKEN_BUDGET',
+    'BatchCategorizer',
+    'CategorizationCache',
+    'CategorizationError',
+    'CategorizationService',
+    'LocalCategorizer',
+    'RulesClassifier',
+    'SenderMemo',
+    'TokenBucket',
+    'cache_key',
+    'compact_payload',
+    'compact_text',
+    'empty_buckets',
+    'estimate_tokens',
+    'get_categorization_cache',
+    'get_categorization_service',
+    'get_local_model',
+    'get_rules_classifier',
+    'get_sender_memo',
+    'local_buckets',
+    'primary_bucket',
+    'train_local_model',
+]
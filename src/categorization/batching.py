@@ -0,0 +1,198 @@
+"""
+Batched Categorization
+Packs several emails into one Gemini request and maps results back by id
+"""
+
+import asyncio
+import json
+import math
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from src.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+# Gemini output buckets, in waterfall order
+BUCKETS = (
+    "urgent_emails",
+    "decision_emails",
+    "calendar_emails",
+    "information_emails",
+    "spam_emails",
+)
+
+
+class CategorizationError(Exception):
+    """The Gemini request itself failed (quota, 5xx, network) after its retries."""
+
+
+def empty_buckets() -> Dict[str, List]:
+    """Categorization result with all 5 buckets empty."""
+    return {bucket: [] for bucket in BUCKETS}
+
+
+def is_valid_result(categorized) -> bool:
+    """Whether a parsed model response is a dict whose buckets are lists of dicts."""
+    if not isinstance(categorized, dict):
+        return False
+    for bucket in BUCKETS:
+        entries = categorized.get(bucket) or []
+        if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+            return False
+    return True
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English text)."""
+    return math.ceil(len(text) / 4)
+
+
+def pack_batches(
+    items: List[Tuple[str, Dict]],
+    token_budget: int,
+    max_batch_size: int
+) -> List[List[Tuple[str, Dict]]]:
+    """
+    Greedily pack (id, email) items into batches under a token budget.
+
+    An email larger than the budget on its own still gets a batch of one.
+    """
+    batches: List[List[Tuple[str, Dict]]] = []
+    current: List[Tuple[str, Dict]] = []
+    current_tokens = 0
+
+    for item in items:
+        tokens = estimate_tokens(json.dumps(item[1], ensure_ascii=False))
+        if current and (current_tokens + tokens > token_budget or len(current) >= max_batch_size):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(item)
+        current_tokens += tokens
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+def reconcile(categorized: Dict, ids: List[str]) -> Optional[Dict[str, Dict]]:
+    """
+    Split a batched result into one single-email result per id.
+
+    Returns:
+        id -> bucket dict, or None if any id is missing, duplicated or unknown,
+        or the result isn't shaped like buckets of emails
+    """
+    if not is_valid_result(categorized):
+        return None
+    per_id: Dict[str, Dict] = {}
+    expected = set(ids)
+
+    for bucket in BUCKETS:
+        for entry in categorized.get(bucket, []) or []:
+            email_id = str(entry.get("id", ""))
+            if email_id not in expected or email_id in per_id:
+                return None
+            result = empty_buckets()
+            result[bucket].append({k: v for k, v in entry.items() if k != "id"})
+            per_id[email_id] = result
+
+    if len(per_id) != len(expected):
+        return None
+    return per_id
+
+
+class BatchCategorizer:
+    """
+    Categorizes many emails with as few Gemini requests as possible.
+
+    Each email is tagged with a stable id; when the model's output for a batch
+    can't be mapped back one-to-one, the batch is bisected and retried.
+    A batch whose request fails outright (CategorizationError) is not
+    bisected: its emails come back with empty buckets, so an outage costs
+    one request per batch instead of one per email.
+    Batches are submitted concurrently; the categorize_fn is expected to
+    enforce its own concurrency and rate limits.
+    """
+
+    def __init__(
+        self,
+        categorize_fn: Callable[[Dict], Awaitable[Dict]],
+        token_budget: int = 8000,
+        max_batch_size: int = 25
+    ):
+        """
+        Args:
+            categorize_fn: Sends {"emails": [...]} to Gemini with the batch prompt;
+                raises CategorizationError when the request fails
+            token_budget: Max estimated email tokens per request
+            max_batch_size: Max emails per request
+        """
+        self.categorize_fn = categorize_fn
+        self.token_budget = token_budget
+        self.max_batch_size = max_batch_size
+        self.requests = 0
+        self.bisections = 0
+        self.failed_requests = 0
+
+    async def categorize(
+        self,
+        items: List[Tuple[str, Dict]],
+        on_progress: Optional[Callable[[int], None]] = None
+    ) -> Dict[str, Dict]:
+        """
+        Categorize (id, email) pairs.
+
+        Args:
+            items: (id, email) pairs
+            on_progress: Optional callback with the number of emails done so far
+
+        Returns:
+            id -> single-email categorization result
+        """
+        results: Dict[str, Dict] = {}
+        batches = pack_batches(items, self.token_budget, self.max_batch_size)
+        tasks = [asyncio.ensure_future(self._categorize_batch(batch)) for batch in batches]
+        for done in asyncio.as_completed(tasks):
+            results.update(await done)
+            logger.info(f"Categorized {len(results)}/{len(items)} emails")
+            if on_progress:
+                on_progress(len(results))
+
+        logger.info(
+            f"✓ Categorized {len(items)} emails in {self.requests} request(s) "
+            f"({self.bisections} bisection(s), {self.failed_requests} failed)"
+        )
+        return results
+
+    async def _categorize_batch(self, batch: List[Tuple[str, Dict]]) -> Dict[str, Dict]:
+        ids = [email_id for email_id, _ in batch]
+        payload = {"emails": [dict(email, id=email_id) for email_id, email in batch]}
+
+        self.requests += 1
+        try:
+            categorized = await self.categorize_fn(payload)
+        except CategorizationError as e:
+            # Smaller batches would fail the same way; leave these emails uncategorized
+            self.failed_requests += 1
+            logger.warning(f"⚠️  Batch of {len(batch)} failed, not retrying: {e}")
+            return {email_id: empty_buckets() for email_id in ids}
+
+        if len(batch) == 1:
+            # Nothing left to split: accept whatever came back for this email
+            single = reconcile(categorized, ids)
+            if single:
+                return single
+            return {ids[0]: categorized if is_valid_result(categorized) else empty_buckets()}
+
+        per_id = reconcile(categorized, ids)
+        if per_id is not None:
+            return per_id
+
+        self.bisections += 1
+        mid = len(batch) // 2
+        logger.warning(f"⚠️  Could not reconcile batch of {len(batch)}, bisecting")
+        left, right = await asyncio.gather(
+            self._categorize_batch(batch[:mid]),
+            self._categorize_batch(batch[mid:])
+        )
+        return {**left, **right}
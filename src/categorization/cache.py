@@ -0,0 +1,192 @@
+"""
+Categorization Cache
+Content-addressed on-disk cache of Gemini categorization results
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from src.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def _normalize(value):
+    """Collapse whitespace in strings (recursively) so formatting noise doesn't miss the cache."""
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_normalize(v) for v in value]
+    return value
+
+
+_template_versions: Dict[Callable, str] = {}
+
+
+def template_version(prompt_builder: Callable[[Dict], str]) -> str:
+    """
+    Version of a prompt template: a hash of the template rendered without emails.
+
+    Any edit to the prompt text changes the version, so stale results are never served.
+    """
+    if prompt_builder not in _template_versions:
+        rendered = prompt_builder({"emails": []})
+        digest = hashlib.sha256(rendered.encode("utf-8")).hexdigest()[:16]
+        _template_versions[prompt_builder] = f"{prompt_builder.__name__}:{digest}"
+    return _template_versions[prompt_builder]
+
+
+def cache_key(
+    email_data: Dict,
+    prompt_builder: Callable[[Dict], str],
+    model_name: str,
+    system_instruction: Optional[str] = None
+) -> str:
+    """Hash of the normalized payload, prompt template version, system instruction and model name."""
+    payload = json.dumps(_normalize(email_data), sort_keys=True, ensure_ascii=False)
+    parts = [payload, template_version(prompt_builder), model_name]
+    if system_instruction:
+        parts.append(hashlib.sha256(system_instruction.encode("utf-8")).hexdigest()[:16])
+    material = "\x1f".join(parts)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class CategorizationCache:
+    """
+    SQLite-backed result cache with LRU and TTL eviction.
+
+    Entries expire `ttl_seconds` after being written; once more than
+    `max_entries` are stored, the least recently used ones are evicted.
+    """
+
+    DB_NAME = "categorization_cache.db"
+
+    def __init__(
+        self,
+        data_dir: Path,
+        max_entries: int = 50_000,
+        ttl_seconds: float = 30 * 24 * 3600
+    ):
+        """
+        Args:
+            data_dir: Directory holding the cache database
+            max_entries: LRU capacity
+            ttl_seconds: Time-to-live of an entry
+        """
+        self.db_path = Path(data_dir) / self.DB_NAME
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_results_last_used ON results(last_used)"
+            )
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Cached result for a key, or None on a miss or expired entry."""
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._entries -= 1
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE results SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Dict):
+        """Store a result, evicting least recently used entries over capacity."""
+        now = time.time()
+        with self._lock, self._conn:
+            exists = self._conn.execute(
+                "SELECT 1 FROM results WHERE key = ?", (key,)
+            ).fetchone() is not None
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, created_at, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now)
+            )
+            if not exists:
+                self._entries += 1
+
+            overflow = self._entries - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM results WHERE key IN "
+                    "(SELECT key FROM results ORDER BY last_used LIMIT ?)",
+                    (overflow,)
+                )
+                self._entries -= overflow
+                self.evictions += overflow
+
+    def clear(self):
+        """Drop every cached result."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM results")
+            self._entries = 0
+
+    def get_stats(self) -> Dict:
+        """Hit/miss counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": self._entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+_caches: Dict[str, CategorizationCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_categorization_cache(data_dir: Path) -> CategorizationCache:
+    """
+    Get the process-wide cache for a data directory.
+
+    Args:
+        data_dir: Directory holding the cache database
+
+    Returns:
+        CategorizationCache instance
+    """
+    key = str(Path(data_dir).resolve())
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = CategorizationCache(Path(data_dir))
+        return _caches[key]
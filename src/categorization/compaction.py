@@ -0,0 +1,188 @@
+"""
+Prompt Compaction
+Trims email bodies before they are sent to Gemini: quoted history,
+signatures, tracking URLs and footer boilerplate, then a per-email token budget
+"""
+
+import json
+import re
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from src.utils.metrics import PROMPT_PAYLOAD_TOKENS
+from .batching import estimate_tokens
+
+# Estimated tokens kept of each email body
+DEFAULT_EMAIL_TOKEN_BUDGET = 512
+
+# Start of quoted history: everything from here on is an older message
+QUOTE_HEADER_PATTERNS = [
+    re.compile(r"^On\b[^\n]{0,200}(?:\n[^\n]{0,200})?\bwrote:[ \t]*$", re.MULTILINE),
+    re.compile(r"^-{2,}\s*Original Message\s*-{2,}", re.MULTILINE | re.IGNORECASE),
+    re.compile(r"^_{8,}[ \t]*\n(?:From|De|Von):", re.MULTILINE),
+    re.compile(r"^From:[^\n]+\n(?:Sent|Date):[^\n]+\n", re.MULTILINE),
+]
+# Conventional signature delimiter ("-- ") and mobile footers
+SIGNATURE_DELIMITER = re.compile(r"^-- ?$", re.MULTILINE)
+MOBILE_FOOTER = re.compile(
+    r"^(Sent from my \w[\w ]*|Get Outlook for \w+|Sent from (Mail|Yahoo Mail|Outlook) for \w+)[ \t.]*$",
+    re.MULTILINE | re.IGNORECASE
+)
+# A sign-off this close to the end starts the signature block
+SIGN_OFF = re.compile(
+    r"^(?:(?:best|kind|warm|many)\s+)?(?:regards|wishes|thanks|thank you|cheers|sincerely|best|talk soon)"
+    r"(?:[ ,.!]*|,\s*\w+)$",
+    re.IGNORECASE
+)
+SIGN_OFF_WINDOW = 6
+# Lines a signature block may hold after its sign-off: names, titles, companies, contacts
+SIGNATURE_MAX_LINES = 4
+SIGNATURE_LINE_CHARS = 60
+SIGNATURE_CONTACT = re.compile(r"@|https?://|www\.|\+?\d[\d ()./-]{6,}\d")
+SIGNATURE_CONNECTORS = {"of", "and", "at", "for", "the", "de", "von", "van"}
+# Footer lines that carry no content (only stripped from the trailing footer)
+BOILERPLATE = re.compile(
+    r"unsubscribe|manage (your )?(email )?preferences|view (it |this email )?in (your |a )?browser|"
+    r"you are receiving this|you received this|this (e-?mail|message) was sent to|privacy policy|"
+    r"terms of (service|use)|all rights reserved|©|\(c\) \d{4}|"
+    r"(this|the information in this) (e-?mail|message)[^\n]{0,80}(confidential|intended (only|solely))",
+    re.IGNORECASE
+)
+# Longest non-boilerplate line (address, company name, link) a footer may hold
+FOOTER_LINE_CHARS = 80
+URL_PATTERN = re.compile(r"(?:https?://|www\.)[^\s<>\"')\]]+", re.IGNORECASE)
+UNSUBSCRIBE_MARKER = "[unsubscribe link]"
+TRUNCATION_MARKER = " [...]"
+
+
+def _cut_quoted(text: str) -> str:
+    """Drop quoted history (reply headers and everything after, ">" lines)."""
+    cut = len(text)
+    for pattern in QUOTE_HEADER_PATTERNS:
+        match = pattern.search(text)
+        if match and match.start() < cut:
+            cut = match.start()
+    # Keep the quote when nothing precedes it (e.g. a bare forward)
+    if text[:cut].strip():
+        text = text[:cut]
+    return "\n".join(line for line in text.split("\n") if not line.lstrip().startswith(">"))
+
+
+def _is_signature_line(line: str) -> bool:
+    """Whether a line reads like a name, title, company or contact detail rather than prose."""
+    if len(line) > SIGNATURE_LINE_CHARS:
+        return False
+    if SIGNATURE_CONTACT.search(line):
+        return True
+    words = re.findall(r"[^\W\d_]+", line)
+    return all(word[0].isupper() or word.lower() in SIGNATURE_CONNECTORS for word in words)
+
+
+def _cut_signature(text: str) -> str:
+    """Drop the signature: after a "-- " delimiter, mobile footers, a trailing sign-off block."""
+    match = SIGNATURE_DELIMITER.search(text)
+    if match and text[:match.start()].strip():
+        text = text[:match.start()]
+    text = MOBILE_FOOTER.sub("", text)
+    lines = text.rstrip().split("\n")
+    for index in range(max(1, len(lines) - SIGN_OFF_WINDOW), len(lines)):
+        if not SIGN_OFF.match(lines[index].strip()):
+            continue
+        # Only a sign-off closing the email, with at most a short name/contact block after it
+        block = [line.strip() for line in lines[index + 1:] if line.strip()]
+        if len(block) <= SIGNATURE_MAX_LINES and all(_is_signature_line(line) for line in block):
+            return "\n".join(lines[:index])
+    return "\n".join(lines)
+
+
+def _shorten_url(match: re.Match) -> str:
+    url = match.group(0)
+    host = urlsplit(url if "://" in url else f"http://{url}").hostname or ""
+    return f"[{host.removeprefix('www.')} link]" if host else ""
+
+
+def _strip_boilerplate(text: str) -> str:
+    """Drop boilerplate lines from the trailing footer, keeping a marker if one offered to unsubscribe."""
+    lines = text.split("\n")
+    # The footer is the trailing run of boilerplate and short lines, from its first boilerplate line,
+    # below a paragraph of content; short emails are all content
+    footer = len(lines)
+    for index in range(len(lines) - 1, -1, -1):
+        line = lines[index].strip()
+        if BOILERPLATE.search(line):
+            footer = index
+        elif len(line) > FOOTER_LINE_CHARS:
+            break
+    else:
+        footer = len(lines)
+    kept, unsubscribe = lines[:footer], False
+    for line in lines[footer:]:
+        if BOILERPLATE.search(line):
+            unsubscribe = unsubscribe or "unsubscribe" in line.lower()
+            continue
+        kept.append(line)
+    text = "\n".join(kept)
+    # The unsubscribe link is a spam/newsletter signal worth its few tokens
+    return f"{text.rstrip()}\n{UNSUBSCRIBE_MARKER}" if unsubscribe else text
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to about `max_tokens` (estimated), at a word boundary."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    limit = max(0, max_tokens * 4 - len(TRUNCATION_MARKER))
+    cut = text.rfind(" ", 0, limit + 1)
+    return text[:cut if cut > limit // 2 else limit].rstrip() + TRUNCATION_MARKER
+
+
+def compact_text(text: str, max_tokens: Optional[int] = DEFAULT_EMAIL_TOKEN_BUDGET) -> str:
+    """
+    Compact an email body for a categorization prompt.
+
+    Args:
+        text: Email body as extracted
+        max_tokens: Estimated token budget for the result; None keeps any length
+
+    Returns:
+        Body without quoted history, signature, boilerplate and full URLs,
+        whitespace collapsed and truncated to the budget
+    """
+    if not text:
+        return text or ""
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    text = _cut_quoted(text)
+    text = _cut_signature(text)
+    text = URL_PATTERN.sub(_shorten_url, text)
+    text = _strip_boilerplate(text)
+    text = re.sub(r"[ \t\u00a0]+", " ", text)
+    text = re.sub(r" ?\n ?", "\n", text)
+    text = re.sub(r"\n{3,}", "\n\n", text).strip()
+    if max_tokens is not None:
+        text = truncate_to_tokens(text, max_tokens)
+    return text
+
+
+def compact_payload(
+    email_data: Dict,
+    max_tokens: Optional[int] = DEFAULT_EMAIL_TOKEN_BUDGET
+) -> Tuple[Dict, int, int]:
+    """
+    Compact the "Text" of every email in a {"emails": [...]} payload.
+
+    Args:
+        email_data: Categorization payload (left unchanged)
+        max_tokens: Per-email body token budget
+
+    Returns:
+        (compacted payload, estimated tokens before, estimated tokens after)
+    """
+    emails = email_data.get("emails", [])
+    compacted = [
+        dict(email, Text=compact_text(email["Text"], max_tokens)) if isinstance(email.get("Text"), str) else email
+        for email in emails
+    ]
+    before = estimate_tokens(json.dumps(emails, ensure_ascii=False))
+    after = estimate_tokens(json.dumps(compacted, ensure_ascii=False))
+    PROMPT_PAYLOAD_TOKENS.inc(before, stage="raw")
+    PROMPT_PAYLOAD_TOKENS.inc(after, stage="compacted")
+    return dict(email_data, emails=compacted), before, after
@@ -0,0 +1,348 @@
+"""
+Rules Pre-Classifier
+Deterministic fast path that settles obvious spam and newsletters without Gemini
+"""
+
+import json
+import random
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.utils import setup_logger
+from .batching import BUCKETS, empty_buckets
+
+logger = setup_logger(__name__)
+
+# Keyword signals from the waterfall rules in get_detailed_email_categorization_prompt
+URGENT_KEYWORDS = ("emergency", "asap", "critical", "urgent", "payment failed", "immediately", "action required")
+DECISION_KEYWORDS = (
+    "do you approve", "which option", "please approve", "approval needed", "your approval",
+    "yes or no", "yes/no", "can you confirm", "please confirm", "let me know if",
+)
+CALENDAR_KEYWORDS = ("meeting", "schedule", "appointment", "invitation:", "calendar invite", ".ics", "zoom.us/j", "meet.google.com")
+SPAM_KEYWORDS = (
+    "% off", "limited time", "act now", "special offer", "exclusive deal", "free trial", "buy now",
+    "lowest price", "discount", "promo code", "coupon", "winner", "you have been selected", "risk-free",
+)
+INFORMATION_KEYWORDS = (
+    "newsletter", "receipt", "your order", "order confirmation", "has shipped", "fyi", "status report",
+    "digest", "weekly update", "monthly update", "release notes", "statement is ready",
+)
+
+
+def _keyword_pattern(keyword: str) -> re.Pattern:
+    """Match a keyword as whole words: word-character ends must sit on a word boundary."""
+    start = r"\b" if re.match(r"\w", keyword[0]) else ""
+    end = r"\b" if re.match(r"\w", keyword[-1]) else ""
+    return re.compile(start + re.escape(keyword) + end)
+
+
+# (bucket, [(keyword, pattern)]) in the order keywords are checked
+KEYWORD_PATTERNS = tuple(
+    (bucket, tuple((keyword, _keyword_pattern(keyword)) for keyword in keywords))
+    for bucket, keywords in (
+        ("urgent_emails", URGENT_KEYWORDS),
+        ("decision_emails", DECISION_KEYWORDS),
+        ("calendar_emails", CALENDAR_KEYWORDS),
+        ("spam_emails", SPAM_KEYWORDS),
+        ("information_emails", INFORMATION_KEYWORDS),
+    )
+)
+
+# Sender local parts typical of bulk mail
+BULK_SENDER_PATTERN = re.compile(r"^(no-?reply|do-?not-?reply|newsletters?|news|marketing|promo(tions)?|offers?|deals|info|updates)\b")
+
+# Signal weights; a category's confidence is 1 - prod(1 - weight) over its signals
+WEIGHTS = {
+    "keyword_subject": 0.6,
+    "keyword_body": 0.35,
+    "unsubscribe": 0.5,
+    "bulk_sender": 0.45,
+    "shouting_subject": 0.35,
+    "deny_list": 1.0,
+}
+
+# Buckets the fast path may settle; the others need Gemini's extracted fields
+FAST_PATH_BUCKETS = ("spam_emails", "information_emails")
+
+# Confidence bands used to report agreement with Gemini
+BANDS = (0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+
+
+def _matches(domain_or_address: str, sender: str) -> bool:
+    """True if a list entry (address, "@domain" or "domain") covers the sender address."""
+    entry = domain_or_address.strip().lower().lstrip("@")
+    if "@" in entry:
+        return sender == entry
+    domain = sender.rsplit("@", 1)[-1]
+    return domain == entry or domain.endswith("." + entry)
+
+
+def local_buckets(email: Dict, bucket: str) -> Dict:
+    """
+    Gemini-shaped result for an email categorized without Gemini, with the
+    start of the body standing in for the summary.
+    """
+    text = re.sub(r"\s+", " ", email.get("Text") or "").strip()
+    summary = text[:160].rsplit(" ", 1)[0] + "…" if len(text) > 160 else text
+    entry = {
+        "name": email.get("Name", "Unknown"),
+        "email": email.get("Email", ""),
+        "subject": email.get("Subject", "No Subject"),
+        "date": "TBD",
+        "time": "TBD",
+        "summary": summary or ("Unsolicited content" if bucket == "spam_emails" else ""),
+    }
+    if bucket == "calendar_emails":
+        entry["purpose"] = summary or "Meeting details not specified"
+    result = empty_buckets()
+    result[bucket].append(entry)
+    return result
+
+
+def primary_bucket(categorized: Dict) -> Optional[str]:
+    """First non-empty bucket of a categorization result, in waterfall order."""
+    for bucket in BUCKETS:
+        if categorized.get(bucket):
+            return bucket
+    return None
+
+
+class RulesClassifier:
+    """
+    Local pre-classifier run before Gemini.
+
+    Scores each category from keyword, sender and header signals and applies
+    the same waterfall as the Gemini prompt: any urgent or decision signal
+    sends the email to Gemini. Only spam and information can be settled
+    locally, and only above `threshold` with a clear margin over the runner-up.
+    Allow-listed senders always go to Gemini; deny-listed senders are spam.
+
+    Whenever Gemini also categorizes an email the rules had an opinion on
+    (below threshold, or a `shadow_rate` sample above it), the two answers
+    are compared so thresholds can be tuned from the agreement stats.
+    """
+
+    SENDER_RULES_FILE = "sender_rules.json"
+
+    def __init__(
+        self,
+        allow_senders: Optional[Iterable[str]] = None,
+        deny_senders: Optional[Iterable[str]] = None,
+        threshold: float = 0.85,
+        margin: float = 0.3,
+        shadow_rate: float = 0.05
+    ):
+        """
+        Args:
+            allow_senders: Addresses or domains never settled by rules
+            deny_senders: Addresses or domains always classified as spam
+            threshold: Min confidence to skip Gemini
+            margin: Min confidence lead over the next category
+            shadow_rate: Share of fast-path decisions still sent to Gemini to
+                measure agreement
+        """
+        self.allow_senders = [s for s in (allow_senders or []) if s.strip()]
+        self.deny_senders = [s for s in (deny_senders or []) if s.strip()]
+        self.threshold = threshold
+        self.margin = margin
+        self.shadow_rate = shadow_rate
+
+        self._lock = threading.Lock()
+        self.decided = 0
+        self.deferred = 0
+        self.shadowed = 0
+        self.decided_by_bucket = {bucket: 0 for bucket in FAST_PATH_BUCKETS}
+        # band -> [compared, agreed]
+        self.agreement = {band: [0, 0] for band in BANDS}
+
+    @classmethod
+    def from_data_dir(cls, data_dir: Path, **kwargs) -> "RulesClassifier":
+        """Load allow/deny lists from data/sender_rules.json ({"allow": [...], "deny": [...]}), if present."""
+        path = Path(data_dir) / cls.SENDER_RULES_FILE
+        lists = {}
+        if path.exists():
+            try:
+                lists = json.loads(path.read_text())
+            except Exception as e:
+                logger.warning(f"⚠️  Ignoring invalid {path}: {e}")
+            if not isinstance(lists, dict):
+                logger.warning(f"⚠️  Ignoring {path}: expected an object with \"allow\" and \"deny\" lists")
+                lists = {}
+        senders = {}
+        for name in ("allow", "deny"):
+            entries = lists.get(name) or []
+            if not isinstance(entries, list) or not all(isinstance(entry, str) for entry in entries):
+                logger.warning(f"⚠️  Ignoring \"{name}\" in {path}: expected a list of addresses or domains")
+                entries = []
+            senders[name] = entries
+        return cls(allow_senders=senders["allow"], deny_senders=senders["deny"], **kwargs)
+
+    def score(self, email: Dict) -> Tuple[Dict[str, float], List[str]]:
+        """
+        Confidence per bucket for a raw email (EmailInfo fields).
+
+        Returns:
+            (bucket -> confidence, reasons)
+        """
+        sender = (email.get("Email") or "").strip().lower()
+        subject = (email.get("Subject") or "").lower()
+        body = (email.get("Text") or "").lower()
+        signals: Dict[str, List[str]] = {bucket: [] for bucket in BUCKETS}
+        reasons = []
+
+        def keywords(bucket: str, patterns: Tuple[Tuple[str, re.Pattern], ...]):
+            for word, pattern in patterns:
+                if pattern.search(subject):
+                    signals[bucket].append("keyword_subject")
+                    reasons.append(f"{bucket}:subject:{word}")
+                    return
+            for word, pattern in patterns:
+                if pattern.search(body):
+                    signals[bucket].append("keyword_body")
+                    reasons.append(f"{bucket}:body:{word}")
+                    return
+
+        for bucket, patterns in KEYWORD_PATTERNS:
+            keywords(bucket, patterns)
+
+        bulk = bool(BULK_SENDER_PATTERN.match(sender.split("@", 1)[0]))
+        if "unsubscribe" in body:
+            # Newsletters and promotions both carry it; promotions win on keywords
+            signals["spam_emails" if signals["spam_emails"] else "information_emails"].append("unsubscribe")
+            reasons.append("unsubscribe")
+        if bulk:
+            signals["spam_emails" if signals["spam_emails"] else "information_emails"].append("bulk_sender")
+            reasons.append("bulk_sender")
+        raw_subject = email.get("Subject") or ""
+        letters = [c for c in raw_subject if c.isalpha()]
+        if raw_subject.count("!") >= 2 or (len(letters) >= 8 and all(c.isupper() for c in letters)):
+            signals["spam_emails"].append("shouting_subject")
+            reasons.append("shouting_subject")
+        if sender and any(_matches(entry, sender) for entry in self.deny_senders):
+            signals["spam_emails"].append("deny_list")
+            reasons.append("deny_list")
+
+        scores = {}
+        for bucket, names in signals.items():
+            miss = 1.0
+            for name in names:
+                miss *= 1.0 - WEIGHTS[name]
+            scores[bucket] = round(1.0 - miss, 4)
+        return scores, reasons
+
+    def classify(self, email: Dict) -> Dict:
+        """
+        Decide whether an email can skip Gemini.
+
+        Returns:
+            {"bucket", "confidence", "reasons", "decided", "shadow"}; bucket is
+            the rules' best guess (None without any signal). When "decided"
+            is set, "shadow" says whether to still ask Gemini for comparison.
+        """
+        scores, reasons = self.score(email)
+        # Waterfall: any urgent or decision signal wins, and those need Gemini's summary
+        escalated = scores["urgent_emails"] > 0 or scores["decision_emails"] > 0
+        if scores["urgent_emails"] > 0:
+            bucket = "urgent_emails"
+        elif scores["decision_emails"] > 0:
+            bucket = "decision_emails"
+        else:
+            bucket = max(BUCKETS[2:], key=lambda name: scores[name])
+        confidence = scores[bucket]
+        runner_up = max(score for name, score in scores.items() if name != bucket)
+        sender = (email.get("Email") or "").strip().lower()
+
+        allowed = bool(sender) and any(_matches(entry, sender) for entry in self.allow_senders)
+        denied = "deny_list" in reasons
+
+        if denied and not allowed:
+            bucket, confidence = "spam_emails", 1.0
+        decided = (
+            not allowed
+            and bucket in FAST_PATH_BUCKETS
+            and (denied or (
+                not escalated
+                and confidence >= self.threshold
+                and confidence - runner_up >= self.margin
+            ))
+        )
+        shadow = decided and not denied and random.random() < self.shadow_rate
+
+        with self._lock:
+            if decided and not shadow:
+                self.decided += 1
+                self.decided_by_bucket[bucket] += 1
+            else:
+                self.deferred += 1
+                if shadow:
+                    self.shadowed += 1
+
+        return {
+            "bucket": bucket if confidence > 0 else None,
+            "confidence": confidence,
+            "reasons": reasons,
+            "decided": decided,
+            "shadow": shadow,
+        }
+
+    def to_buckets(self, email: Dict, decision: Dict) -> Dict:
+        """Gemini-shaped result for an email the rules settled."""
+        return local_buckets(email, decision["bucket"])
+
+    def observe(self, decision: Dict, categorized: Dict):
+        """Compare the rules' guess with Gemini's answer for the same email."""
+        llm_bucket = primary_bucket(categorized)
+        if decision.get("bucket") is None or llm_bucket is None:
+            return
+        band = next(b for b in BANDS if decision["confidence"] <= b)
+        with self._lock:
+            self.agreement[band][0] += 1
+            if decision["bucket"] == llm_bucket:
+                self.agreement[band][1] += 1
+
+    def get_stats(self) -> Dict:
+        """Hit rate of the fast path and agreement with Gemini per confidence band."""
+        with self._lock:
+            total = self.decided + self.deferred
+            compared = sum(c for c, _ in self.agreement.values())
+            agreed = sum(a for _, a in self.agreement.values())
+            return {
+                "decided": self.decided,
+                "deferred": self.deferred,
+                "shadowed": self.shadowed,
+                "hit_rate": round(self.decided / total, 4) if total else 0.0,
+                "decided_by_bucket": dict(self.decided_by_bucket),
+                "agreement": round(agreed / compared, 4) if compared else None,
+                "agreement_by_confidence": {
+                    f"<={band}": {"compared": c, "agreed": a, "rate": round(a / c, 4) if c else None}
+                    for band, (c, a) in self.agreement.items()
+                },
+                "threshold": self.threshold,
+                "margin": self.margin,
+                "allow_senders": len(self.allow_senders),
+                "deny_senders": len(self.deny_senders),
+            }
+
+
+_classifiers: Dict[str, RulesClassifier] = {}
+_classifiers_lock = threading.Lock()
+
+
+def get_rules_classifier(data_dir: Path) -> RulesClassifier:
+    """
+    Get the process-wide rules classifier for a data directory.
+
+    Args:
+        data_dir: Directory holding sender_rules.json
+
+    Returns:
+        RulesClassifier instance
+    """
+    key = str(Path(data_dir).resolve())
+    with _classifiers_lock:
+        if key not in _classifiers:
+            _classifiers[key] = RulesClassifier.from_data_dir(Path(data_dir))
+        return _classifiers[key]
@@ -0,0 +1,305 @@
+"""
+Sender Memo
+Per-sender record of past categories, so repeat senders can skip Gemini
+"""
+
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, Optional, Tuple
+
+from src.storage import BUCKET_TO_CATEGORY, EmailStore, get_email_store
+from src.utils import setup_logger
+from .batching import BUCKETS
+from .rules import FAST_PATH_BUCKETS, local_buckets, primary_bucket
+
+logger = setup_logger(__name__)
+
+CATEGORY_TO_BUCKET = {category: bucket for bucket, category in BUCKET_TO_CATEGORY.items()}
+
+
+class _SenderHistory:
+    """Exponentially decayed category counts for one sender."""
+
+    __slots__ = ("weights", "updated_at")
+
+    def __init__(self):
+        self.weights = {bucket: 0.0 for bucket in BUCKETS}
+        self.updated_at = 0.0
+
+    def decayed(self, now: float, half_life: float) -> Dict[str, float]:
+        factor = 0.5 ** (max(0.0, now - self.updated_at) / half_life)
+        return {bucket: weight * factor for bucket, weight in self.weights.items()}
+
+    def add(self, bucket: str, at: float, half_life: float):
+        if at >= self.updated_at:
+            self.weights = self.decayed(at, half_life)
+            self.updated_at = at
+            self.weights[bucket] += 1.0
+        else:
+            # Out-of-order observation: count it at its own age
+            self.weights[bucket] += 0.5 ** ((self.updated_at - at) / half_life)
+
+
+class SenderMemo:
+    """
+    Memo of how each sender's emails were categorized.
+
+    Built from the categorized records in the email store and kept current
+    through the store's change events. Each past categorization counts with
+    a weight that halves every `half_life_days`, and a sender's confidence
+    is its top bucket's weight over the total plus `prior`, so a handful of
+    consistent recent results is needed before Gemini is skipped.
+
+    Only spam and information can be settled from the memo (the other
+    buckets need Gemini's summary and dates), and results the memo itself
+    gave are never counted as history. Restoring an email through the
+    dashboard invalidates its sender: emails saved before that point (by
+    raw id, which a recategorize doesn't change) are ignored, and the
+    invalidation is persisted so a rebuild respects it. A `shadow_rate`
+    sample of memo hits still goes to Gemini; a disagreement invalidates
+    the sender as well.
+    """
+
+    DB_NAME = "sender_memo.db"
+
+    MIGRATIONS = [
+        """
+        CREATE TABLE invalidations (
+            sender TEXT PRIMARY KEY,
+            invalidated_at REAL NOT NULL,
+            reason TEXT
+        );
+        """,
+        # Last raw email id at invalidation; only the sender's later emails count
+        """
+        ALTER TABLE invalidations ADD COLUMN after_raw_id INTEGER;
+        """,
+    ]
+
+    def __init__(
+        self,
+        data_dir: Path,
+        store: Optional[EmailStore] = None,
+        half_life_days: float = 30.0,
+        prior: float = 1.0,
+        threshold: float = 0.9,
+        shadow_rate: float = 0.05
+    ):
+        """
+        Args:
+            data_dir: Directory holding the email store and the memo database
+            store: Email store to build from (default: the data_dir store)
+            half_life_days: Age at which a past categorization counts half
+            prior: Pseudo-count added to every sender's total; higher needs
+                more history before the memo is trusted
+            threshold: Min confidence to skip Gemini
+            shadow_rate: Share of memo hits still sent to Gemini to check them
+        """
+        self.db_path = Path(data_dir) / self.DB_NAME
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.store = store or get_email_store(data_dir)
+        self.half_life = half_life_days * 86400.0
+        self.prior = prior
+        self.threshold = threshold
+        self.shadow_rate = shadow_rate
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+
+        self._senders: Dict[str, _SenderHistory] = {}
+        self._invalidated = self._load_invalidations()
+        self._stale = True
+        # Store events are queued and applied on the next lookup, so the store's
+        # listener never waits on this memo's lock (which rebuilds hold while reading the store)
+        self._pending: Deque[Tuple[str, str, float, Optional[int]]] = deque()
+        self.hits = 0
+        self.misses = 0
+        self.shadowed = 0
+        self.compared = 0
+        self.agreed = 0
+        self.store.add_listener(self._on_store_event)
+
+    def __repr__(self) -> str:
+        return f"SenderMemo({self.db_path})"
+
+    def _migrate(self):
+        """Apply pending schema migrations."""
+        with self._lock, self._conn:
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            for target, script in enumerate(self.MIGRATIONS[version:], start=version + 1):
+                self._conn.executescript(script)
+                self._conn.execute(f"PRAGMA user_version = {target}")
+
+    def _load_invalidations(self) -> Dict[str, int]:
+        """sender -> last raw id it was invalidated at (older time-only rows get the current one)."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE invalidations SET after_raw_id = ? WHERE after_raw_id IS NULL", (self.store.last_raw_id(),)
+            )
+            return {
+                row["sender"]: row["after_raw_id"]
+                for row in self._conn.execute("SELECT sender, after_raw_id FROM invalidations")
+            }
+
+    def _observe(self, sender: str, category: str, at: float, raw_id: Optional[int]):
+        bucket = CATEGORY_TO_BUCKET.get(category)
+        if not sender or bucket is None:
+            return
+        if sender in self._invalidated and (raw_id is None or raw_id <= self._invalidated[sender]):
+            return
+        self._senders.setdefault(sender, _SenderHistory()).add(bucket, at, self.half_life)
+
+    def _ensure_built(self):
+        """(Re)build the memo from the store after startup or a bulk rewrite, then apply new results."""
+        with self._lock:
+            if self._stale:
+                self._stale = False
+                self._senders = {}
+                for entry in self.store.iter_sender_categories(exclude_origin="sender_memo"):
+                    self._observe(*entry)
+                self._pending.clear()
+                logger.info(f"✓ Sender memo built: {len(self._senders)} senders")
+            while self._pending:
+                self._observe(*self._pending.popleft())
+
+    def _on_store_event(self, event: Dict):
+        if event["type"] == "email_added":
+            if event.get("origin") == "sender_memo":
+                # The memo's own answers are no evidence for it
+                return
+            record = event["email"]
+            sender = str(record.get("email") or "").strip().lower()
+            self._pending.append((sender, event["category"], time.time(), event.get("raw_id")))
+        elif event["type"] == "emails_replaced":
+            self._stale = True
+
+    def confidence(self, sender: str) -> Dict:
+        """
+        Memo lookup for a sender address.
+
+        Returns:
+            {"bucket", "confidence", "weight"}; bucket is None for unknown senders
+        """
+        sender = (sender or "").strip().lower()
+        self._ensure_built()
+        with self._lock:
+            history = self._senders.get(sender)
+            if history is None:
+                return {"bucket": None, "confidence": 0.0, "weight": 0.0}
+            weights = history.decayed(time.time(), self.half_life)
+        bucket = max(weights, key=weights.get)
+        total = sum(weights.values())
+        return {
+            "bucket": bucket,
+            "confidence": round(weights[bucket] / (total + self.prior), 4),
+            "weight": round(total, 3),
+        }
+
+    def classify(self, email: Dict) -> Dict:
+        """
+        Decide whether a raw email's sender is consistent enough to skip Gemini.
+
+        Returns:
+            {"sender", "bucket", "confidence", "decided", "shadow"}
+        """
+        sender = (email.get("Email") or "").strip().lower()
+        lookup = self.confidence(sender)
+        decided = lookup["bucket"] in FAST_PATH_BUCKETS and lookup["confidence"] >= self.threshold
+        shadow = decided and random.random() < self.shadow_rate
+        with self._lock:
+            if decided and not shadow:
+                self.hits += 1
+            else:
+                self.misses += 1
+                if shadow:
+                    self.shadowed += 1
+        return {"sender": sender, **lookup, "decided": decided, "shadow": shadow}
+
+    def to_buckets(self, email: Dict, decision: Dict) -> Dict:
+        """Gemini-shaped result for an email settled from its sender's history."""
+        return local_buckets(email, decision["bucket"])
+
+    def observe(self, decision: Dict, categorized: Dict):
+        """Check a shadowed memo hit against Gemini; a disagreement invalidates the sender."""
+        llm_bucket = primary_bucket(categorized)
+        if not decision.get("shadow") or llm_bucket is None:
+            return
+        with self._lock:
+            self.compared += 1
+            self.agreed += llm_bucket == decision["bucket"]
+        if llm_bucket != decision["bucket"]:
+            self.invalidate(decision["sender"], reason=f"gemini:{llm_bucket}")
+
+    def invalidate(self, sender: str, reason: Optional[str] = None):
+        """
+        Forget a sender's history (e.g. the user restored one of its emails),
+        so its next emails go to Gemini until a new history builds up.
+        """
+        sender = (sender or "").strip().lower()
+        if not sender:
+            return
+        after_raw_id = self.store.last_raw_id()
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO invalidations (sender, invalidated_at, reason, after_raw_id) "
+                    "VALUES (?, ?, ?, ?)",
+                    (sender, time.time(), reason, after_raw_id)
+                )
+            self._invalidated[sender] = after_raw_id
+            self._senders.pop(sender, None)
+        logger.info(f"⏭️  Sender memo invalidated for {sender}" + (f" ({reason})" if reason else ""))
+
+    def get_stats(self) -> Dict:
+        """Hit rate, shadow agreement and memo size."""
+        self._ensure_built()
+        with self._lock:
+            total = self.hits + self.misses
+            now = time.time()
+            confident = 0
+            for history in self._senders.values():
+                weights = history.decayed(now, self.half_life)
+                top = max(weights, key=weights.get)
+                if top in FAST_PATH_BUCKETS and weights[top] / (sum(weights.values()) + self.prior) >= self.threshold:
+                    confident += 1
+            return {
+                "senders": len(self._senders),
+                "confident_senders": confident,
+                "invalidated_senders": len(self._invalidated),
+                "hits": self.hits,
+                "misses": self.misses,
+                "shadowed": self.shadowed,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "agreement": round(self.agreed / self.compared, 4) if self.compared else None,
+                "threshold": self.threshold,
+                "half_life_days": self.half_life / 86400.0,
+            }
+
+
+_memos: Dict[str, SenderMemo] = {}
+_memos_lock = threading.Lock()
+
+
+def get_sender_memo(data_dir: Path) -> SenderMemo:
+    """
+    Get the process-wide sender memo for a data directory.
+
+    Args:
+        data_dir: Directory holding the email store
+
+    Returns:
+        SenderMemo instance
+    """
+    key = str(Path(data_dir).resolve())
+    with _memos_lock:
+        if key not in _memos:
+            _memos[key] = SenderMemo(Path(data_dir))
+        return _memos[key]
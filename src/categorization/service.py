@@ -0,0 +1,262 @@
+"""
+Categorization Service
+Async, rate-limited Gemini access shared by EmailReader and EmailCategorizer
+"""
+
+import asyncio
+import json
+import random
+import textwrap
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+import google.generativeai as genai
+
+from src.utils import setup_logger
+from src.utils.metrics import LLM_REQUESTS, LLM_SECONDS, LLM_TOKENS
+from .batching import CategorizationError, empty_buckets, estimate_tokens, is_valid_result
+from .cache import CategorizationCache, cache_key
+
+logger = setup_logger(__name__)
+
+# HTTP status codes worth retrying (rate limited / transient server errors)
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def _is_retryable(error: Exception) -> bool:
+    """True for 429/5xx errors from the Gemini client."""
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        return code in RETRYABLE_STATUS_CODES
+    return isinstance(error, (asyncio.TimeoutError, ConnectionError))
+
+
+class TokenBucket:
+    """Async token bucket refilled continuously at `rate_per_minute`."""
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0):
+        """Wait until `amount` tokens are available and take them."""
+        # Requests larger than the bucket only need a full bucket
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def charge(self, amount: float):
+        """Take tokens without waiting (may go negative, delaying later callers)."""
+        self._refill()
+        self.tokens -= amount
+
+
+class CategorizationService:
+    """
+    Bounded-concurrency Gemini client for email categorization.
+
+    Requests run through a semaphore-limited worker pool and two token
+    buckets (requests/min and tokens/min). 429/5xx errors are retried with
+    full-jitter exponential backoff.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "gemini-2.5-flash",
+        max_concurrency: int = 4,
+        requests_per_minute: int = 60,
+        tokens_per_minute: int = 250_000,
+        max_retries: int = 4,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0
+    ):
+        """
+        Args:
+            model_name: Gemini model to call
+            max_concurrency: Max in-flight requests
+            requests_per_minute: Request quota
+            tokens_per_minute: Token quota (estimated input + reported output)
+            max_retries: Retries per request on 429/5xx errors
+            base_delay: Initial backoff in seconds
+            max_delay: Backoff cap in seconds
+        """
+        self.model_name = model_name
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        # One model object per system instruction (the instruction is fixed at construction)
+        self._models: Dict[Optional[str], object] = {}
+        # asyncio primitives are bound to the loop they are first used on
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._request_bucket: Optional[TokenBucket] = None
+        self._token_bucket: Optional[TokenBucket] = None
+
+        self.stats = {"requests": 0, "retries": 0, "failures": 0, "tokens": 0}
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._request_bucket = TokenBucket(self.requests_per_minute)
+            self._token_bucket = TokenBucket(self.tokens_per_minute)
+
+    @property
+    def model(self):
+        """Gemini model without a system instruction, created on first use (after genai.configure)."""
+        return self.model_for()
+
+    def model_for(self, system_instruction: Optional[str] = None):
+        """Gemini model carrying a system instruction, created on first use."""
+        model = self._models.get(system_instruction)
+        if model is None:
+            # The prompts module indents its text; the model needn't pay for the indentation
+            kwargs = {"system_instruction": textwrap.dedent(system_instruction).strip()} if system_instruction else {}
+            model = self._models[system_instruction] = genai.GenerativeModel(
+                model_name=self.model_name,
+                generation_config={
+                    "response_mime_type": "application/json",
+                    "temperature": 0.1  # Low temp for consistent results
+                },
+                **kwargs
+            )
+        return model
+
+    async def _generate(self, prompt: str, system_instruction: Optional[str] = None):
+        """One rate-limited generate call with retries."""
+        self._bind_loop()
+        model = self.model_for(system_instruction)
+        # The system instruction is billed as input on every request too
+        estimated = estimate_tokens(prompt) + (estimate_tokens(system_instruction) if system_instruction else 0)
+
+        for attempt in range(self.max_retries + 1):
+            async with self._semaphore:
+                await self._request_bucket.acquire()
+                await self._token_bucket.acquire(estimated)
+                started = time.perf_counter()
+                try:
+                    self.stats["requests"] += 1
+                    response = await model.generate_content_async(prompt)
+                except Exception as e:
+                    LLM_SECONDS.observe(time.perf_counter() - started, model=self.model_name)
+                    LLM_REQUESTS.inc(model=self.model_name, outcome="retryable" if _is_retryable(e) else "error")
+                    if attempt >= self.max_retries or not _is_retryable(e):
+                        raise
+                    error = e
+                else:
+                    LLM_SECONDS.observe(time.perf_counter() - started, model=self.model_name)
+                    LLM_REQUESTS.inc(model=self.model_name, outcome="ok")
+                    usage = getattr(response, "usage_metadata", None)
+                    LLM_TOKENS.inc(getattr(usage, "prompt_token_count", 0) or 0, model=self.model_name, kind="prompt")
+                    LLM_TOKENS.inc(
+                        getattr(usage, "candidates_token_count", 0) or 0, model=self.model_name, kind="completion"
+                    )
+                    total = getattr(usage, "total_token_count", 0) or estimated
+                    self._token_bucket.charge(max(0, total - estimated))
+                    self.stats["tokens"] += total
+                    return response
+
+            # Back off outside the semaphore so other requests can proceed
+            self.stats["retries"] += 1
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+            logger.warning(f"⚠️  Gemini error ({error}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def categorize(
+        self,
+        email_data: Dict,
+        prompt_builder: Callable[[Dict], str],
+        cache: Optional[CategorizationCache] = None,
+        bypass_cache: bool = False,
+        system_instruction: Optional[str] = None,
+        raise_on_failure: bool = False
+    ) -> Dict:
+        """
+        Categorize emails into the 5 buckets.
+
+        Args:
+            email_data: {"emails": [...]} payload
+            prompt_builder: Prompt template to render email_data with
+            cache: Optional result cache, keyed on payload, template and model
+            bypass_cache: Skip the cache lookup (fresh results are still stored)
+            system_instruction: Static rules sent in the model's system
+                instruction slot instead of the prompt
+            raise_on_failure: Raise CategorizationError when the request
+                fails instead of returning empty buckets
+
+        Returns:
+            Categorized buckets (all empty if the request ultimately fails or
+            the response isn't valid JSON shaped like the buckets)
+
+        Raises:
+            CategorizationError: With raise_on_failure, if the request failed
+        """
+        key = cache_key(email_data, prompt_builder, self.model_name, system_instruction) if cache else None
+        if key and not bypass_cache:
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+
+        try:
+            response = await self._generate(prompt_builder(email_data), system_instruction)
+        except Exception as e:
+            self.stats["failures"] += 1
+            logger.error(f"✗ Categorization failed: {e}")
+            if raise_on_failure:
+                raise CategorizationError(str(e)) from e
+            return empty_buckets()
+
+        try:
+            categorized = json.loads(response.text)
+        except Exception as e:
+            self.stats["failures"] += 1
+            logger.error(f"✗ Categorization returned unreadable output: {e}")
+            return empty_buckets()
+        if not is_valid_result(categorized):
+            self.stats["failures"] += 1
+            logger.error(f"✗ Categorization returned {type(categorized).__name__} output, not buckets of emails")
+            return empty_buckets()
+
+        # Only successful, non-empty results are worth caching
+        if key and any(categorized.get(bucket) for bucket in categorized):
+            cache.put(key, categorized)
+        return categorized
+
+
+_services: Dict[str, CategorizationService] = {}
+_services_lock = threading.Lock()
+
+
+def get_categorization_service(model_name: str = "gemini-2.5-flash") -> CategorizationService:
+    """
+    Get the process-wide service for a model, so every caller shares one quota.
+
+    Args:
+        model_name: Gemini model name
+
+    Returns:
+        CategorizationService instance
+    """
+    with _services_lock:
+        if model_name not in _services:
+            _services[model_name] = CategorizationService(model_name=model_name)
+        return _services[model_name]
@@ -1,11 +1,15 @@
 """Data models for InboxPilot"""
 
-from .email_models import EmailInfo, EmailList, CategorizedEmail
-from .calendar_models import CalendarEvent
+from .email_models import EmailInfo, EmailList, CategorizedEmail, InboxActionItem, InboxActionResult
+from .calendar_models import CalendarEvent, CalendarEventItem, CalendarBatchResult
 
 __all__ = [
     'EmailInfo',
     'EmailList',
     'CategorizedEmail',
+    'InboxActionItem',
+    'InboxActionResult',
     'CalendarEvent',
+    'CalendarEventItem',
+    'CalendarBatchResult',
 ]
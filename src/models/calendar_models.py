@@ -1,5 +1,7 @@
 """Pydantic models for calendar event data"""
 
+from typing import List, Optional
+
 from pydantic import BaseModel, Field
 
 
@@ -11,3 +13,19 @@ class CalendarEvent(BaseModel):
     date: str = Field(description="Event date in YYYY-MM-DD format")
     time: str = Field(description="Event time")
     purpose: str = Field(description="Meeting purpose/description")
+    device: Optional[str] = Field(default=None, description="ADB serial of the device the invite was read on")
+
+
+class CalendarEventItem(BaseModel):
+    """Outcome of a batch calendar run for one event."""
+    Subject: str = Field(description="The event title exactly as given in the goal")
+    Date: str = Field(description="The event date exactly as given in the goal")
+    Time: str = Field(description="The event time exactly as given in the goal")
+    Created: bool = Field(description="True if the event was saved and shows in the calendar")
+
+
+class CalendarBatchResult(BaseModel):
+    """Per-event outcomes of a multi-event calendar run."""
+    results: List[CalendarEventItem] = Field(
+        description="One entry per event listed in the goal, in the same order"
+    )
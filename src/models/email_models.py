@@ -22,6 +22,20 @@ class EmailList(BaseModel):
     )
 
 
+class InboxActionItem(BaseModel):
+    """Outcome of a batch inbox action for one email."""
+    Index: int = Field(default=0, description="The email's number in the goal's list")
+    Subject: str = Field(description="The subject line exactly as given in the goal")
+    Done: bool = Field(description="True if the email was archived/deleted and disappeared from the inbox")
+
+
+class InboxActionResult(BaseModel):
+    """Per-email outcomes of a multi-select archive/delete run."""
+    results: List[InboxActionItem] = Field(
+        description="One entry per email listed in the goal, in the same order"
+    )
+
+
 class CategorizedEmail(BaseModel):
     """Categorized email with metadata."""
     id: str
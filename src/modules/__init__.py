@@ -3,6 +3,7 @@
 from .email_reader import EmailReader, create_email_reader
 from .email_categorizer import EmailCategorizer, create_email_categorizer
 from .calendar_scheduler import CalendarScheduler, create_calendar_scheduler
+from .inbox_actions import InboxActionBuffer
 
 __all__ = [
     'EmailReader',
@@ -11,4 +12,5 @@ __all__ = [
     'create_email_categorizer',
     'CalendarScheduler',
     'create_calendar_scheduler',
+    'InboxActionBuffer',
 ]
@@ -9,13 +9,12 @@ import asyncio
 import json
 import os
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 
-from droidrun import DroidAgent
-
-from src.models import CalendarEvent
-from src.utils import get_droidrun_config, setup_logger
-from src.prompts import get_calendar_event_goal, get_close_calendar_goal
+from src.models import CalendarBatchResult, CalendarEvent
+from src.utils import get_device_pool, setup_logger
+from src.storage import event_key, get_calendar_ledger, get_email_store
+from src.prompts import get_batch_calendar_events_goal, get_calendar_event_goal, get_close_calendar_goal
 
 # Check if module is being imported by web server
 if not os.getenv("INBOXPILOT_WEBAPP_MODE"):
@@ -27,6 +26,9 @@ if not os.getenv("INBOXPILOT_WEBAPP_MODE"):
 
 logger = setup_logger(__name__)
 
+# Android package of Google Calendar, force-stopped after scheduling
+CALENDAR_PACKAGE = "com.google.android.calendar"
+
 
 class CalendarScheduler:
     """Handles automated scheduling of calendar events."""
@@ -37,7 +39,7 @@ class CalendarScheduler:
         
         Args:
             config_path: Optional path to custom config.yaml file
-            data_dir: Directory containing JSON data files
+            data_dir: Directory holding the email store and calendar ledger
         """
         # Resolve paths relative to project root
         project_root = Path(__file__).parent.parent.parent
@@ -46,7 +48,7 @@ class CalendarScheduler:
         else:
             self.config_path = str(project_root / "config.yaml")
         
-        self.config = get_droidrun_config(max_steps=30, config_path=self.config_path)
+        self.device_pool = get_device_pool()
         
         # Resolve data_dir relative to project root if not absolute
         if Path(data_dir).is_absolute():
@@ -54,9 +56,15 @@ class CalendarScheduler:
         else:
             self.data_dir = project_root / data_dir
         
+        # Events already created, so reruns don't duplicate them
+        self.ledger = get_calendar_ledger(self.data_dir)
+        
         self.events_processed = 0
         self.events_succeeded = 0
         self.events_failed = 0
+        self.events_skipped = 0
+        self.events_batched = 0
+        self.agent_runs = 0
     
     def _validate_api_key(self):
         """Validate that Google API key is configured."""
@@ -71,7 +79,7 @@ class CalendarScheduler:
         Load calendar events from JSON file.
         
         Args:
-            json_path: Optional path to specific JSON file
+            json_path: Optional path to specific JSON file (defaults to the email store)
             
         Returns:
             List of validated CalendarEvent objects
@@ -92,28 +100,37 @@ class CalendarScheduler:
             else:
                 calendar_events = []
         else:
-            # Try loading from processed_emails.json first
-            processed_path = self.data_dir / "processed_emails.json"
-            if processed_path.exists():
-                with open(processed_path, 'r') as f:
-                    data = json.load(f)
-                calendar_events = data.get("calendar", [])
-                logger.info(f"Loaded {len(calendar_events)} events from {processed_path}")
+            # Load calendar emails from the email store
+            store = get_email_store(self.data_dir)
+            calendar_events = store.list_emails("calendar")
+            if calendar_events:
+                logger.info(f"Loaded {len(calendar_events)} events from {store}")
             else:
                 logger.warning("No calendar events found")
-                calendar_events = []
         
         # Validate events
         events = [CalendarEvent(**event) for event in calendar_events]
         logger.info(f"Loaded and validated {len(events)} events")
         return events
     
-    async def schedule_event(self, event: CalendarEvent) -> bool:
+    async def schedule_event(
+        self,
+        event: CalendarEvent,
+        settle_seconds: float = 0.0,
+        check_existing: bool = False
+    ) -> bool:
         """
         Schedule a single calendar event.
         
+        Runs on the device the invite was read on (its account owns the
+        calendar), or on any free device if that is unknown.
+        
         Args:
             event: Calendar event to schedule
+            settle_seconds: Max time to wait for the device's UI to go idle
+                after the event
+            check_existing: Have the agent look for the event in the
+                calendar first (an earlier run may have saved it unreported)
             
         Returns:
             True if successful, False otherwise
@@ -125,17 +142,22 @@ class CalendarScheduler:
                 title=event.subject,
                 date=event.date,
                 time=event.time,
-                description=event.purpose
+                description=event.purpose,
+                check_existing=check_existing
             )
             
-            agent = DroidAgent(
-                goal=goal,
-                config=self.config,
+            self.agent_runs += 1
+            result = await self.device_pool.run_agent(
+                goal,
+                max_steps=30,
+                config_path=self.config_path,
+                serial=event.device,
+                settle_seconds=settle_seconds,
+                task="calendar_event"
             )
             
-            result = await agent.run()
-            
             if result.success:
+                self.ledger.record(event.subject, event.date, event.time, device=event.device)
                 logger.info(f"✓ Successfully scheduled: {event.subject}")
                 return True
             else:
@@ -146,53 +168,185 @@ class CalendarScheduler:
             logger.error(f"✗ Error scheduling {event.subject}: {str(e)}")
             return False
     
+    async def schedule_batch(
+        self,
+        events: List[CalendarEvent],
+        settle_seconds: float = 0.0
+    ) -> List[Optional[bool]]:
+        """
+        Create several events in one agent run inside one Calendar session.
+        
+        All events must belong to the same device (or to none). A run that
+        stopped partway still reports the events it got to.
+        
+        Args:
+            events: Calendar events to schedule
+            settle_seconds: Max time to wait for the device's UI to go idle
+                after the run
+            
+        Returns:
+            Per-event outcome, in the order of `events`: True if created,
+            False if reported not created, None if the run didn't report it
+            (it may have been saved)
+        """
+        logger.info(f"📦 Scheduling {len(events)} events in one run")
+        
+        goal = get_batch_calendar_events_goal([
+            {"title": event.subject, "date": event.date, "time": event.time, "description": event.purpose}
+            for event in events
+        ])
+        
+        try:
+            self.agent_runs += 1
+            result = await self.device_pool.run_agent(
+                goal,
+                max_steps=10 + 25 * len(events),
+                output_model=CalendarBatchResult,
+                config_path=self.config_path,
+                serial=events[0].device,
+                settle_seconds=settle_seconds,
+                task="calendar_batch"
+            )
+        except Exception as e:
+            logger.error(f"✗ Error in batch scheduling run: {str(e)}")
+            return [None] * len(events)
+        
+        if not result.success:
+            logger.warning(f"⚠️  Batch scheduling run failed: {result.reason}")
+        report: Optional[CalendarBatchResult] = result.structured_output
+        if report is None:
+            return [None] * len(events)
+        
+        reported = {event_key(item.Subject, item.Date, item.Time): item.Created for item in report.results}
+        outcomes = []
+        for idx, event in enumerate(events):
+            ok = reported.get(event_key(event.subject, event.date, event.time))
+            if not ok and idx < len(report.results):
+                # Same position and title, even if the agent reformatted the date or time
+                item = report.results[idx]
+                if item.Subject.strip().lower() == event.subject.strip().lower():
+                    ok = item.Created
+            if ok:
+                self.ledger.record(event.subject, event.date, event.time, device=event.device)
+                logger.info(f"✓ Successfully scheduled: {event.subject}")
+            outcomes.append(ok)
+        
+        logger.info(f"✓ Batch: {sum(1 for ok in outcomes if ok)}/{len(events)} events in one run")
+        return outcomes
+    
+    @staticmethod
+    def _batches(events: List[CalendarEvent], batch_size: int) -> List[List[CalendarEvent]]:
+        """Split events into runs of up to batch_size, never mixing devices."""
+        by_device: Dict[Optional[str], List[CalendarEvent]] = {}
+        for event in events:
+            by_device.setdefault(event.device, []).append(event)
+        return [
+            group[i:i + batch_size]
+            for group in by_device.values()
+            for i in range(0, len(group), batch_size)
+        ]
+    
     async def schedule_all_events(
         self, 
         events: List[CalendarEvent],
-        delay_between_events: float = 2.0
+        delay_between_events: float = 2.0,
+        on_progress: Optional[Callable[[int, Optional[int]], None]] = None,
+        batch_size: int = 5
     ) -> Dict[str, int]:
         """
-        Schedule all calendar events sequentially.
+        Schedule all calendar events, concurrently across the device pool.
+        
+        Each device runs one agent at a time; runs queue for their device
+        (or the next free one) in the device pool. Up to `batch_size` events
+        of one device are created in a single run, and events that run
+        misses are retried one by one (checking the ledger first, and the
+        calendar itself for events the run didn't report on). Events
+        already in the ledger (or repeated in `events`) are skipped.
         
         Args:
             events: List of calendar events to schedule
-            delay_between_events: Delay in seconds between events
+            delay_between_events: Max wait in seconds for a device's UI to go
+                idle before its next run
+            on_progress: Optional callback (events processed, total events)
+            batch_size: Max events per agent run (1 disables batching)
             
         Returns:
-            Dictionary with success/failure counts
+            Dictionary with success/failure/skipped counts
         """
         logger.info(f"Starting to schedule {len(events)} events...")
         
-        for idx, event in enumerate(events, 1):
-            logger.info(f"\n{'='*60}")
-            logger.info(f"Event {idx}/{len(events)}")
-            logger.info(f"{'='*60}")
-            
-            success = await self.schedule_event(event)
-            
+        pending = []
+        seen = set()
+        for event in events:
+            key = event_key(event.subject, event.date, event.time)
+            if key in seen or self.ledger.contains(event.subject, event.date, event.time):
+                logger.info(f"⏭️  Already scheduled: {event.subject} on {event.date} at {event.time}")
+                self.events_skipped += 1
+                continue
+            seen.add(key)
+            pending.append(event)
+        
+        self.events_processed += self.events_skipped
+        if on_progress:
+            on_progress(self.events_processed, len(events))
+        
+        def finish(success: bool):
             self.events_processed += 1
             if success:
                 self.events_succeeded += 1
             else:
                 self.events_failed += 1
             
-            # Delay between events to allow UI to settle
-            if idx < len(events):
-                await asyncio.sleep(delay_between_events)
+            if on_progress:
+                on_progress(self.events_processed, len(events))
+        
+        # Devices stay reserved after each run until their UI is idle again
+        async def schedule(batch: List[CalendarEvent]):
+            if len(batch) > 1:
+                outcomes = await self.schedule_batch(batch, settle_seconds=delay_between_events)
+            else:
+                outcomes = [False]
+            
+            for event, created in zip(batch, outcomes):
+                if created:
+                    self.events_batched += 1
+                    finish(True)
+                elif self.ledger.contains(event.subject, event.date, event.time):
+                    # Created meanwhile by another run; a retry would duplicate it
+                    finish(True)
+                else:
+                    # An unreported event may already be saved: have the agent look first
+                    finish(await self.schedule_event(
+                        event, settle_seconds=delay_between_events, check_existing=created is None
+                    ))
+        
+        await asyncio.gather(*(schedule(batch) for batch in self._batches(pending, max(1, batch_size))))
         
         return self.get_stats()
     
-    async def close_calendar_app(self):
-        """Close the Google Calendar app."""
+    async def close_calendar_app(self, serials: Optional[List[Optional[str]]] = None):
+        """
+        Close the Google Calendar app.
+        
+        Force-stops the app over ADB; an agent run is only used on devices
+        where that fails.
+        
+        Args:
+            serials: Devices to close it on (default: every device in the pool)
+        """
         logger.info("Closing Google Calendar app...")
         
-        goal = get_close_calendar_goal()
+        async def close(serial: Optional[str]):
+            if await self.device_pool.stop_app(CALENDAR_PACKAGE, serial=serial):
+                return
+            await self.device_pool.run_agent(
+                get_close_calendar_goal(), max_steps=30, config_path=self.config_path, serial=serial,
+                task="close_calendar"
+            )
         
-        close_agent = DroidAgent(
-            goal=goal,
-            config=self.config,
-        )
-        await close_agent.run()
+        await asyncio.gather(*(
+            close(serial) for serial in (serials if serials is not None else self.device_pool.serials)
+        ))
         logger.info("✓ Calendar app closed")
     
     def get_stats(self) -> Dict[str, int]:
@@ -200,7 +354,10 @@ class CalendarScheduler:
         return {
             "total": self.events_processed,
             "succeeded": self.events_succeeded,
-            "failed": self.events_failed
+            "failed": self.events_failed,
+            "skipped": self.events_skipped,
+            "batched": self.events_batched,
+            "agent_runs": self.agent_runs
         }
     
     def print_summary(self):
@@ -212,17 +369,31 @@ class CalendarScheduler:
         logger.info(f"Total Events: {stats['total']}")
         logger.info(f"Succeeded: {stats['succeeded']}")
         logger.info(f"Failed: {stats['failed']}")
-        if stats['total'] > 0:
-            logger.info(f"Success Rate: {(stats['succeeded']/stats['total']*100):.1f}%")
+        logger.info(f"Skipped (already scheduled): {stats['skipped']}")
+        logger.info(f"Created in batch runs: {stats['batched']} ({stats['agent_runs']} agent runs)")
+        attempted = stats['total'] - stats['skipped']
+        if attempted > 0:
+            logger.info(f"Success Rate: {(stats['succeeded']/attempted*100):.1f}%")
         logger.info(f"{'='*60}\n")
     
-    async def run(self, json_path: Optional[str] = None, delay: float = 1.5) -> Dict[str, int]:
+    async def run(
+        self,
+        json_path: Optional[str] = None,
+        delay: float = 1.5,
+        on_progress: Optional[Callable[[int, Optional[int]], None]] = None,
+        device: Optional[str] = None,
+        batch_size: int = 5
+    ) -> Dict[str, int]:
         """
         Main execution function.
         
         Args:
             json_path: Optional path to JSON file with events
-            delay: Delay between events in seconds
+            delay: Max wait in seconds for a device's UI to settle between events
+            on_progress: Optional callback (events processed, total events)
+            device: Only schedule events read on this device (events without
+                a device are scheduled on it too)
+            batch_size: Max events created per agent run (1 disables batching)
             
         Returns:
             Dictionary with execution statistics
@@ -231,19 +402,27 @@ class CalendarScheduler:
         
         # Load events
         events = self.load_events_from_json(json_path)
+        if device:
+            events = [
+                event.model_copy(update={"device": device})
+                for event in events if event.device in (None, device)
+            ]
         
         if not events:
             logger.warning("No events to schedule")
-            return {"total": 0, "succeeded": 0, "failed": 0}
+            return self.get_stats()
         
         # Schedule all events
-        stats = await self.schedule_all_events(events, delay_between_events=delay)
+        stats = await self.schedule_all_events(
+            events, delay_between_events=delay, on_progress=on_progress, batch_size=batch_size
+        )
         
         # Print summary
         self.print_summary()
         
-        # Close Calendar app
-        await self.close_calendar_app()
+        # Close Calendar app (unless every event was skipped)
+        if stats["total"] > stats["skipped"]:
+            await self.close_calendar_app([device] if device else None)
         
         return stats
 
@@ -255,7 +434,7 @@ def create_calendar_scheduler(config_path: Optional[str] = None, data_dir: str =
     
     Args:
         config_path: Optional path to custom config.yaml file
-        data_dir: Directory containing JSON data files
+        data_dir: Directory holding the email store and calendar ledger
         
     Returns:
         Configured CalendarScheduler instance
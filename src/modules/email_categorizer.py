@@ -5,15 +5,32 @@ Reprocesses extracted emails for testing categorization without DroidRun
 MUST be called from web server - cannot be run standalone
 """
 
-import json
+import asyncio
 import os
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Callable, Dict, Optional
 
 import google.generativeai as genai
 
-from src.utils import setup_logger
-from src.prompts import get_email_categorization_prompt
+from src.utils import setup_logger, span
+from src.utils.metrics import CATEGORIZATIONS
+from src.storage import build_dashboard_records, get_email_store
+from src.categorization import (
+    DEFAULT_EMAIL_TOKEN_BUDGET,
+    BatchCategorizer,
+    cache_key,
+    compact_payload,
+    get_categorization_cache,
+    get_categorization_service,
+    get_local_model,
+    get_rules_classifier,
+    primary_bucket,
+)
+from src.prompts import (
+    get_batch_email_categorization_system_instruction,
+    get_categorization_input_prompt,
+    get_email_categorization_system_instruction,
+)
 
 # Check if module is being imported by web server
 if not os.getenv("INBOXPILOT_WEBAPP_MODE"):
@@ -29,12 +46,22 @@ logger = setup_logger(__name__)
 class EmailCategorizer:
     """Handles email categorization using Gemini LLM."""
     
-    def __init__(self, data_dir: str = "data"):
+    def __init__(
+        self,
+        data_dir: str = "data",
+        batch_token_budget: int = 8000,
+        max_batch_size: int = 25,
+        email_token_budget: Optional[int] = DEFAULT_EMAIL_TOKEN_BUDGET
+    ):
         """
         Initialize the email categorizer.
         
         Args:
-            data_dir: Directory containing JSON data files
+            data_dir: Directory holding the email store
+            batch_token_budget: Max estimated email tokens per Gemini request
+            max_batch_size: Max emails per Gemini request (1 disables batching)
+            email_token_budget: Estimated tokens of each email body sent to
+                Gemini after compaction; None only compacts
         """
         # Resolve data_dir relative to project root if not absolute
         project_root = Path(__file__).parent.parent.parent
@@ -43,8 +70,13 @@ class EmailCategorizer:
         else:
             self.data_dir = project_root / data_dir
         
-        self.extracted_file = self.data_dir / "extracted_email_threads.json"
-        self.processed_file = self.data_dir / "processed_emails.json"
+        self.store = get_email_store(self.data_dir)
+        self.batch_token_budget = batch_token_budget
+        self.max_batch_size = max_batch_size
+        self.email_token_budget = email_token_budget
+        self.service = get_categorization_service()
+        self.cache = get_categorization_cache(self.data_dir)
+        self.rules = get_rules_classifier(self.data_dir)
         self._validate_api_key()
     
     def _validate_api_key(self):
@@ -56,157 +88,229 @@ class EmailCategorizer:
             )
         genai.configure(api_key=api_key)
     
-    def categorize_emails_with_gemini(self, email_data: dict) -> dict:
+    async def categorize_emails_with_gemini(
+        self,
+        email_data: dict,
+        prompt_builder: Callable[[dict], str] = get_categorization_input_prompt,
+        system_instruction: Optional[str] = None,
+        raise_on_failure: bool = False
+    ) -> dict:
         """
-        Categorizes emails using Gemini 2.0 Flash.
+        Categorizes emails using Gemini 2.0 Flash via the shared categorization service.
         
         Args:
             email_data: Dictionary containing email data to categorize
+            prompt_builder: Prompt template to render email_data with
+            system_instruction: Rules for the model's system instruction
+                (default: the 5-bucket categorization rules)
+            raise_on_failure: Raise CategorizationError when the request fails
+                instead of returning empty buckets
             
         Returns:
             Dictionary with categorized emails in 5 buckets
         """
-        model = genai.GenerativeModel(
-            model_name="gemini-2.5-flash",
-            generation_config={"response_mime_type": "application/json"}
+        if system_instruction is None:
+            system_instruction = get_email_categorization_system_instruction()
+        return await self.service.categorize(
+            email_data,
+            prompt_builder,
+            system_instruction=system_instruction,
+            raise_on_failure=raise_on_failure
         )
-
-        prompt = get_email_categorization_prompt(email_data)
-
-        try:
-            response = model.generate_content(prompt)
-            categorized = json.loads(response.text)
-            logger.info(f"✓ Categorized successfully")
-            return categorized
-        except Exception as e:
-            logger.error(f"✗ Categorization failed: {e}")
-            return {
-                "urgent_emails": [],
-                "decision_emails": [],
-                "calendar_emails": [],
-                "information_emails": [],
-                "spam_emails": []
-            }
     
-    def reprocess_emails(self) -> Dict[str, int]:
+    async def reprocess_emails(
+        self,
+        bypass_cache: bool = False,
+        on_progress: Optional[Callable[[int, Optional[int]], None]] = None
+    ) -> Dict[str, int]:
         """
-        Load extracted emails and recategorize them.
+        Load extracted emails from the store and recategorize them.
+        
+        Emails whose content, prompt template and model are unchanged since a
+        previous run are served from the categorization cache. The local
+        passes and the store writes run in a worker thread, so the event loop
+        only waits on Gemini.
+        
+        Args:
+            bypass_cache: Ignore cached results (fresh results are still cached)
+            on_progress: Optional callback (emails categorized, total emails)
         
         Returns:
             Dictionary with statistics per category
         """
-        # Load raw emails
-        if not self.extracted_file.exists():
-            logger.error(f"{self.extracted_file} not found")
-            return {
-                "urgent": 0,
-                "decisions": 0,
-                "calendar": 0,
-                "info": 0,
-                "spam": 0,
-                "total": 0
-            }
-        
-        with open(self.extracted_file, "r") as f:
-            raw_emails = json.load(f)
+        plan = await asyncio.to_thread(self._settle_locally, bypass_cache)
         
-        logger.info(f"Loaded {len(raw_emails)} raw emails")
+        batcher = BatchCategorizer(
+            lambda payload: self.categorize_emails_with_gemini(
+                payload,
+                prompt_builder=get_categorization_input_prompt,
+                system_instruction=plan["system_instruction"],
+                raise_on_failure=True
+            ),
+            token_budget=self.batch_token_budget,
+            max_batch_size=self.max_batch_size
+        )
+        cached_count = len(plan["results"])
         
-        # Initialize dashboard data
-        dashboard_data = {
-            "urgent": [],
-            "decisions": [],
-            "calendar": [],
-            "info": [],
-            "spam": []
-        }
+        def report(done: int):
+            if on_progress:
+                on_progress(cached_count + done, len(plan["items"]))
+        
+        report(0)
+        with span("categorize_batch", emails=len(plan["pending"])):
+            fresh = await batcher.categorize(plan["pending"], on_progress=report)
+        return await asyncio.to_thread(self._save_results, plan, fresh)
+    
+    def _settle_locally(self, bypass_cache: bool) -> Dict:
+        """
+        Load the raw emails and settle what doesn't need Gemini: rules, the
+        local model and the categorization cache.
         
-        # Process each email
-        for idx, email in enumerate(raw_emails):
+        Args:
+            bypass_cache: Ignore cached results
+        
+        Returns:
+            Run state for _save_results: "raw_ids", "items" and "sources" of
+            the snapshot, "results"/"origins" settled so far, "pending"
+            (id, compacted email) pairs for Gemini with their cache "keys",
+            and the rules "decisions" and local model "guesses" to learn from
+        """
+        raw_emails = list(self.store.iter_raw_emails())
+        logger.info(f"Loaded {len(raw_emails)} raw emails")
+        
+        # Skip incomplete extractions; raw ids double as stable batch ids
+        items = []
+        sources = {}
+        for idx, (raw_id, email) in enumerate(raw_emails):
             if email.get("Name") == "Unknown" or email.get("Subject") == "Unknown":
                 logger.info(f"Skipping email {idx+1} - incomplete data")
                 continue
+            # The source device is bookkeeping, not content for Gemini (or the cache key)
+            sources[str(raw_id)] = email
+            items.append((str(raw_id), {k: v for k, v in email.items() if k != "Device"}))
+        
+        # Settle obvious spam/newsletters locally, then serve unchanged emails from the cache
+        prompt_builder = get_categorization_input_prompt
+        system_instruction = get_batch_email_categorization_system_instruction()
+        raw_tokens = compacted_tokens = 0
+        local = get_local_model(self.data_dir)
+        results = {}
+        origins = {}
+        pending = []
+        keys = {}
+        decisions = {}
+        guesses = {}
+        for item_id, email in items:
+            decision = self.rules.classify(email)
+            if decision["decided"] and not decision["shadow"]:
+                results[item_id] = self.rules.to_buckets(email, decision)
+                origins[item_id] = "rules"
+                CATEGORIZATIONS.inc(source="rules")
+                continue
+            if decision["bucket"]:
+                decisions[item_id] = decision
+            if local:
+                guess = local.classify(email)
+                if guess["decided"]:
+                    results[item_id] = local.to_buckets(email, guess)
+                    origins[item_id] = "local_model"
+                    CATEGORIZATIONS.inc(source="local_model")
+                    continue
+                guesses[item_id] = guess
             
-            logger.info(f"\nProcessing email {idx+1}/{len(raw_emails)}: {email.get('Subject')}")
-            
-            # Create email structure for Gemini
-            email_for_gemini = {"emails": [email]}
-            
-            # Categorize
-            categorized = self.categorize_emails_with_gemini(email_for_gemini)
-            
-            # Add to dashboard data
-            for gemini_email in categorized.get("urgent_emails", []):
-                dashboard_data["urgent"].append({
-                    "id": f"urgent_{len(dashboard_data['urgent'])}_{idx}",
-                    "name": gemini_email.get("name", email.get("Name", "Unknown")),
-                    "email": gemini_email.get("email", email.get("Email", "")),
-                    "subject": gemini_email.get("subject", email.get("Subject", "")),
-                    "date": gemini_email.get("date", "TBD"),
-                    "time": gemini_email.get("time", "TBD"),
-                    "summary": gemini_email.get("summary", ""),
-                    "category": "urgent"
-                })
-            
-            for gemini_email in categorized.get("decision_emails", []):
-                dashboard_data["decisions"].append({
-                    "id": f"decision_{len(dashboard_data['decisions'])}_{idx}",
-                    "name": gemini_email.get("name", email.get("Name", "Unknown")),
-                    "email": gemini_email.get("email", email.get("Email", "")),
-                    "subject": gemini_email.get("subject", email.get("Subject", "")),
-                    "date": gemini_email.get("date", "TBD"),
-                    "time": gemini_email.get("time", "TBD"),
-                    "summary": gemini_email.get("summary", ""),
-                    "category": "decisions"
-                })
-            
-            for gemini_email in categorized.get("calendar_emails", []):
-                dashboard_data["calendar"].append({
-                    "id": f"calendar_{len(dashboard_data['calendar'])}_{idx}",
-                    "name": gemini_email.get("name", email.get("Name", "Unknown")),
-                    "email": gemini_email.get("email", email.get("Email", "")),
-                    "subject": gemini_email.get("subject", email.get("Subject", "")),
-                    "date": gemini_email.get("date", "TBD"),
-                    "time": gemini_email.get("time", "TBD"),
-                    "purpose": gemini_email.get("purpose", "Meeting details not specified"),
-                    "category": "calendar"
-                })
-            
-            for gemini_email in categorized.get("information_emails", []):
-                dashboard_data["info"].append({
-                    "id": f"info_{len(dashboard_data['info'])}_{idx}",
-                    "name": gemini_email.get("name", email.get("Name", "Unknown")),
-                    "email": gemini_email.get("email", email.get("Email", "")),
-                    "subject": gemini_email.get("subject", email.get("Subject", "")),
-                    "date": gemini_email.get("date", "TBD"),
-                    "time": gemini_email.get("time", "TBD"),
-                    "summary": gemini_email.get("summary", ""),
-                    "category": "info"
-                })
-            
-            for gemini_email in categorized.get("spam_emails", []):
-                dashboard_data["spam"].append({
-                    "id": f"spam_{len(dashboard_data['spam'])}_{idx}",
-                    "name": gemini_email.get("name", email.get("Name", "Unknown")),
-                    "email": gemini_email.get("email", email.get("Email", "")),
-                    "subject": gemini_email.get("subject", email.get("Subject", "")),
-                    "date": gemini_email.get("date", "TBD"),
-                    "time": gemini_email.get("time", "TBD"),
-                    "summary": gemini_email.get("summary", "Unsolicited content"),
-                    "category": "spam"
-                })
-        
-        # Save to processed_emails.json
-        with open(self.processed_file, "w", encoding='utf-8') as f:
-            json.dump(dashboard_data, f, indent=2, ensure_ascii=False)
+            # Only Gemini sees the compacted body; rules and the local model read the whole email
+            payload, before, after = compact_payload({"emails": [email]}, self.email_token_budget)
+            email = payload["emails"][0]
+            raw_tokens += before
+            compacted_tokens += after
+            keys[item_id] = cache_key(payload, prompt_builder, self.service.model_name, system_instruction)
+            cached = None if bypass_cache else self.cache.get(keys[item_id])
+            if cached is not None:
+                results[item_id] = cached
+                origins[item_id] = "gemini"
+                CATEGORIZATIONS.inc(source="cache")
+            else:
+                pending.append((item_id, email))
+        
+        logger.info(
+            f"Categorizing {len(pending)} emails (up to {self.max_batch_size} per request), "
+            f"{len(results)} settled locally or served from cache"
+        )
+        logger.info(f"✂️  Prompt payloads: {raw_tokens} → {compacted_tokens} tokens after compaction")
+        return {
+            "raw_ids": [raw_id for raw_id, _ in raw_emails],
+            "items": items,
+            "sources": sources,
+            "system_instruction": system_instruction,
+            "local": local,
+            "results": results,
+            "origins": origins,
+            "pending": pending,
+            "keys": keys,
+            "decisions": decisions,
+            "guesses": guesses,
+        }
+    
+    def _save_results(self, plan: Dict, fresh: Dict[str, Dict]) -> Dict[str, int]:
+        """
+        Merge Gemini's results into a run, learn from them and swap the
+        snapshot's records in the store.
+        
+        Args:
+            plan: Run state from _settle_locally
+            fresh: id -> Gemini result for the pending emails
+        
+        Returns:
+            Dictionary with statistics per category
+        """
+        items, sources, local = plan["items"], plan["sources"], plan["local"]
+        results, origins = plan["results"], plan["origins"]
+        for item_id, categorized in fresh.items():
+            origins[item_id] = "gemini"
+            if any(categorized.values()):
+                self.cache.put(plan["keys"][item_id], categorized)
+                CATEGORIZATIONS.inc(source="gemini")
+        results.update(fresh)
+        for item_id, decision in plan["decisions"].items():
+            if item_id in results:
+                self.rules.observe(decision, results[item_id])
+        # Emails Gemini failed on get the local model's answer instead of no category
+        for item_id, guess in plan["guesses"].items():
+            if primary_bucket(results.get(item_id, {})) is None:
+                results[item_id] = local.fallback(sources[item_id], guess)
+                origins[item_id] = "fallback"
+                CATEGORIZATIONS.inc(source="fallback")
+            else:
+                local.observe(guess, results[item_id])
+        
+        # Emails left without a category (e.g. their batch failed) keep their previous records
+        unresolved = {int(item_id) for item_id, _ in items if primary_bucket(results.get(item_id, {})) is None}
+        if unresolved:
+            logger.warning(f"⚠️  {len(unresolved)} email(s) got no category, keeping their previous records")
+        
+        # Collect (record, raw_id) pairs; the store is only swapped once all are done
+        entries = []
+        for item_id, _ in items:
+            categorized = results.get(item_id, {})
+            for record in build_dashboard_records(categorized, source=sources[item_id]):
+                entries.append((record, int(item_id)))
+        
+        with span("save_categorized", records=len(entries)):
+            # Only this snapshot's records are swapped; anything saved since stays
+            self.store.replace_emails(
+                entries,
+                raw_ids=[raw_id for raw_id in plan["raw_ids"] if raw_id not in unresolved],
+                origins={int(item_id): origin for item_id, origin in origins.items()}
+            )
+        counts = self.store.counts()
         
         stats = {
-            "urgent": len(dashboard_data['urgent']),
-            "decisions": len(dashboard_data['decisions']),
-            "calendar": len(dashboard_data['calendar']),
-            "info": len(dashboard_data['info']),
-            "spam": len(dashboard_data['spam']),
-            "total": sum(len(v) for v in dashboard_data.values())
+            "urgent": counts['urgent'],
+            "decisions": counts['decisions'],
+            "calendar": counts['calendar'],
+            "info": counts['info'],
+            "spam": counts['spam'],
+            "total": sum(counts.values())
         }
         
         logger.info(f"\n{'='*60}")
@@ -224,14 +328,27 @@ class EmailCategorizer:
 
 
 # Export for API usage
-def create_email_categorizer(data_dir: str = "data") -> EmailCategorizer:
+def create_email_categorizer(
+    data_dir: str = "data",
+    batch_token_budget: int = 8000,
+    max_batch_size: int = 25,
+    email_token_budget: Optional[int] = DEFAULT_EMAIL_TOKEN_BUDGET
+) -> EmailCategorizer:
     """
     Factory function to create EmailCategorizer instance.
     
     Args:
-        data_dir: Directory containing JSON data files
+        data_dir: Directory holding the email store
+        batch_token_budget: Max estimated email tokens per Gemini request
+        max_batch_size: Max emails per Gemini request
+        email_token_budget: Estimated tokens of each email body sent to Gemini
         
     Returns:
         Configured EmailCategorizer instance
     """
-    return EmailCategorizer(data_dir=data_dir)
+    return EmailCategorizer(
+        data_dir=data_dir,
+        batch_token_budget=batch_token_budget,
+        max_batch_size=max_batch_size,
+        email_token_budget=email_token_budget
+    )
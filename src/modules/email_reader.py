@@ -6,20 +6,37 @@ MUST be called from web server - cannot be run standalone
 """
 
 import asyncio
-import json
 import os
-from typing import List, Dict, Optional
+from collections import deque
+from typing import AsyncIterator, Callable, Deque, List, Dict, Optional, Set, Tuple
 from pathlib import Path
 
-from droidrun import DroidAgent
 import google.generativeai as genai
 
 from src.models import EmailInfo, EmailList
-from src.utils import get_droidrun_config, get_llm, setup_logger
+from src.utils import Pipeline, get_device_pool, setup_logger, span
+from src.utils.metrics import CATEGORIZATIONS, EXTRACTED_EMAILS
+from src.storage import get_dedup_index, get_email_store, get_scan_journal
+from src.categorization import (
+    DEFAULT_EMAIL_TOKEN_BUDGET,
+    cache_key,
+    compact_payload,
+    empty_buckets,
+    get_categorization_cache,
+    get_categorization_service,
+    get_local_model,
+    get_rules_classifier,
+    get_sender_memo,
+    primary_bucket,
+)
+from src.modules.inbox_actions import InboxActionBuffer, inbox_action_for
 from src.prompts import (
     get_extract_next_email_goal,
+    get_extract_emails_goal,
     get_archive_email_goal,
-    get_detailed_email_categorization_prompt
+    get_delete_inbox_email_goal,
+    get_categorization_input_prompt,
+    get_detailed_email_categorization_system_instruction
 )
 
 # Check if module is being imported by web server
@@ -33,16 +50,97 @@ if not os.getenv("INBOXPILOT_WEBAPP_MODE"):
 logger = setup_logger(__name__)
 
 
+class ExtractionCursor:
+    """
+    Where a scan stands in the unread list, across multi-email agent sessions.
+
+    Remembers the emails already extracted in this scan (sent to the next
+    session as subjects to pass over, since Gmail keeps opened emails in the
+    results until the search is re-run) and sizes each session: a failed or
+    cut-short session halves the batch, a complete one grows it back, so a
+    flaky device loses at most a small batch of opened emails.
+    """
+
+    def __init__(self, batch_size: int = 5, skip_window: int = 20):
+        """
+        Args:
+            batch_size: Emails to extract per agent session when all goes well
+            skip_window: Most recent subjects sent to the agent to pass over
+        """
+        self.target = max(1, batch_size)
+        self.batch_size = self.target
+        self.seen: Deque[Tuple[str, str]] = deque(maxlen=max(1, skip_window))
+        self.sessions = 0
+        self.partial_sessions = 0
+        self.failed_sessions = 0
+        self.emails = 0
+
+    def next_count(self, remaining: Optional[int] = None) -> int:
+        """Emails to ask the next session for."""
+        return max(1, min(self.batch_size, remaining)) if remaining else self.batch_size
+
+    def skip_subjects(self) -> List[str]:
+        return [subject for subject, _ in self.seen]
+
+    def advance(self, emails: List[EmailInfo], requested: int, complete: bool):
+        """
+        Record a session's outcome.
+
+        Args:
+            emails: Emails the session returned (possibly a partial list)
+            requested: Emails the session was asked for
+            complete: The agent finished without an error
+        """
+        self.sessions += 1
+        self.emails += len(emails)
+        for email in emails:
+            self.seen.append((email.Subject, email.Time))
+        if not complete:
+            if emails:
+                self.partial_sessions += 1
+            else:
+                self.failed_sessions += 1
+            self.batch_size = max(1, self.batch_size // 2)
+        elif len(emails) >= requested:
+            self.batch_size = min(self.target, self.batch_size * 2)
+
+    def get_stats(self) -> Dict:
+        return {
+            "sessions": self.sessions,
+            "emails": self.emails,
+            "emails_per_session": round(self.emails / self.sessions, 2) if self.sessions else 0.0,
+            "partial_sessions": self.partial_sessions,
+            "failed_sessions": self.failed_sessions,
+            "batch_size": self.batch_size,
+        }
+
+
 class EmailReader:
     """Handles automated email extraction and categorization from Gmail."""
     
-    def __init__(self, config_path: Optional[str] = None, data_dir: str = "data"):
+    def __init__(
+        self,
+        config_path: Optional[str] = None,
+        data_dir: str = "data",
+        use_bloom_filter: bool = False,
+        device_serial: Optional[str] = None,
+        llm_timeout: Optional[float] = None,
+        email_token_budget: Optional[int] = DEFAULT_EMAIL_TOKEN_BUDGET
+    ):
         """
         Initialize the email reader.
         
         Args:
             config_path: Optional path to custom config.yaml file
-            data_dir: Directory to store JSON data files
+            data_dir: Directory holding the email store
+            use_bloom_filter: Keep only a Bloom filter in memory for dedup and
+                confirm possible hits against the store's fingerprint index
+            device_serial: ADB serial of the device (mailbox) to scan; None
+                uses any free device, which only makes sense with one device
+            llm_timeout: Seconds to wait for Gemini (retries and rate limiting
+                included) before falling back to the local model; None waits
+            email_token_budget: Estimated tokens of each email body sent to
+                Gemini after compaction; None only compacts
         """
         # Resolve paths relative to project root
         project_root = Path(__file__).parent.parent.parent
@@ -59,8 +157,28 @@ class EmailReader:
         self.data_dir.mkdir(exist_ok=True)
         
         self.processed_count = 0
-        self.extracted_file = self.data_dir / "extracted_email_threads.json"
-        self.processed_file = self.data_dir / "processed_emails.json"
+        self.action_buffer: Optional[InboxActionBuffer] = None
+        self._on_progress: Optional[Callable[[int, Optional[int]], None]] = None
+        self._max_emails: Optional[int] = None
+        self.cursor = ExtractionCursor()
+        # Scan session journal: every email's stage, so an interrupted scan can resume
+        self.journal = get_scan_journal(self.data_dir)
+        self.session_id: Optional[int] = None
+        self._resumed: List[Dict] = []
+        self._awaiting_archive: Set[int] = set()
+        self._stop_reason: Optional[str] = None
+        # Pipeline stages take turns on the device through the shared pool
+        self.device_serial = device_serial
+        self.device_pool = get_device_pool()
+        self.store = get_email_store(self.data_dir)
+        # Shared by every reader of this store, so concurrent device scans see each other's saves
+        self.dedup = get_dedup_index(self.store, use_bloom=use_bloom_filter)
+        self.service = get_categorization_service()
+        self.cache = get_categorization_cache(self.data_dir)
+        self.rules = get_rules_classifier(self.data_dir)
+        self.sender_memo = get_sender_memo(self.data_dir)
+        self.llm_timeout = llm_timeout
+        self.email_token_budget = email_token_budget
     
     def _validate_api_key(self):
         """Validate that Gemini API key is configured."""
@@ -71,10 +189,21 @@ class EmailReader:
             )
         genai.configure(api_key=api_key)
     
-    def categorize_emails_with_gemini(self, email_data: Dict) -> Dict:
+    async def categorize_emails_with_gemini(self, email_data: Dict) -> Dict:
         """
         Categorizes emails using Gemini 2.0 Flash with strict waterfall logic.
         
+        Runs through the shared async categorization service so the scan loop
+        never blocks the event loop on a Gemini call. Results are cached, so a
+        message that is re-extracted later doesn't cost another request.
+        Bodies are compacted (quoted history, signatures, tracking URLs and
+        boilerplate dropped, then truncated to `email_token_budget`) and the
+        rules go in the model's system instruction.
+        Obvious spam and newsletters are settled by the rules pre-classifier,
+        the sender memo (senders whose past emails consistently landed in
+        one bucket) or the local model without calling Gemini at all, and
+        the local model answers when Gemini fails or times out.
+        
         Args:
             email_data: Dictionary containing email data to categorize
             
@@ -86,107 +215,162 @@ class EmailReader:
             - information_emails
             - spam_emails
         """
-        model = genai.GenerativeModel(
-            model_name="gemini-2.5-flash",
-            generation_config={
-                "response_mime_type": "application/json",
-                "temperature": 0.1  # Low temp for consistent results
-            }
-        )
-
-        prompt = get_detailed_email_categorization_prompt(email_data)
-
-        try:
-            response = model.generate_content(prompt)
-            categorized = json.loads(response.text)
-            logger.info(f"✓ Categorized {sum(len(v) for v in categorized.values())} emails")
-            return categorized
-        except Exception as e:
-            logger.error(f"Categorization failed: {e}")
-            return {
-                "urgent_emails": [],
-                "decision_emails": [],
-                "calendar_emails": [],
-                "information_emails": [],
-                "spam_emails": []
-            }
+        categorized, _ = await self._categorize(email_data)
+        return categorized
     
-    async def extract_next_email(self) -> tuple[bool, Optional[EmailInfo]]:
+    async def _categorize(self, email_data: Dict) -> Tuple[Dict, str]:
         """
-        Extract data from the next unread email, handling threads.
+        Categorize like categorize_emails_with_gemini and name the categorizer
+        that answered: "rules", "sender_memo", "local_model", "fallback" or
+        "gemini" (cached Gemini answers included).
+        """
+        emails = email_data.get("emails", [])
+        decision = self.rules.classify(emails[0]) if len(emails) == 1 else None
+        if decision and decision["decided"] and not decision["shadow"]:
+            logger.info(f"⚡ Rules: {decision['bucket']} (confidence {decision['confidence']:.2f})")
+            CATEGORIZATIONS.inc(source="rules")
+            return self.rules.to_buckets(emails[0], decision), "rules"
+        
+        memo = self.sender_memo.classify(emails[0]) if len(emails) == 1 else None
+        if memo and memo["decided"] and not memo["shadow"]:
+            logger.info(f"⚡ Sender memo: {memo['bucket']} (confidence {memo['confidence']:.2f})")
+            CATEGORIZATIONS.inc(source="sender_memo")
+            return self.sender_memo.to_buckets(emails[0], memo), "sender_memo"
+        
+        local = get_local_model(self.data_dir) if len(emails) == 1 else None
+        guess = local.classify(emails[0]) if local else None
+        if guess and guess["decided"]:
+            logger.info(f"⚡ Local model: {guess['bucket']} (confidence {guess['confidence']:.2f})")
+            CATEGORIZATIONS.inc(source="local_model")
+            return local.to_buckets(emails[0], guess), "local_model"
+        
+        payload, raw_tokens, compacted_tokens = compact_payload(email_data, self.email_token_budget)
+        logger.info(f"✂️  Prompt payload: {raw_tokens} → {compacted_tokens} tokens")
+        # Cache hits are counted as "cache" but stored as Gemini's answer, as on recategorize
+        system_instruction = get_detailed_email_categorization_system_instruction()
+        key = cache_key(payload, get_categorization_input_prompt, self.service.model_name, system_instruction)
+        categorized = self.cache.get(key)
+        source = "cache"
+        if categorized is None:
+            source = "gemini"
+            try:
+                categorized = await asyncio.wait_for(
+                    self.service.categorize(
+                        payload,
+                        get_categorization_input_prompt,
+                        cache=self.cache,
+                        bypass_cache=True,
+                        system_instruction=system_instruction
+                    ),
+                    timeout=self.llm_timeout
+                )
+            except asyncio.TimeoutError:
+                logger.warning(f"⚠️  Gemini timed out after {self.llm_timeout}s")
+                categorized = empty_buckets()
+        if decision:
+            self.rules.observe(decision, categorized)
+        if memo:
+            self.sender_memo.observe(memo, categorized)
+        if guess:
+            if primary_bucket(categorized) is None:
+                CATEGORIZATIONS.inc(source="fallback")
+                return local.fallback(emails[0], guess), "fallback"
+            local.observe(guess, categorized)
+        CATEGORIZATIONS.inc(source=source)
+        logger.info(f"✓ Categorized {sum(len(v) for v in categorized.values())} emails")
+        return categorized, "gemini"
+    
+    async def _run_agent(self, goal: str, max_steps: int, output_model=None, task: str = "agent"):
+        """
+        Run one DroidAgent on this reader's device.
         
+        Args:
+            goal: Goal string for the agent
+            max_steps: Maximum number of agent steps
+            output_model: Optional Pydantic model for structured output
+            task: Kind of run, for metrics
+            
         Returns:
-            Tuple of (success: bool, email: Optional[EmailInfo])
+            DroidAgent result
+        """
+        return await self.device_pool.run_agent(
+            goal,
+            max_steps=max_steps,
+            output_model=output_model,
+            config_path=self.config_path,
+            serial=self.device_serial,
+            task=task
+        )
+    
+    async def extract_next_emails(
+        self,
+        count: int,
+        skip_subjects: Optional[List[str]] = None
+    ) -> tuple[bool, List[EmailInfo]]:
         """
-        logger.info("📧 Extracting next email...")
+        Extract up to `count` unread emails in one agent session.
         
-        goal = get_extract_next_email_goal()
-        config = get_droidrun_config(max_steps=50, config_path=self.config_path)
+        Args:
+            count: Max emails to extract
+            skip_subjects: Subjects already extracted in this scan, to pass over
+            
+        Returns:
+            Tuple of (complete: bool, emails). complete is False when the agent
+            failed; emails then holds whatever it extracted before failing.
+            (True, []) means there are no more unread emails.
+        """
+        if count <= 1 and not skip_subjects:
+            goal = get_extract_next_email_goal()
+        else:
+            goal = get_extract_emails_goal(count, skip_subjects)
+        logger.info(f"📧 Extracting next {count} email(s)...")
         
-        agent = DroidAgent(
-            goal=goal,
-            config=config,
-            llms=get_llm(),
-            output_model=EmailList
+        result = await self._run_agent(
+            goal, max_steps=max(50, 15 + 12 * count), output_model=EmailList, task="extract_email"
         )
-        
-        result = await agent.run()
+        email_data: Optional[EmailList] = result.structured_output
+        emails = list(email_data.emails[:count]) if email_data else []
+        EXTRACTED_EMAILS.inc(len(emails))
         
         if not result.success:
             logger.warning(f"Agent stopped: {result.reason}")
-            return False, None
+            if emails:
+                logger.info(f"✓ Kept {len(emails)} email(s) extracted before the agent stopped")
+            return False, emails
         
-        if result.structured_output:
-            email_data: EmailList = result.structured_output
-            
-            # Check if inbox is empty
-            if not email_data.emails:
-                logger.info("🎉 No more unread emails!")
-                return False, None
-            
-            email = email_data.emails[0]
+        if email_data is None:
+            logger.error("No structured data returned")
+            return False, []
+        
+        if not emails:
+            logger.info("🎉 No more unread emails!")
+            return True, []
+        
+        for email in emails:
             thread_info = f" (Thread: {email.ThreadCount} messages)" if email.IsThread else ""
             logger.info(f"✓ Extracted: {email.Subject}{thread_info}")
-            return True, email
-        
-        logger.error("No structured data returned")
-        return False, None
+        return True, emails
     
-    async def delete_email(self, email_subject: str):
+    async def delete_email(self, email_subject: str) -> bool:
         """
         Delete the email from the main inbox view (for spam).
         
         Args:
             email_subject: Subject line of email to delete
+            
+        Returns:
+            True if the agent reported success
         """
         logger.info(f"🗑️  Deleting spam email: {email_subject[:50]}...")
         
-        goal = f"""
-Navigate to Gmail inbox and delete the email with subject: "{email_subject}"
-
-1. If you are not in the main Gmail inbox, tap the back arrow until you reach the inbox
-2. Find the email with subject "{email_subject}" in the inbox list
-3. Long-press the email to select it
-4. Tap the delete/trash icon in the action bar at the top
-5. Confirm the deletion if prompted
-6. Return to the main inbox view
-"""
-        config = get_droidrun_config(max_steps=20, config_path=self.config_path)
-        
-        agent = DroidAgent(
-            goal=goal,
-            config=config,
-            llms=get_llm(),
-            output_model=None
-        )
-        
-        result = await agent.run()
+        result = await self._run_agent(get_delete_inbox_email_goal(email_subject), max_steps=20, task="delete")
         if result.success:
             logger.info("✓ Email deleted")
         else:
             logger.warning(f"⚠️  Failed to delete: {result.reason}")
+        return result.success
     
-    async def archive_email(self, category: str, email_subject: str):
+    async def archive_email(self, category: str, email_subject: str) -> bool:
         """
         Archive the email from the main inbox view.
         Skips archiving for Urgent and Decision categories.
@@ -194,268 +378,374 @@ Navigate to Gmail inbox and delete the email with subject: "{email_subject}"
         Args:
             category: Email category (Urgent, Decision, etc.)
             email_subject: Subject line of email to archive
+            
+        Returns:
+            True if the email was handled (or needed no action)
         """
+        action = inbox_action_for(category)
+        
         # Don't archive urgent or decision emails - keep them in inbox
-        if category in ["Urgent", "Decision"]:
+        if action is None:
             logger.info(f"⏭️  Skipping archive for {category} - keeping in inbox")
-            return
+            return True
         
         # Delete spam emails instead of archiving
-        if category == "Spam":
-            await self.delete_email(email_subject)
-            return
+        if action == "delete":
+            return await self.delete_email(email_subject)
         
         logger.info(f"📥 Archiving email: {email_subject[:50]}...")
         
-        goal = get_archive_email_goal(email_subject)
-        config = get_droidrun_config(max_steps=15, config_path=self.config_path)
-        
-        agent = DroidAgent(
-            goal=goal,
-            config=config,
-            llms=get_llm(),
-            output_model=None
-        )
-        
-        result = await agent.run()
+        result = await self._run_agent(get_archive_email_goal(email_subject), max_steps=15, task="archive")
         if result.success:
             logger.info("✓ Email archived")
         else:
             logger.warning(f"⚠️  Failed to archive: {result.reason}")
+        return result.success
     
-    def is_email_processed(self, subject: str, sender_email: str) -> bool:
-        """Check if email was already processed."""
-        if self.extracted_file.exists():
-            try:
-                with open(self.extracted_file, "r", encoding='utf-8') as f:
-                    data = json.load(f)
-                    for email in data:
-                        if email.get("Subject") == subject and email.get("Email") == sender_email:
-                            return True
-            except:
-                pass
-        return False
+    async def _single_inbox_action(self, action: str, email_subject: str) -> bool:
+        """Fallback used by the action buffer for emails a batch run missed."""
+        if action == "delete":
+            return await self.delete_email(email_subject)
+        return await self.archive_email("Info", email_subject)
     
-    def save_raw_emails(self, email_list: List[EmailInfo]):
-        """Save raw extracted emails to JSON."""
-        if self.extracted_file.exists():
-            with open(self.extracted_file, "r", encoding='utf-8') as f:
-                try:
-                    data = json.load(f)
-                    if not isinstance(data, list):
-                        data = []
-                except json.JSONDecodeError:
-                    data = []
-        else:
-            data = []
-        
-        # Convert Pydantic models to dicts
-        new_emails = [email.model_dump() for email in email_list]
-        data.extend(new_emails)
-        
-        with open(self.extracted_file, "w", encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-        
-        logger.info(f"💾 Saved {len(new_emails)} raw email(s) to {self.extracted_file}")
+    def is_email_processed(self, email: EmailInfo) -> bool:
+        """Check if email was already processed (constant-time fingerprint lookup)."""
+        return self.dedup.contains(email.model_dump())
     
-    def save_categorized_emails(self, categorized: Dict):
-        """Append categorized emails to processed_emails.json for the dashboard."""
-        # Load existing data
-        if self.processed_file.exists():
-            with open(self.processed_file, "r", encoding='utf-8') as f:
-                try:
-                    dashboard_data = json.load(f)
-                    # Ensure all keys exist
-                    for key in ["urgent", "decisions", "calendar", "info", "spam"]:
-                        if key not in dashboard_data:
-                            dashboard_data[key] = []
-                except json.JSONDecodeError:
-                    dashboard_data = {
-                        "urgent": [],
-                        "decisions": [],
-                        "calendar": [],
-                        "info": [],
-                        "spam": []
-                    }
-        else:
-            dashboard_data = {
-                "urgent": [],
-                "decisions": [],
-                "calendar": [],
-                "info": [],
-                "spam": []
-            }
+    def _raw_payload(self, email: EmailInfo) -> Dict:
+        """Raw email as stored, tagged with the device it was read on."""
+        payload = email.model_dump()
+        if self.device_serial:
+            payload["Device"] = self.device_serial
+        return payload
+    
+    def save_raw_emails(self, email_list: List[EmailInfo]) -> List[int]:
+        """
+        Append raw extracted emails to the email store.
         
-        # Map categorized data to dashboard format
-        for email in categorized.get("urgent_emails", []):
-            dashboard_data["urgent"].append({
-                "id": f"urgent_{len(dashboard_data['urgent'])}",
-                "name": email.get("name", "Unknown"),
-                "email": email.get("email", ""),
-                "subject": email.get("subject", "No Subject"),
-                "date": email.get("date", "TBD"),
-                "time": email.get("time", "TBD"),
-                "summary": email.get("summary", ""),
-                "category": "urgent"
-            })
-        
-        for email in categorized.get("decision_emails", []):
-            dashboard_data["decisions"].append({
-                "id": f"decision_{len(dashboard_data['decisions'])}",
-                "name": email.get("name", "Unknown"),
-                "email": email.get("email", ""),
-                "subject": email.get("subject", "No Subject"),
-                "date": email.get("date", "TBD"),
-                "time": email.get("time", "TBD"),
-                "summary": email.get("summary", ""),
-                "category": "decisions"
-            })
-        
-        for email in categorized.get("calendar_emails", []):
-            dashboard_data["calendar"].append({
-                "id": f"calendar_{len(dashboard_data['calendar'])}",
-                "name": email.get("name", "Unknown"),
-                "email": email.get("email", ""),
-                "subject": email.get("subject", "No Subject"),
-                "date": email.get("date", "TBD"),
-                "time": email.get("time", "TBD"),
-                "purpose": email.get("purpose", "Meeting details not specified"),
-                "category": "calendar"
-            })
-        
-        for email in categorized.get("information_emails", []):
-            dashboard_data["info"].append({
-                "id": f"info_{len(dashboard_data['info'])}",
-                "name": email.get("name", "Unknown"),
-                "email": email.get("email", ""),
-                "subject": email.get("subject", "No Subject"),
-                "date": email.get("date", "TBD"),
-                "time": email.get("time", "TBD"),
-                "summary": email.get("summary", ""),
-                "category": "info"
-            })
-        
-        for email in categorized.get("spam_emails", []):
-            dashboard_data["spam"].append({
-                "id": f"spam_{len(dashboard_data['spam'])}",
-                "name": email.get("name", "Unknown"),
-                "email": email.get("email", ""),
-                "subject": email.get("subject", "No Subject"),
-                "date": email.get("date", "TBD"),
-                "time": email.get("time", "TBD"),
-                "summary": email.get("summary", "Unsolicited content"),
-                "category": "spam"
-            })
-        
-        with open(self.processed_file, "w", encoding='utf-8') as f:
-            json.dump(dashboard_data, f, indent=2, ensure_ascii=False)
-        
-        total = sum(len(v) for v in dashboard_data.values())
-        logger.info(f"💾 Saved {total} categorized email(s) to {self.processed_file}")
+        Returns:
+            Store ids of the saved emails
+        """
+        emails = [self._raw_payload(email) for email in email_list]
+        with span("save_raw", emails=len(emails)):
+            raw_ids = self.store.add_raw_emails(emails)
+        for email in emails:
+            self.dedup.add(email)
+        logger.info(f"💾 Saved {len(raw_ids)} raw email(s) to {self.store}")
+        return raw_ids
     
-    async def process_emails(self, max_emails: Optional[int] = None) -> Dict[str, int]:
+    def save_categorized_emails(
+        self,
+        categorized: Dict,
+        raw_id: Optional[int] = None,
+        source: Optional[Dict] = None,
+        origin: Optional[str] = None
+    ):
         """
-        Main email processing loop.
+        Append categorized emails to the email store for the dashboard.
         
         Args:
-            max_emails: Optional limit on number of emails to process
-            
-        Returns:
-            Dictionary with processing statistics
+            categorized: Gemini output with the 5 *_emails buckets
+            raw_id: Store id of the raw email the result belongs to
+            source: Raw email the result belongs to (fills missing fields
+                and records its device)
+            origin: Categorizer that produced the result (rules, gemini, ...)
         """
-        logger.info("="*60)
-        logger.info("InboxPilot - Email Triage Engine")
-        logger.info("="*60)
+        with span("save_categorized", raw_id=raw_id):
+            records = self.store.add_categorized(categorized, source=source, raw_id=raw_id, origin=origin)
+        logger.info(f"💾 Saved {len(records)} categorized email(s) to {self.store}")
+    
+    @staticmethod
+    def _primary_category(categorized: Dict) -> Optional[str]:
+        """Pick the inbox action category from Gemini buckets (waterfall order)."""
+        if categorized.get("urgent_emails"):
+            return "Urgent"
+        if categorized.get("decision_emails"):
+            return "Decision"
+        if categorized.get("calendar_emails"):
+            return "Calendar"
+        if categorized.get("spam_emails"):
+            return "Spam"
+        if categorized.get("information_emails"):
+            return "Info"
+        return None
+    
+    async def _extract_stage(self, max_emails: Optional[int]) -> AsyncIterator[Dict]:
+        """
+        Pipeline source: extract unread emails from the device and save them raw.
         
-        self._validate_api_key()
-        self.processed_count = 0
+        Each agent session walks up to `cursor.batch_size` unread emails; the
+        emails of a session are saved and yielded one by one, including the
+        ones a session returned before it failed. Unfinished emails of an
+        earlier, interrupted scan come first, without touching the device.
         
-        # Process emails one by one
+        Yields:
+            Work items {"email", "raw_id", "journal_id"} for new emails (resumed
+            ones also carry "categorized" or "category" past those stages), or
+            {"email", "category": "Info", "duplicate": True} for ones already seen
+        """
+        extracted = 0
         consecutive_failures = 0
         max_consecutive_failures = 3  # Stop after 3 consecutive extraction failures
         
+        for entry in self._resumed:
+            item = {"email": EmailInfo(**entry["email"]), "raw_id": entry["raw_id"], "journal_id": entry["id"]}
+            if entry["stage"] == "persisted":
+                item["category"] = entry["category"] or "Info"
+            elif entry["stage"] == "categorized":
+                item["categorized"] = entry["categorized"]
+                item["origin"] = entry["origin"]
+            extracted += 1
+            yield item
+        
         while True:
-            if max_emails and self.processed_count >= max_emails:
+            if max_emails and extracted >= max_emails:
                 logger.info(f"Reached limit of {max_emails} emails")
-                break
+                self._stop_reason = "limit"
+                return
             
-            success, email = await self.extract_next_email()
+            count = self.cursor.next_count(max_emails - extracted if max_emails else None)
+            skip_subjects = self.cursor.skip_subjects()
+            with span("extract", device=self.device_serial, requested=count) as attrs:
+                complete, emails = await self.extract_next_emails(count, skip_subjects)
+                attrs["extracted"] = len(emails)
+            self.cursor.advance(emails, count, complete)
             
-            if not success and not email:
+            if not emails:
+                if complete:
+                    logger.info("✅ No more unread emails found")
+                    self._stop_reason = "inbox_empty"
+                    return
+                
                 consecutive_failures += 1
                 logger.warning(f"⚠️  Extraction failed ({consecutive_failures}/{max_consecutive_failures})")
                 
                 if consecutive_failures >= max_consecutive_failures:
                     logger.error("❌ Too many consecutive extraction failures, stopping")
-                    break
+                    self._stop_reason = "extraction_failures"
+                    return
                 
                 # Continue to try next email despite failure
                 logger.info("🔄 Attempting to continue with next email...")
                 await asyncio.sleep(2)  # Brief pause before retry
                 continue
             
-            if not email:
-                logger.info("✅ No more unread emails found")
-                break
-            
-            # Reset failure counter on successful extraction
+            # Reset failure counter on successful (or partial) extraction
             consecutive_failures = 0
             
-            # Skip if already processed
-            if self.is_email_processed(email.Subject, email.Email):
-                logger.info("⏭️  Email already processed, skipping...")
-                await self.archive_email("Info", email.Subject)
-                continue
-            
-            # Save raw email
-            self.save_raw_emails([email])
-            
-            # Categorize with Gemini
-            email_dict = {"emails": [email.model_dump()]}
-            categorized = self.categorize_emails_with_gemini(email_dict)
-            
-            # Save categorized data for dashboard
-            self.save_categorized_emails(categorized)
-            
-            # Determine category
-            primary_category = None
-            if categorized.get("urgent_emails"):
-                primary_category = "Urgent"
-            elif categorized.get("decision_emails"):
-                primary_category = "Decision"
-            elif categorized.get("calendar_emails"):
-                primary_category = "Calendar"
-            elif categorized.get("spam_emails"):
-                primary_category = "Spam"
-            elif categorized.get("information_emails"):
-                primary_category = "Info"
-            
-            if primary_category:
-                logger.info(f"📋 Category: {primary_category}")
-            
-            # Archive if not urgent/decision
-            await self.archive_email(primary_category or "Info", email.Subject)
-            
+            for email in emails:
+                # Skip if already processed (still archived, as before)
+                if self.is_email_processed(email):
+                    logger.info("⏭️  Email already processed, skipping...")
+                    yield {"email": email, "category": "Info", "duplicate": True}
+                    continue
+                
+                # Save raw email
+                raw_id = self.save_raw_emails([email])[0]
+                journal_id = self.journal.record_extracted(
+                    self.session_id, self.device_serial, raw_id, email.model_dump()
+                )
+                extracted += 1
+                yield {"email": email, "raw_id": raw_id, "journal_id": journal_id}
+    
+    async def _categorize_stage(self, item: Dict) -> Dict:
+        """Pipeline stage: categorize with Gemini and save for the dashboard."""
+        if item.get("duplicate") or item.get("category"):
+            # Already seen, or resumed with its records already in the store
+            return item
+        
+        categorized, origin = item.get("categorized"), item.get("origin")
+        if categorized is None:
+            email_dict = {"emails": [item["email"].model_dump()]}
+            with span("categorize", raw_id=item["raw_id"]):
+                categorized, origin = await self._categorize(email_dict)
+            self.journal.mark_categorized(item["journal_id"], categorized, origin)
+        
+        # Save categorized data for dashboard
+        self.save_categorized_emails(
+            categorized, raw_id=item["raw_id"], source=self._raw_payload(item["email"]), origin=origin
+        )
+        
+        primary_category = self._primary_category(categorized)
+        if primary_category:
+            logger.info(f"📋 Category: {primary_category} - {item['email'].Subject[:50]}")
+        item["category"] = primary_category or "Info"
+        self.journal.mark_persisted(item["journal_id"], item["category"])
+        return item
+    
+    async def _action_stage(self, item: Dict) -> None:
+        """Pipeline stage: archive/delete on the device (skips urgent/decision)."""
+        with span("archive", category=item["category"]):
+            journal_id = item.get("journal_id")
+            if self.action_buffer is not None and inbox_action_for(item["category"]) is not None:
+                # Defer to a multi-select run; flush once enough emails are waiting
+                self.action_buffer.add(item["category"], item["email"].Subject, key=journal_id)
+                if journal_id is not None:
+                    self._awaiting_archive.add(journal_id)
+                if self.action_buffer.is_full():
+                    await self._flush_actions()
+            else:
+                done = await self.archive_email(item["category"], item["email"].Subject)
+                if done and journal_id is not None:
+                    self.journal.mark_archived([journal_id])
+        
+        if not item.get("duplicate"):
             self.processed_count += 1
             logger.info(f"Processed {self.processed_count} email(s)\n")
+            if self._on_progress:
+                self._on_progress(self.processed_count, self._max_emails)
+    
+    async def _flush_actions(self):
+        """Flush the action buffer and journal the emails whose action went through."""
+        outcomes = await self.action_buffer.flush()
+        archived = []
+        for results in outcomes.values():
+            for journal_id, succeeded in results.items():
+                if journal_id in self._awaiting_archive:
+                    self._awaiting_archive.discard(journal_id)
+                    if succeeded:
+                        archived.append(journal_id)
+        # Failed ones stay "persisted", so the next scan retries their action
+        self.journal.mark_archived(archived)
+    
+    async def process_emails(
+        self,
+        max_emails: Optional[int] = None,
+        categorize_workers: int = 2,
+        queue_size: int = 2,
+        batch_actions: bool = True,
+        action_batch_size: int = 10,
+        extract_batch_size: int = 5,
+        resume: bool = True,
+        on_progress: Optional[Callable[[int, Optional[int]], None]] = None
+    ) -> Dict:
+        """
+        Main email processing pipeline.
+        
+        Extraction feeds categorization, which feeds device actions, through
+        bounded queues, so Gemini works on one email while the device
+        extracts or archives another. Every email's progress is journaled,
+        and emails an interrupted scan of this device left unfinished are
+        picked up at their last stage before anything new is extracted.
+        
+        Args:
+            max_emails: Optional limit on number of emails to process
+            categorize_workers: Concurrent categorization consumers
+            queue_size: Max emails buffered between two stages (backpressure)
+            batch_actions: Collect archive/delete decisions and apply them in
+                multi-select agent runs instead of one agent run per email
+            action_batch_size: Max emails per multi-select run
+            extract_batch_size: Unread emails to walk per extraction agent
+                session (1 opens Gmail and searches again for every email)
+            resume: Finish the emails earlier scans of this device left
+                unfinished (journaled emails otherwise wait for a later scan)
+            on_progress: Optional callback (processed, max_emails) after each email
+            
+        Returns:
+            Dictionary with processing statistics and per-stage throughput/latency
+        """
+        logger.info("="*60)
+        logger.info("InboxPilot - Email Triage Engine")
+        if self.device_serial:
+            logger.info(f"Device: {self.device_serial}")
+        logger.info("="*60)
+        
+        self._validate_api_key()
+        self.processed_count = 0
+        self._on_progress = on_progress
+        self._max_emails = max_emails
+        self.cursor = ExtractionCursor(batch_size=extract_batch_size)
+        self.action_buffer = InboxActionBuffer(
+            run_agent=self._run_agent,
+            single_action=self._single_inbox_action,
+            batch_size=action_batch_size
+        ) if batch_actions else None
+        self._awaiting_archive = set()
+        self._stop_reason = None
+        self.session_id = self.journal.start_session(self.device_serial)
+        self._resumed = self.journal.resume(self.session_id, self.device_serial) if resume else []
+        if self._resumed:
+            logger.info(f"🔄 Resuming {len(self._resumed)} unfinished email(s) from an earlier scan")
+        
+        pipeline = (
+            Pipeline(queue_size=queue_size, source_name="extract")
+            .add_stage("categorize", self._categorize_stage, workers=categorize_workers)
+            .add_stage("act", self._action_stage)
+        )
+        try:
+            stage_stats = await pipeline.run(self._extract_stage(max_emails))
+            
+            action_stats = None
+            if self.action_buffer is not None:
+                with span("archive", category="final_flush"):
+                    await self._flush_actions()
+                action_stats = self.action_buffer.get_stats()
+        except asyncio.CancelledError:
+            self.journal.finish_session(self.session_id, "interrupted", "cancelled")
+            raise
+        except Exception as e:
+            self.journal.finish_session(self.session_id, "failed", str(e)[:500])
+            raise
+        status = "stopped" if self._stop_reason == "extraction_failures" else "completed"
+        self.journal.finish_session(self.session_id, status, self._stop_reason)
         
         logger.info("="*60)
         logger.info(f"Session Complete: {self.processed_count} emails processed")
+        logger.info(f"Wall time: {pipeline.wall_seconds:.1f}s")
+        extraction = self.cursor.get_stats()
+        logger.info(
+            f"Extraction: {extraction['emails']} emails in {extraction['sessions']} agent session(s)"
+        )
+        for name, stats in stage_stats.items():
+            logger.info(
+                f"  - {name}: {stats['processed']} ok / {stats['failed']} failed, "
+                f"p50 {stats['latency_p50']}s, utilization {stats['utilization']:.0%}"
+            )
         logger.info("="*60)
         
-        return {"processed": self.processed_count}
+        return {
+            "processed": self.processed_count,
+            "wall_seconds": round(pipeline.wall_seconds, 3),
+            "stages": stage_stats,
+            "actions": action_stats,
+            "extraction": self.cursor.get_stats(),
+            "session": {
+                "id": self.session_id,
+                "resumed": len(self._resumed),
+                "stop_reason": self._stop_reason,
+                "unfinished": self.journal.unfinished_count(self.device_serial or "")
+            }
+        }
 
 
 # Export for API usage
-def create_email_reader(config_path: Optional[str] = None, data_dir: str = "data") -> EmailReader:
+def create_email_reader(
+    config_path: Optional[str] = None,
+    data_dir: str = "data",
+    use_bloom_filter: bool = False,
+    device_serial: Optional[str] = None,
+    llm_timeout: Optional[float] = None,
+    email_token_budget: Optional[int] = DEFAULT_EMAIL_TOKEN_BUDGET
+) -> EmailReader:
     """
     Factory function to create EmailReader instance.
     
     Args:
         config_path: Optional path to custom config.yaml file
-        data_dir: Directory to store JSON data files
+        data_dir: Directory holding the email store
+        use_bloom_filter: Use a Bloom filter instead of an in-memory fingerprint set
+        device_serial: ADB serial of the device to scan
+        llm_timeout: Seconds to wait for Gemini before using the local model
+        email_token_budget: Estimated tokens of each email body sent to Gemini
         
     Returns:
         Configured EmailReader instance
     """
-    return EmailReader(config_path=config_path, data_dir=data_dir)
+    return EmailReader(
+        config_path=config_path,
+        data_dir=data_dir,
+        use_bloom_filter=use_bloom_filter,
+        device_serial=device_serial,
+        llm_timeout=llm_timeout,
+        email_token_budget=email_token_budget
+    )
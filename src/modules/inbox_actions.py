@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Inbox Actions Module
+Defers archive/delete decisions and applies them in multi-select agent runs
+MUST be called from web server - cannot be run standalone
+"""
+
+import asyncio
+import itertools
+import os
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from src.models import InboxActionResult
+from src.utils import setup_logger
+from src.prompts import get_batch_inbox_action_goal
+
+# Check if module is being imported by web server
+if not os.getenv("INBOXPILOT_WEBAPP_MODE"):
+    raise RuntimeError(
+        "This module cannot be run directly. "
+        "It must be called through the web server API. "
+        "Set INBOXPILOT_WEBAPP_MODE=1 to enable."
+    )
+
+logger = setup_logger(__name__)
+
+
+def inbox_action_for(category: Optional[str]) -> Optional[str]:
+    """
+    Inbox action for a triage category.
+
+    Returns:
+        "delete" for Spam, None for Urgent/Decision (kept in inbox), else "archive"
+    """
+    if category in ["Urgent", "Decision"]:
+        return None
+    if category == "Spam":
+        return "delete"
+    return "archive"
+
+
+class InboxActionBuffer:
+    """
+    Collects archive/delete decisions during a scan and flushes them in bulk.
+
+    Each flush runs one multi-select DroidAgent per action type (archive,
+    delete), checks the per-email outcome the agent reports (also when the
+    run stopped partway), and falls back to single-email actions for
+    anything it missed. Emails are tracked by a caller-supplied key, so two
+    emails with the same subject keep separate outcomes.
+    """
+
+    def __init__(
+        self,
+        run_agent: Callable[..., Awaitable],
+        single_action: Callable[[str, str], Awaitable[bool]],
+        batch_size: int = 10
+    ):
+        """
+        Initialize the action buffer.
+
+        Args:
+            run_agent: Runs a DroidAgent: (goal, max_steps, output_model, task) -> result
+            single_action: Fallback for one email: (action, subject) -> success
+            batch_size: Max emails per multi-select run
+        """
+        self.run_agent = run_agent
+        self.single_action = single_action
+        self.batch_size = batch_size
+        self.pending: Dict[str, List[Tuple[Hashable, str]]] = {"archive": [], "delete": []}
+        self._auto_keys = itertools.count()
+
+        self.batched_ok = 0
+        self.fallback_ok = 0
+        self.failed = 0
+        self.agent_runs = 0
+
+    def add(self, category: Optional[str], email_subject: str, key: Optional[Hashable] = None):
+        """Queue the inbox action for an email (no-op for Urgent/Decision)."""
+        action = inbox_action_for(category)
+        if action is None:
+            logger.info(f"⏭️  Skipping archive for {category} - keeping in inbox")
+            return
+        self.add_action(action, email_subject, key)
+
+    def add_action(self, action: str, email_subject: str, key: Optional[Hashable] = None):
+        """
+        Queue an explicit "archive" or "delete" for an email.
+
+        Args:
+            action: "archive" or "delete"
+            email_subject: Subject line the agent looks for
+            key: Identifies the email in flush() outcomes (e.g. its journal
+                id); a unique key is generated when omitted
+        """
+        if action not in self.pending:
+            raise ValueError(f"Unsupported inbox action: {action}")
+        self.pending[action].append((("auto", next(self._auto_keys)) if key is None else key, email_subject))
+
+    def is_full(self) -> bool:
+        """True once any action type has a full batch waiting."""
+        return any(len(items) >= self.batch_size for items in self.pending.values())
+
+    async def flush(self) -> Dict[str, Dict[Hashable, bool]]:
+        """
+        Apply every pending action.
+
+        A chunk whose run raised (e.g. the device went away) goes back to
+        the pending list for the next flush instead of being dropped.
+
+        Returns:
+            action -> {key: succeeded}
+        """
+        outcomes: Dict[str, Dict[Hashable, bool]] = {}
+        for action, items in self.pending.items():
+            while items:
+                chunk = items[:self.batch_size]
+                del items[:self.batch_size]
+                try:
+                    outcomes.setdefault(action, {}).update(await self._apply(action, chunk))
+                except asyncio.CancelledError:
+                    items[:0] = chunk
+                    raise
+                except Exception as e:
+                    items[:0] = chunk
+                    logger.error(f"✗ Batch {action} aborted, {len(chunk)} email(s) kept for the next flush: {e}")
+                    break
+        return outcomes
+
+    @staticmethod
+    def _reported_done(items: List[Tuple[Hashable, str]], report: InboxActionResult) -> Set[Hashable]:
+        """Keys the agent reported done, matched by list number, else by subject."""
+        done = set()
+        unmatched = list(items)
+        for entry in report.results:
+            if 1 <= entry.Index <= len(items) and items[entry.Index - 1][1] == entry.Subject:
+                match = items[entry.Index - 1]
+            else:
+                match = next((item for item in unmatched if item[1] == entry.Subject), None)
+            if match is None or match not in unmatched:
+                continue
+            unmatched.remove(match)
+            if entry.Done:
+                done.add(match[0])
+        return done
+
+    async def _apply(self, action: str, items: List[Tuple[Hashable, str]]) -> Dict[Hashable, bool]:
+        """One multi-select run, then single-email fallback for misses."""
+        logger.info(f"📦 Batch {action}: {len(items)} email(s)")
+
+        done = set()
+        if len(items) > 1:
+            self.agent_runs += 1
+            result = await self.run_agent(
+                get_batch_inbox_action_goal([subject for _, subject in items], action),
+                max_steps=10 + 4 * len(items),
+                output_model=InboxActionResult,
+                task=f"batch_{action}"
+            )
+            if result.structured_output:
+                # A run that stopped partway still reports the emails it already handled
+                done = self._reported_done(items, result.structured_output)
+            if not result.success:
+                logger.warning(f"⚠️  Batch {action} failed after {len(done)} email(s): {result.reason}")
+
+        outcomes = {}
+        for key, subject in items:
+            if key in done:
+                self.batched_ok += 1
+                outcomes[key] = True
+                continue
+
+            self.agent_runs += 1
+            try:
+                outcomes[key] = await self.single_action(action, subject)
+            except Exception as e:
+                logger.warning(f"⚠️  Single {action} failed: {e}")
+                outcomes[key] = False
+            if outcomes[key]:
+                self.fallback_ok += 1
+            else:
+                self.failed += 1
+
+        logger.info(f"✓ Batch {action}: {len(done)}/{len(items)} in one run")
+        return outcomes
+
+    def get_stats(self) -> Dict[str, int]:
+        """Batch vs. fallback counts."""
+        return {
+            "batched": self.batched_ok,
+            "fallback": self.fallback_ok,
+            "failed": self.failed,
+            "agent_runs": self.agent_runs
+        }
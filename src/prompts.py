@@ -4,28 +4,23 @@ All system prompts and goal strings for DroidRun and Gemini agents
 """
 
 import json
-from typing import Dict, Any
+from typing import Any, Dict, List, Optional
 
 
 # ============================================================================
 # EMAIL CATEGORIZATION PROMPTS (Gemini)
 # ============================================================================
 
-def get_email_categorization_prompt(email_data: Dict[str, Any]) -> str:
+def get_email_categorization_system_instruction() -> str:
     """
-    Generate prompt for Gemini to categorize emails into 5 buckets.
+    Static rules for Gemini to categorize emails into 5 buckets, sent as the
+    model's system instruction (the emails go in the user turn).
     
-    Args:
-        email_data: Dictionary containing email data to categorize
-        
     Returns:
-        Formatted prompt string for Gemini
+        System instruction string for Gemini
     """
-    return f"""
+    return """
     You are an intelligent email assistant for InboxPilot. Analyze the provided JSON of emails.
-    
-    Input Data:
-    {json.dumps(email_data)}
 
     **Categorization Rules (Waterfall Priority)**
     
@@ -57,34 +52,43 @@ def get_email_categorization_prompt(email_data: Dict[str, Any]) -> str:
     - "summary": 1-2 sentence summary explaining "who", "what", "why"
     
     **Output Format**
-    {{
-        "urgent_emails": [{{"name": str, "email": str, "subject": str, "date": str, "time": str, "summary": str}}],
-        "decision_emails": [{{"name": str, "email": str, "subject": str, "date": str, "time": str, "summary": str}}],
-        "calendar_emails": [{{"name": str, "email": str, "subject": str, "date": str, "time": str, "purpose": str}}],
-        "information_emails": [{{"name": str, "email": str, "subject": str, "date": str, "time": str, "summary": str}}],
-        "spam_emails": [{{"name": str, "email": str, "subject": str, "date": str, "time": str, "summary": str}}]
-    }}
+    {
+        "urgent_emails": [{"name": str, "email": str, "subject": str, "date": str, "time": str, "summary": str}],
+        "decision_emails": [{"name": str, "email": str, "subject": str, "date": str, "time": str, "summary": str}],
+        "calendar_emails": [{"name": str, "email": str, "subject": str, "date": str, "time": str, "purpose": str}],
+        "information_emails": [{"name": str, "email": str, "subject": str, "date": str, "time": str, "summary": str}],
+        "spam_emails": [{"name": str, "email": str, "subject": str, "date": str, "time": str, "summary": str}]
+    }
     
     CRITICAL: For calendar_emails, the "purpose" field MUST include venue and attendee information.
     For all other categories, use "summary" field instead.
     """
 
 
-def get_detailed_email_categorization_prompt(email_data: Dict[str, Any]) -> str:
+def get_batch_email_categorization_system_instruction() -> str:
     """
-    Extended categorization prompt with detailed rules (used in inboxpilot_engine).
+    Categorization rules for batches of emails that each carry an "id".
     
-    Args:
-        email_data: Dictionary containing email data to categorize
-        
     Returns:
-        Formatted prompt string for Gemini with detailed categorization rules
+        System instruction string for Gemini that asks for ids to be echoed back
     """
-    return f"""
-    You are an intelligent email assistant for InboxPilot. Analyze the provided JSON of emails.
+    return get_email_categorization_system_instruction() + """
+    **Batch Rules**
+    - Every input email has an "id" field. Copy it unchanged into an "id" field of its output entry.
+    - Place EVERY input email in EXACTLY ONE bucket. Do not merge, split or drop emails.
+    - The total number of output entries MUST equal the number of input emails.
+    """
+
+
+def get_detailed_email_categorization_system_instruction() -> str:
+    """
+    Extended categorization rules with detailed criteria (used by the email reader).
     
-    Input Data:
-    {json.dumps(email_data)}
+    Returns:
+        System instruction string for Gemini with detailed categorization rules
+    """
+    return """
+    You are an intelligent email assistant for InboxPilot. Analyze the provided JSON of emails.
 
     **Categorization Rules (Waterfall Priority)**
     
@@ -138,19 +142,76 @@ def get_detailed_email_categorization_prompt(email_data: Dict[str, Any]) -> str:
       - Be clear and concise
     
     **Output Format**
-    {{
-        "urgent_emails": [{{"name": str, "email": str, "subject": str, "date": str, "time": str, "summary": str}}],
-        "decision_emails": [{{"name": str, "email": str, "subject": str, "date": str, "time": str, "summary": str}}],
-        "calendar_emails": [{{"name": str, "email": str, "subject": str, "date": str, "time": str, "purpose": str}}],
-        "information_emails": [{{"name": str, "email": str, "subject": str, "date": str, "time": str, "summary": str}}],
-        "spam_emails": [{{"name": str, "email": str, "subject": str, "date": str, "time": str, "summary": str}}]
-    }}
+    {
+        "urgent_emails": [{"name": str, "email": str, "subject": str, "date": str, "time": str, "summary": str}],
+        "decision_emails": [{"name": str, "email": str, "subject": str, "date": str, "time": str, "summary": str}],
+        "calendar_emails": [{"name": str, "email": str, "subject": str, "date": str, "time": str, "purpose": str}],
+        "information_emails": [{"name": str, "email": str, "subject": str, "date": str, "time": str, "summary": str}],
+        "spam_emails": [{"name": str, "email": str, "subject": str, "date": str, "time": str, "summary": str}]
+    }
     
     CRITICAL: For calendar_emails, the "purpose" field MUST include venue and attendee information.
     For all other categories, use "summary" field instead.
     """
 
 
+def get_categorization_input_prompt(email_data: Dict[str, Any]) -> str:
+    """
+    User turn of a categorization request: only the emails, the rules are in
+    the system instruction.
+    
+    Args:
+        email_data: Dictionary containing email data to categorize
+        
+    Returns:
+        Prompt string for Gemini
+    """
+    return f"""
+    Input Data:
+    {json.dumps(email_data, ensure_ascii=False)}
+    """
+
+
+def get_email_categorization_prompt(email_data: Dict[str, Any]) -> str:
+    """
+    Single-turn prompt for Gemini to categorize emails into 5 buckets
+    (rules and emails in one message).
+    
+    Args:
+        email_data: Dictionary containing email data to categorize
+        
+    Returns:
+        Formatted prompt string for Gemini
+    """
+    return get_email_categorization_system_instruction() + get_categorization_input_prompt(email_data)
+
+
+def get_batch_email_categorization_prompt(email_data: Dict[str, Any]) -> str:
+    """
+    Single-turn categorization prompt for a batch of emails that each carry an "id".
+    
+    Args:
+        email_data: Dictionary with an "emails" list; every email has an "id" field
+        
+    Returns:
+        Formatted prompt string for Gemini that asks for ids to be echoed back
+    """
+    return get_batch_email_categorization_system_instruction() + get_categorization_input_prompt(email_data)
+
+
+def get_detailed_email_categorization_prompt(email_data: Dict[str, Any]) -> str:
+    """
+    Single-turn extended categorization prompt with detailed rules.
+    
+    Args:
+        email_data: Dictionary containing email data to categorize
+        
+    Returns:
+        Formatted prompt string for Gemini with detailed categorization rules
+    """
+    return get_detailed_email_categorization_system_instruction() + get_categorization_input_prompt(email_data)
+
+
 # ============================================================================
 # EMAIL EXTRACTION GOALS (DroidRun)
 # ============================================================================
@@ -204,6 +265,65 @@ def get_extract_next_email_goal() -> str:
     """.strip()
 
 
+def get_extract_emails_goal(count: int, skip_subjects: Optional[List[str]] = None) -> str:
+    """
+    Goal for DroidRun agent to extract the next `count` unread emails from
+    Gmail in one session (one app launch and one search for all of them).
+
+    Args:
+        count: Max number of emails to extract
+        skip_subjects: Subjects already extracted in this scan; results with
+            these subjects are passed over (they may still be listed)
+
+    Returns:
+        Goal string for DroidRun agent (use with EmailList output)
+    """
+    skip_block = ""
+    if skip_subjects:
+        skip_list = "\n".join(f'       - "{subject}"' for subject in skip_subjects)
+        skip_block = f"""
+       - SKIP (do not open) results with these subjects, they were already extracted:
+{skip_list}"""
+
+    return f"""
+    0. OPEN Gmail app (package: com.google.android.gm):
+       - Ensure you open the official Gmail app (com.google.android.gm)
+       - Wait for the app to fully load
+
+    1. SEARCH for unread emails ONCE:
+       - Tap the search bar at the top of Gmail
+       - Type the text: is:unread with clear: True
+       - Press Enter or tap the search button to execute the search
+       - Wait for search results to load
+       - IF the list is empty (no results), return an EMPTY 'EmailList' and STOP
+
+    2. WALK the search results from the top, extracting up to {count} emails:
+       - Tap the next result to open it (this marks it as read, but it stays in the
+         results list until the search is run again - do NOT search again)
+       - If it's a thread ("(2)", "(3)" next to the sender), use only the LATEST message{skip_block}
+
+    3. For each opened email, EXTRACT from the latest message only. If missing, use "Unknown":
+       - Name: Sender display name
+       - Email: Sender email address (in < > brackets)
+       - Subject: Email subject line
+       - Time: Timestamp of the most recent message (usually top right)
+       - Text: Main body content of the latest message only (no quoted history)
+       - IsThread / ThreadCount: whether it's a thread and how many messages it has
+
+    4. Tap the back arrow to return to the results list, then open the NEXT result
+       below the one you just read. To scroll DOWN for more results, swipe from
+       y=2000 to y=500.
+
+    5. STOP after {count} emails or when there are no more results.
+
+    6. Return ALL extracted emails in one 'EmailList', in the order you read them.
+       If you get stuck or something fails partway, return the emails you already
+       extracted instead of giving up - they must not be lost.
+
+    NOTE: We'll archive the emails from the main inbox after categorization.
+    """.strip()
+
+
 def get_archive_email_goal(email_subject: str) -> str:
     """
     Goal for DroidRun agent to archive an email from the Gmail inbox.
@@ -226,6 +346,67 @@ def get_archive_email_goal(email_subject: str) -> str:
     """.strip()
 
 
+def get_delete_inbox_email_goal(email_subject: str) -> str:
+    """
+    Goal for DroidRun agent to delete an email from the Gmail inbox.
+    
+    Args:
+        email_subject: Subject line of the email to delete
+        
+    Returns:
+        Goal string for DroidRun agent
+    """
+    return f"""
+Navigate to Gmail inbox and delete the email with subject: "{email_subject}"
+
+1. If you are not in the main Gmail inbox, tap the back arrow until you reach the inbox
+2. Find the email with subject "{email_subject}" in the inbox list
+3. Long-press the email to select it
+4. Tap the delete/trash icon in the action bar at the top
+5. Confirm the deletion if prompted
+6. Return to the main inbox view
+"""
+
+
+def get_batch_inbox_action_goal(email_subjects: List[str], action: str) -> str:
+    """
+    Goal for DroidRun agent to archive or delete several inbox emails in one
+    multi-select operation and report the outcome per email.
+    
+    Args:
+        email_subjects: Subject lines of the emails to act on
+        action: "archive" or "delete"
+        
+    Returns:
+        Goal string for DroidRun agent (use with InboxActionResult output)
+    """
+    if action == "delete":
+        toolbar_step = "Tap the Delete icon (trash can) in the top toolbar and confirm if prompted"
+        outcome = "deleted"
+    else:
+        toolbar_step = "Tap the Archive icon (box with down arrow) in the top toolbar"
+        outcome = "archived"
+    
+    subject_list = "\n".join(f'    {i}. "{subject}"' for i, subject in enumerate(email_subjects, 1))
+    
+    return f"""
+    {action.capitalize()} ALL of the following emails from the Gmail inbox in ONE multi-select operation:
+{subject_list}
+    
+    1. Make sure you're in the main inbox view (not search) - tap the back arrow until you reach it
+    2. Find the first email from the list and long press it to enter selection mode
+    3. Tap the sender avatar/checkbox of every other email from the list to add it to the selection
+       - To scroll DOWN for more emails, swipe from y=2000 to y=500
+       - Only select emails whose subject matches the list
+    4. {toolbar_step}
+    5. Wait for the selected emails to disappear from the inbox
+    
+    Return one result per email in the list above, in the same order, with its number
+    from the list as Index, the subject exactly as given and Done=true only if it was {outcome}. If an email could not be
+    found or selected, return Done=false for it.
+    """.strip()
+
+
 # ============================================================================
 # CALENDAR SCHEDULING GOALS (DroidRun)
 # ============================================================================
@@ -234,7 +415,8 @@ def get_calendar_event_goal(
     title: str,
     date: str,
     time: str,
-    description: str
+    description: str,
+    check_existing: bool = False
 ) -> str:
     """
     Goal for DroidRun agent to create a calendar event in Google Calendar.
@@ -244,10 +426,16 @@ def get_calendar_event_goal(
         date: Event date (YYYY-MM-DD format)
         time: Event time (e.g., "10:00 AM")
         description: Event description/purpose
+        check_existing: Look for the event on that date first and only
+            create it if it isn't there (after a run that may have saved it)
         
     Returns:
         Goal string for DroidRun agent
     """
+    existing_check = f"""
+Before creating anything: open {date} in the calendar and look for an event titled "{title}" at {time}.
+If it is already there, do NOT create it again - return to the main calendar view and finish.
+""" if check_existing else ""
     return f"""
 Open the Google Calendar app and schedule the following event:
 
@@ -255,7 +443,7 @@ Event Details:
 - Title: {title}
 - Date & Time: {date} at {time}
 - Description: {description}
-
+{existing_check}
 Execution Steps:
 1. Launch the 'Google Calendar' app
 2. Tap the '+' (Create/Add) button at the bottom right
@@ -278,6 +466,51 @@ Important Notes:
     """.strip()
 
 
+def get_batch_calendar_events_goal(events: List[Dict[str, str]]) -> str:
+    """
+    Goal for DroidRun agent to create several calendar events back to back in
+    one Google Calendar session and report the outcome per event.
+    
+    Args:
+        events: Events as dicts with "title", "date", "time" and "description"
+        
+    Returns:
+        Goal string for DroidRun agent (use with CalendarBatchResult output)
+    """
+    event_list = "\n".join(
+        f'{i}. Title: "{event["title"]}"\n'
+        f'   Date & Time: {event["date"]} at {event["time"]}\n'
+        f'   Description: "{event["description"]}"'
+        for i, event in enumerate(events, 1)
+    )
+    
+    return f"""
+Open the Google Calendar app and schedule ALL of the following events, one after another, without leaving the app:
+
+{event_list}
+
+Execution Steps (repeat for each event, in order):
+1. Launch the 'Google Calendar' app (only for the first event - stay in it afterwards)
+2. Tap the '+' (Create/Add) button at the bottom right
+3. Select 'Event' from the options
+4. In the 'Add title' field, type the event's title
+5. Set the event's date and time
+6. SCROLL DOWN to find the description field - swipe from bottom to top (e.g., from y=2000 to y=500)
+7. Tap 'Add description' and type the event's description
+8. Tap the 'Save' button and wait for the main calendar view before starting the next event
+
+IMPORTANT: To scroll DOWN (see more fields below), swipe UP on screen: from higher y-coordinate to lower y-coordinate (e.g., 550,2000 -> 550,500).
+
+Important Notes:
+- Do NOT add any guests to these events
+- Do NOT add a location - the venue is included in the description
+- If an event can't be created, discard it (back arrow, 'Discard') and continue with the next one
+
+Return one result per event in the list above, in the same order, with the title, date and time
+exactly as given and Created=true only if that event was saved.
+    """.strip()
+
+
 def get_close_calendar_goal() -> str:
     """
     Goal for DroidRun agent to close Google Calendar app.
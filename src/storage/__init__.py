@@ -0,0 +1,36 @@
+"""Storage backends for InboxPilot"""
+
+from .email_store import (
+    BUCKET_TO_CATEGORY,
+    CATEGORIES,
+    ORIGINS,
+    EmailStore,
+    SqliteEmailStore,
+    build_dashboard_records,
+    get_email_store,
+)
+from .dedup import BloomFilter, DedupIndex, email_fingerprint, get_dedup_index
+from .action_queue import ActionQueue, get_action_queue
+from .calendar_ledger import CalendarLedger, event_key, get_calendar_ledger
+from .scan_journal import ScanJournal, get_scan_journal
+
+__all__ = [
+    'ActionQueue',
+    'BUCKET_TO_CATEGORY',
+    'BloomFilter',
+    'CATEGORIES',
+    'CalendarLedger',
+    'DedupIndex',
+    'EmailStore',
+    'ORIGINS',
+    'ScanJournal',
+    'SqliteEmailStore',
+    'build_dashboard_records',
+    'email_fingerprint',
+    'event_key',
+    'get_action_queue',
+    'get_calendar_ledger',
+    'get_dedup_index',
+    'get_email_store',
+    'get_scan_journal',
+]
@@ -0,0 +1,330 @@
+"""
+Action Queue
+Durable queue of dashboard actions (archive, delete, restore, ...) for DroidRun executors
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from src.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+# Action lifecycle: queued -> leased -> completed | failed (or back to queued on retry)
+STATUSES = ("queued", "leased", "completed", "failed")
+
+
+class ActionQueue:
+    """
+    SQLite-backed action queue with lease/ack semantics.
+
+    Executors lease actions for a limited time; an action whose lease
+    expires without an ack becomes claimable again, so a crashed executor
+    never loses work and two executors never hold the same action.
+    Per-status counters are kept in memory and updated on each transition.
+    """
+
+    DB_NAME = "action_queue.db"
+
+    MIGRATIONS = [
+        """
+        CREATE TABLE actions (
+            id TEXT PRIMARY KEY,
+            action TEXT NOT NULL,
+            email_id TEXT,
+            payload TEXT,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            lease_owner TEXT,
+            lease_expires REAL,
+            error TEXT,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE INDEX idx_actions_status ON actions(status, created_at);
+        CREATE INDEX idx_actions_lease ON actions(status, lease_expires);
+        """,
+        # Device (ADB serial) whose mailbox the action applies to; NULL runs anywhere
+        """
+        ALTER TABLE actions ADD COLUMN device TEXT;
+        """,
+    ]
+
+    def __init__(self, data_dir: Path, max_attempts: int = 3):
+        """
+        Args:
+            data_dir: Directory holding the queue database
+            max_attempts: Leases per action before a failure is final
+        """
+        self.db_path = Path(data_dir) / self.DB_NAME
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max_attempts
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+
+        self._listeners: List[Callable[[Dict], None]] = []
+        self._counts = {status: 0 for status in STATUSES}
+        for row in self._conn.execute("SELECT status, COUNT(*) AS n FROM actions GROUP BY status"):
+            self._counts[row["status"]] = row["n"]
+
+    def __repr__(self) -> str:
+        return f"ActionQueue({self.db_path})"
+
+    def _migrate(self):
+        """Apply pending schema migrations."""
+        with self._lock, self._conn:
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            for target, script in enumerate(self.MIGRATIONS[version:], start=version + 1):
+                self._conn.executescript(script)
+                self._conn.execute(f"PRAGMA user_version = {target}")
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict:
+        return {
+            "id": row["id"],
+            "action": row["action"],
+            "emailId": row["email_id"],
+            "device": row["device"],
+            "payload": json.loads(row["payload"]) if row["payload"] else None,
+            "status": row["status"],
+            "attempts": row["attempts"],
+            "leaseOwner": row["lease_owner"],
+            "leaseExpires": row["lease_expires"],
+            "error": row["error"],
+            "timestamp": datetime.fromtimestamp(row["created_at"]).isoformat(),
+            "createdAt": row["created_at"],
+        }
+
+    def add_listener(self, listener: Callable[[Dict], None]):
+        """
+        Register a callback for newly queued actions, so workers can wait
+        for work instead of polling. Called from the enqueuing thread.
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[Dict], None]):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, action: Dict):
+        for listener in list(self._listeners):
+            try:
+                listener(action)
+            except Exception as e:
+                logger.warning(f"⚠️  Action queue listener failed: {e}")
+
+    def _transition(self, old: str, new: str):
+        self._counts[old] -= 1
+        self._counts[new] += 1
+
+    def enqueue(
+        self,
+        action: str,
+        email_id: Optional[str] = None,
+        payload: Optional[Dict] = None,
+        device: Optional[str] = None
+    ) -> Dict:
+        """
+        Add an action to the queue.
+
+        Args:
+            action: Action name ("archive", "delete", ...)
+            email_id: Email the action applies to
+            payload: Extra data for the executor (e.g. the subject)
+            device: Device that must run the action; None lets any device run it
+
+        Returns:
+            The queued action
+        """
+        now = time.time()
+        action_id = uuid.uuid4().hex
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT INTO actions (id, action, email_id, payload, device, status, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, 'queued', ?, ?)",
+                    (action_id, action, email_id,
+                     json.dumps(payload, ensure_ascii=False) if payload else None, device, now, now)
+                )
+            self._counts["queued"] += 1
+        queued = self.get(action_id)
+        self._notify(queued)
+        return queued
+
+    def get(self, action_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM actions WHERE id = ?", (action_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    @staticmethod
+    def _claimable_query(columns: str, device: Optional[str]) -> tuple:
+        """SELECT over claimable actions, optionally limited to those a device may run."""
+        device_filter = " AND (device IS NULL OR device = ?)" if device is not None else ""
+        query = (
+            f"SELECT {columns} FROM actions WHERE status = 'queued'{device_filter} "
+            "UNION ALL "
+            f"SELECT {columns} FROM actions WHERE status = 'leased' AND lease_expires < ?{device_filter} "
+            "ORDER BY created_at LIMIT ?"
+        )
+        params = (device, time.time(), device) if device is not None else (time.time(),)
+        return query, params
+
+    def claimable(self, limit: int = 50, device: Optional[str] = None) -> List[Dict]:
+        """Queued actions and actions whose lease has expired, oldest first."""
+        query, params = self._claimable_query("*", device)
+        with self._lock:
+            rows = self._conn.execute(query, params + (limit,)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def lease(
+        self,
+        owner: str,
+        limit: int = 1,
+        lease_seconds: float = 120.0,
+        device: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Claim up to `limit` actions for an executor.
+
+        Args:
+            owner: Executor identifier; only it can ack the leased actions
+            limit: Max actions to claim
+            lease_seconds: Time before an unacknowledged action is claimable again
+            device: Executor's device; only actions for it (or for any
+                device) are claimed. None claims every action.
+
+        Returns:
+            The leased actions
+        """
+        now = time.time()
+        query, params = self._claimable_query("id, status, created_at", device)
+        with self._lock:
+            with self._conn:
+                candidates = self._conn.execute(query, params + (limit,)).fetchall()
+                for row in candidates:
+                    self._conn.execute(
+                        "UPDATE actions SET status = 'leased', lease_owner = ?, lease_expires = ?, "
+                        "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                        (owner, now + lease_seconds, now, row["id"])
+                    )
+            for row in candidates:
+                self._transition(row["status"], "leased")
+        return [self.get(row["id"]) for row in candidates]
+
+    def renew(self, action_ids: List[str], owner: str, lease_seconds: float = 120.0) -> List[str]:
+        """
+        Extend leases an executor still holds, for work that outlasts one lease.
+
+        Args:
+            action_ids: Actions leased by the executor
+            owner: Executor identifier the leases belong to
+            lease_seconds: New lease length, from now
+
+        Returns:
+            Ids of the actions still leased by the owner (the others were
+            lost, e.g. expired and claimed by another executor)
+        """
+        now = time.time()
+        renewed = []
+        with self._lock:
+            with self._conn:
+                for action_id in action_ids:
+                    updated = self._conn.execute(
+                        "UPDATE actions SET lease_expires = ?, updated_at = ? "
+                        "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                        (now + lease_seconds, now, action_id, owner)
+                    ).rowcount
+                    if updated:
+                        renewed.append(action_id)
+        return renewed
+
+    def ack(self, action_id: str, owner: Optional[str] = None) -> bool:
+        """
+        Mark an action completed.
+
+        Args:
+            action_id: Action id
+            owner: Lease owner; if given, the ack only succeeds while it holds the lease
+
+        Returns:
+            True if the action was pending (and is now completed)
+        """
+        return self._finish(action_id, "completed", owner)
+
+    def nack(self, action_id: str, owner: Optional[str] = None, error: Optional[str] = None) -> bool:
+        """
+        Report a failed attempt. The action is requeued until it has used
+        max_attempts leases, then marked failed.
+
+        Returns:
+            True if the action was pending
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT attempts FROM actions WHERE id = ?", (action_id,)
+            ).fetchone()
+            if row is None:
+                return False
+            status = "failed" if row["attempts"] >= self.max_attempts else "queued"
+            return self._finish(action_id, status, owner, error)
+
+    def _finish(self, action_id: str, status: str, owner: Optional[str], error: Optional[str] = None) -> bool:
+        query = (
+            "UPDATE actions SET status = ?, lease_owner = NULL, lease_expires = NULL, "
+            "error = ?, updated_at = ? WHERE id = ? AND status = ?"
+        )
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, lease_owner FROM actions WHERE id = ?", (action_id,)
+            ).fetchone()
+            if row is None or row["status"] not in ("queued", "leased"):
+                return False
+            if owner is not None and (row["status"] != "leased" or row["lease_owner"] != owner):
+                return False
+            with self._conn:
+                updated = self._conn.execute(
+                    query, (status, error, time.time(), action_id, row["status"])
+                ).rowcount
+            if updated:
+                self._transition(row["status"], status)
+        if updated and status == "queued":
+            # A retry is new work for any waiting worker
+            self._notify(self.get(action_id))
+        return bool(updated)
+
+    def counts(self) -> Dict[str, int]:
+        """Number of actions per status."""
+        with self._lock:
+            return dict(self._counts)
+
+
+_queues: Dict[str, ActionQueue] = {}
+_queues_lock = threading.Lock()
+
+
+def get_action_queue(data_dir: Path) -> ActionQueue:
+    """
+    Get the process-wide action queue for a data directory.
+
+    Args:
+        data_dir: Directory holding the queue database
+
+    Returns:
+        ActionQueue instance
+    """
+    key = str(Path(data_dir).resolve())
+    with _queues_lock:
+        if key not in _queues:
+            _queues[key] = ActionQueue(Path(data_dir))
+        return _queues[key]
@@ -0,0 +1,114 @@
+"""
+Calendar Ledger
+Record of calendar events already created on the device, so reruns skip them
+"""
+
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+
+def event_key(subject: str, date: str, time_: str) -> str:
+    """
+    Ledger key of an event: its subject, date and time, case- and
+    whitespace-insensitive.
+    """
+    return "\x1f".join(re.sub(r"\s+", " ", (part or "").strip().lower()) for part in (subject, date, time_))
+
+
+class CalendarLedger:
+    """SQLite-backed set of created calendar events, keyed by subject, date and time."""
+
+    DB_NAME = "calendar_ledger.db"
+
+    MIGRATIONS = [
+        """
+        CREATE TABLE created_events (
+            key TEXT PRIMARY KEY,
+            subject TEXT NOT NULL,
+            date TEXT NOT NULL,
+            time TEXT NOT NULL,
+            device TEXT,
+            created_at REAL NOT NULL
+        );
+        """,
+    ]
+
+    def __init__(self, data_dir: Path):
+        """
+        Args:
+            data_dir: Directory holding the ledger database
+        """
+        self.db_path = Path(data_dir) / self.DB_NAME
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+
+    def __repr__(self) -> str:
+        return f"CalendarLedger({self.db_path})"
+
+    def _migrate(self):
+        """Apply pending schema migrations."""
+        with self._lock, self._conn:
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            for target, script in enumerate(self.MIGRATIONS[version:], start=version + 1):
+                self._conn.executescript(script)
+                self._conn.execute(f"PRAGMA user_version = {target}")
+
+    def contains(self, subject: str, date: str, time_: str) -> bool:
+        """Whether an event with this subject, date and time was already created."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM created_events WHERE key = ?", (event_key(subject, date, time_),)
+            ).fetchone()
+        return row is not None
+
+    def record(self, subject: str, date: str, time_: str, device: Optional[str] = None):
+        """Remember a created event."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO created_events (key, subject, date, time, device, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (event_key(subject, date, time_), subject, date, time_, device, time.time())
+            )
+
+    def forget(self, subject: str, date: str, time_: str) -> bool:
+        """Drop an event (e.g. deleted on the device) so it is created again."""
+        with self._lock, self._conn:
+            deleted = self._conn.execute(
+                "DELETE FROM created_events WHERE key = ?", (event_key(subject, date, time_),)
+            ).rowcount
+        return bool(deleted)
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM created_events").fetchone()[0]
+
+
+_ledgers: Dict[str, CalendarLedger] = {}
+_ledgers_lock = threading.Lock()
+
+
+def get_calendar_ledger(data_dir: Path) -> CalendarLedger:
+    """
+    Get the process-wide calendar ledger for a data directory.
+
+    Args:
+        data_dir: Directory holding the ledger database
+
+    Returns:
+        CalendarLedger instance
+    """
+    key = str(Path(data_dir).resolve())
+    with _ledgers_lock:
+        if key not in _ledgers:
+            _ledgers[key] = CalendarLedger(Path(data_dir))
+        return _ledgers[key]
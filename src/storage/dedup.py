@@ -0,0 +1,148 @@
+"""
+Email Deduplication
+Content fingerprints and a constant-time "already processed?" index
+"""
+
+import hashlib
+import math
+import threading
+from typing import Dict, Optional, Set
+
+from src.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def _normalize(value: Optional[str]) -> str:
+    """Lowercase and collapse whitespace so cosmetic differences don't change the hash."""
+    return " ".join((value or "").split()).lower()
+
+
+def email_fingerprint(email: Dict) -> str:
+    """
+    Content fingerprint of a raw email.
+
+    Built from sender address, subject, received time and a hash of the body,
+    so the same message extracted twice maps to the same key.
+
+    Args:
+        email: Raw email dict (EmailInfo fields)
+
+    Returns:
+        Hex SHA-256 fingerprint
+    """
+    body_hash = hashlib.sha256(_normalize(email.get("Text")).encode("utf-8")).hexdigest()
+    key = "\x1f".join([
+        _normalize(email.get("Email")),
+        _normalize(email.get("Subject")),
+        _normalize(email.get("Time")),
+        body_hash,
+    ])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over hex fingerprints (no false negatives)."""
+
+    def __init__(self, capacity: int = 100_000, error_rate: float = 0.001):
+        """
+        Args:
+            capacity: Expected number of items
+            error_rate: Target false-positive rate at capacity
+        """
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, fingerprint: str):
+        # Double hashing over two 64-bit halves of the (already uniform) fingerprint
+        h1 = int(fingerprint[:16], 16)
+        h2 = int(fingerprint[16:32], 16) | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, fingerprint: str):
+        for pos in self._positions(fingerprint):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, fingerprint: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(fingerprint))
+
+
+class DedupIndex:
+    """
+    Constant-time lookup of already-extracted emails.
+
+    By default all fingerprints are loaded from the store once and kept in a
+    set. With preload=False only a Bloom filter is kept in memory: definite
+    misses (the common case while scanning new mail) are answered without
+    touching disk, and possible hits are confirmed against the store's
+    fingerprint index.
+    """
+
+    def __init__(self, store, preload: bool = True, use_bloom: bool = False,
+                 bloom_capacity: int = 100_000):
+        """
+        Args:
+            store: EmailStore holding raw emails
+            preload: Keep every fingerprint in an in-memory set
+            use_bloom: Check a Bloom filter before the set/store lookup
+            bloom_capacity: Expected number of emails for sizing the filter
+        """
+        self.store = store
+        self._fingerprints: Optional[Set[str]] = set() if preload else None
+        self._bloom = BloomFilter(capacity=bloom_capacity) if use_bloom or not preload else None
+
+        for fingerprint in store.iter_fingerprints():
+            self._remember(fingerprint)
+
+        logger.info(
+            f"Dedup index ready ({'set' if preload else 'store'}"
+            f"{' + bloom' if self._bloom else ''})"
+        )
+
+    def _remember(self, fingerprint: str):
+        if self._fingerprints is not None:
+            self._fingerprints.add(fingerprint)
+        if self._bloom is not None:
+            self._bloom.add(fingerprint)
+
+    def contains(self, email: Dict) -> bool:
+        """True if an email with the same fingerprint was already saved."""
+        fingerprint = email_fingerprint(email)
+        if self._bloom is not None and fingerprint not in self._bloom:
+            return False
+        if self._fingerprints is not None:
+            return fingerprint in self._fingerprints
+        return self.store.has_fingerprint(fingerprint)
+
+    def add(self, email: Dict):
+        """Record a newly saved email."""
+        self._remember(email_fingerprint(email))
+
+
+_indexes: Dict[object, DedupIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_dedup_index(store, use_bloom: bool = False) -> DedupIndex:
+    """
+    Get the process-wide dedup index for an email store.
+
+    Readers scanning several devices at once share one index, so an email
+    saved from one mailbox is a duplicate for every other reader right away.
+    The first caller picks the index mode for the store.
+
+    Args:
+        store: EmailStore holding raw emails (one instance per data directory)
+        use_bloom: Keep only a Bloom filter in memory and confirm possible
+            hits against the store's fingerprint index
+
+    Returns:
+        DedupIndex instance
+    """
+    with _indexes_lock:
+        if store not in _indexes:
+            _indexes[store] = DedupIndex(store, preload=not use_bloom, use_bloom=use_bloom)
+        return _indexes[store]
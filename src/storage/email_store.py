@@ -0,0 +1,788 @@
+"""
+Email Store
+Append-only, indexed storage for raw and categorized emails
+"""
+
+import json
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.utils import setup_logger
+from .dedup import email_fingerprint
+
+logger = setup_logger(__name__)
+
+# Dashboard categories, in the order the API returns them
+CATEGORIES = ("urgent", "decisions", "calendar", "info", "spam")
+
+# Gemini output bucket -> dashboard category
+BUCKET_TO_CATEGORY = {
+    "urgent_emails": "urgent",
+    "decision_emails": "decisions",
+    "calendar_emails": "calendar",
+    "information_emails": "info",
+    "spam_emails": "spam",
+}
+
+# Dashboard category -> prefix used for record ids (e.g. "decision_3")
+ID_PREFIXES = {
+    "urgent": "urgent",
+    "decisions": "decision",
+    "calendar": "calendar",
+    "info": "info",
+    "spam": "spam",
+}
+
+
+# Categorizers a record can come from; only "gemini" records are LLM labels
+ORIGINS = ("gemini", "rules", "sender_memo", "local_model", "fallback")
+
+
+# Date formats Gemini tends to produce, normalized to ISO for range filters
+DATE_FORMATS = ("%Y-%m-%d", "%Y/%m/%d", "%m/%d/%Y", "%b %d, %Y", "%B %d, %Y", "%d %b %Y", "%d %B %Y")
+
+
+def normalize_date(value: Optional[str]) -> str:
+    """
+    ISO date (YYYY-MM-DD) for a record's date field, or "" if it can't be parsed.
+
+    Args:
+        value: Date as extracted by Gemini (e.g. "2025-10-12", "Oct 12, 2025", "TBD")
+    """
+    value = (value or "").strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return ""
+
+
+def build_dashboard_records(categorized: Dict, source: Optional[Dict] = None) -> List[Dict]:
+    """
+    Map Gemini bucket output to dashboard records (without ids).
+
+    Args:
+        categorized: Gemini output with the 5 *_emails buckets
+        source: Optional raw email used to fill fields Gemini left out
+            (and the device it was extracted on)
+
+    Returns:
+        List of dashboard records, each carrying its "category"
+    """
+    source = source or {}
+    records = []
+    for bucket, category in BUCKET_TO_CATEGORY.items():
+        for email in categorized.get(bucket, []):
+            record = {
+                "name": email.get("name", source.get("Name", "Unknown")),
+                "email": email.get("email", source.get("Email", "")),
+                "subject": email.get("subject", source.get("Subject", "No Subject")),
+                "date": email.get("date", "TBD"),
+                "time": email.get("time", "TBD"),
+            }
+            if category == "calendar":
+                record["purpose"] = email.get("purpose", "Meeting details not specified")
+            elif category == "spam":
+                record["summary"] = email.get("summary", "Unsolicited content")
+            else:
+                record["summary"] = email.get("summary", "")
+            if source.get("Device"):
+                # Mailbox the email was read from; device actions on it run there
+                record["device"] = source["Device"]
+            record["category"] = category
+            records.append(record)
+    return records
+
+
+class EmailStore(ABC):
+    """
+    Storage backend for raw extracted emails and categorized dashboard records.
+
+    Changes to categorized records are reported to listeners as events:
+    email_added, email_removed, email_moved (a recategorized email changed
+    category) and emails_replaced (records were rewritten under new ids).
+    """
+
+    def __init__(self):
+        self._listeners: List[Callable[[Dict], None]] = []
+
+    def add_listener(self, listener: Callable[[Dict], None]):
+        """
+        Register a change listener.
+
+        Listeners are called synchronously from the writing thread, in
+        write order, so they must be quick and must not block.
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[Dict], None]):
+        """Unregister a change listener."""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, events: List[Dict]):
+        for event in events:
+            for listener in list(self._listeners):
+                try:
+                    listener(event)
+                except Exception as e:
+                    logger.warning(f"⚠️  Store listener failed: {e}")
+
+    @abstractmethod
+    def add_raw_emails(self, emails: List[Dict]) -> List[int]:
+        """Append raw extracted emails and return their ids."""
+
+    @abstractmethod
+    def iter_raw_emails(self) -> Iterator[Tuple[int, Dict]]:
+        """Yield (raw_id, email) pairs in insertion order."""
+
+    @abstractmethod
+    def count_raw_emails(self) -> int:
+        """Number of stored raw emails."""
+
+    @abstractmethod
+    def iter_fingerprints(self) -> Iterator[str]:
+        """Yield the content fingerprint of every stored raw email."""
+
+    @abstractmethod
+    def has_fingerprint(self, fingerprint: str) -> bool:
+        """Indexed lookup of a raw email fingerprint."""
+
+    @abstractmethod
+    def add_emails(
+        self,
+        records: List[Dict],
+        raw_id: Optional[int] = None,
+        origin: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Append categorized dashboard records, assigning ids. Returns the stored records.
+
+        Args:
+            records: Dashboard records
+            raw_id: Store id of the raw email they came from
+            origin: Categorizer that produced them (see ORIGINS), if known
+        """
+
+    @abstractmethod
+    def replace_emails(
+        self,
+        entries: List[Tuple[Dict, Optional[int]]],
+        raw_ids: Optional[Iterable[int]] = None,
+        origins: Optional[Dict[int, str]] = None
+    ) -> None:
+        """
+        Atomically replace categorized records with (record, raw_id) entries.
+
+        Args:
+            entries: New records with the raw email each belongs to
+            raw_ids: Raw emails whose records are replaced (records without
+                a raw_id go too); None replaces every record. Records of
+                other raw emails, e.g. saved by a scan meanwhile, are kept.
+            origins: raw_id -> categorizer that produced its records
+        """
+
+    @abstractmethod
+    def list_emails(self, category: str) -> List[Dict]:
+        """All records of a category in insertion order."""
+
+    @abstractmethod
+    def get_email(self, email_id: str) -> Optional[Dict]:
+        """Record by id, or None."""
+
+    @abstractmethod
+    def remove_email(self, email_id: str, category: Optional[str] = None) -> Optional[Dict]:
+        """Remove a record by id (optionally only from one category). Returns it if found."""
+
+    @abstractmethod
+    def counts(self) -> Dict[str, int]:
+        """Number of records per category."""
+
+    @abstractmethod
+    def iter_sender_categories(
+        self,
+        exclude_origin: Optional[str] = None
+    ) -> Iterator[Tuple[str, str, float, Optional[int]]]:
+        """
+        Yield (sender address, category, received-at timestamp, raw_id) per
+        record, oldest first. The timestamp is when the raw email was saved,
+        which a recategorize doesn't change.
+
+        Args:
+            exclude_origin: Leave out records from this categorizer
+        """
+
+    @abstractmethod
+    def last_raw_id(self) -> int:
+        """Highest raw email id so far (0 when empty); raw ids only grow."""
+
+    @abstractmethod
+    def iter_labeled_emails(self, origin: Optional[str] = None) -> Iterator[Tuple[Dict, str]]:
+        """
+        Yield (raw email, category) pairs: every categorized record joined to
+        the raw email it came from (by raw_id, else by sender and subject).
+
+        Args:
+            origin: Only records from this categorizer (e.g. "gemini");
+                records of unknown origin are then left out
+        """
+
+    @abstractmethod
+    def query_emails(
+        self,
+        category: str,
+        limit: int = 50,
+        after: Optional[int] = None,
+        sender: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        text: Optional[str] = None
+    ) -> Tuple[List[Dict], Optional[int]]:
+        """
+        One page of a category's records, in insertion order.
+
+        Args:
+            category: Dashboard category
+            limit: Page size
+            after: Cursor returned by the previous page
+            sender: Exact sender name or address (case-insensitive)
+            since: Earliest email date (YYYY-MM-DD), inclusive
+            until: Latest email date (YYYY-MM-DD), inclusive
+            text: Words to search for in subject, summary and sender
+
+        Returns:
+            (records, cursor for the next page or None on the last page)
+        """
+
+    @property
+    @abstractmethod
+    def version(self) -> int:
+        """Counter bumped on every change to the categorized records."""
+
+    def add_categorized(
+        self,
+        categorized: Dict,
+        source: Optional[Dict] = None,
+        raw_id: Optional[int] = None,
+        origin: Optional[str] = None
+    ) -> List[Dict]:
+        """Append Gemini bucket output for one source email."""
+        return self.add_emails(build_dashboard_records(categorized, source), raw_id=raw_id, origin=origin)
+
+    def load_dashboard(self) -> Dict[str, List[Dict]]:
+        """All records grouped by category (processed_emails.json layout)."""
+        return {category: self.list_emails(category) for category in CATEGORIES}
+
+
+class SqliteEmailStore(EmailStore):
+    """
+    SQLite (WAL mode) email store.
+
+    Inserts are single-row appends and categories are served from an index,
+    so writes stay O(1) regardless of how many emails are already stored.
+    """
+
+    DB_NAME = "inboxpilot.db"
+    LEGACY_RAW_FILE = "extracted_email_threads.json"
+    LEGACY_PROCESSED_FILE = "processed_emails.json"
+
+    # Schema migrations, applied in order and tracked with PRAGMA user_version
+    MIGRATIONS = [
+        """
+        CREATE TABLE raw_emails (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            payload TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        );
+        CREATE TABLE categorized_emails (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            id TEXT NOT NULL UNIQUE,
+            category TEXT NOT NULL,
+            raw_id INTEGER,
+            payload TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        );
+        CREATE INDEX idx_categorized_category ON categorized_emails(category, seq);
+        """,
+        """
+        ALTER TABLE raw_emails ADD COLUMN fingerprint TEXT;
+        CREATE INDEX idx_raw_fingerprint ON raw_emails(fingerprint);
+        """,
+        """
+        ALTER TABLE categorized_emails ADD COLUMN sender_name TEXT;
+        ALTER TABLE categorized_emails ADD COLUMN sender_email TEXT;
+        ALTER TABLE categorized_emails ADD COLUMN email_date TEXT;
+        UPDATE categorized_emails SET
+            sender_name = lower(trim(coalesce(json_extract(payload, '$.name'), ''))),
+            sender_email = lower(trim(coalesce(json_extract(payload, '$.email'), '')));
+        CREATE INDEX idx_categorized_sender_name ON categorized_emails(category, sender_name, seq);
+        CREATE INDEX idx_categorized_sender_email ON categorized_emails(category, sender_email, seq);
+        CREATE INDEX idx_categorized_date ON categorized_emails(category, email_date, seq);
+
+        CREATE VIRTUAL TABLE categorized_fts USING fts5(subject, body, sender);
+        INSERT INTO categorized_fts (rowid, subject, body, sender)
+            SELECT seq,
+                   coalesce(json_extract(payload, '$.subject'), ''),
+                   coalesce(json_extract(payload, '$.summary'), json_extract(payload, '$.purpose'), ''),
+                   coalesce(json_extract(payload, '$.name'), '') || ' ' || coalesce(json_extract(payload, '$.email'), '')
+            FROM categorized_emails;
+        CREATE TRIGGER categorized_fts_insert AFTER INSERT ON categorized_emails BEGIN
+            INSERT INTO categorized_fts (rowid, subject, body, sender) VALUES (
+                new.seq,
+                coalesce(json_extract(new.payload, '$.subject'), ''),
+                coalesce(json_extract(new.payload, '$.summary'), json_extract(new.payload, '$.purpose'), ''),
+                coalesce(json_extract(new.payload, '$.name'), '') || ' ' || coalesce(json_extract(new.payload, '$.email'), '')
+            );
+        END;
+        CREATE TRIGGER categorized_fts_delete AFTER DELETE ON categorized_emails BEGIN
+            DELETE FROM categorized_fts WHERE rowid = old.seq;
+        END;
+        """,
+        # Categorizer that produced each record (see ORIGINS); NULL for older records
+        # except processed_emails.json imports (raw_id NULL), which Gemini alone categorized
+        """
+        ALTER TABLE categorized_emails ADD COLUMN origin TEXT;
+        UPDATE categorized_emails SET origin = 'gemini' WHERE raw_id IS NULL;
+        """,
+    ]
+
+    def __init__(self, data_dir: Path):
+        """
+        Open (or create) the store.
+
+        Args:
+            data_dir: Directory holding the database and any legacy JSON files
+        """
+        super().__init__()
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.data_dir / self.DB_NAME
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+
+        self._migrate()
+        self._next_index = {category: 0 for category in CATEGORIES}
+        self._counts = self._load_counts()
+        self._version = 0
+        self._import_legacy_json()
+        self._next_index = self._load_next_index()
+        self._counts = self._load_counts()
+
+    def __repr__(self) -> str:
+        return f"SqliteEmailStore({self.db_path})"
+
+    def _migrate(self):
+        """Apply pending schema migrations."""
+        with self._lock, self._conn:
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            for target, script in enumerate(self.MIGRATIONS[version:], start=version + 1):
+                self._conn.executescript(script)
+                self._conn.execute(f"PRAGMA user_version = {target}")
+
+            # Backfill fingerprints for rows written before they existed
+            missing = self._conn.execute(
+                "SELECT id, payload FROM raw_emails WHERE fingerprint IS NULL"
+            ).fetchall()
+            for row in missing:
+                self._conn.execute(
+                    "UPDATE raw_emails SET fingerprint = ? WHERE id = ?",
+                    (email_fingerprint(json.loads(row["payload"])), row["id"])
+                )
+
+            # Backfill normalized dates (parsed in Python, "" when unparseable)
+            undated = self._conn.execute(
+                "SELECT seq, payload FROM categorized_emails WHERE email_date IS NULL"
+            ).fetchall()
+            for row in undated:
+                self._conn.execute(
+                    "UPDATE categorized_emails SET email_date = ? WHERE seq = ?",
+                    (normalize_date(json.loads(row["payload"]).get("date")), row["seq"])
+                )
+
+    def _load_next_index(self) -> Dict[str, int]:
+        """Next free numeric id suffix per category, so ids are never reused."""
+        next_index = {category: 0 for category in CATEGORIES}
+        for row in self._conn.execute("SELECT id, category FROM categorized_emails"):
+            suffix = row["id"].rsplit("_", 1)[-1]
+            if row["category"] in next_index and suffix.isdigit():
+                next_index[row["category"]] = max(next_index[row["category"]], int(suffix) + 1)
+        return next_index
+
+    def _import_legacy_json(self):
+        """One-time import of processed/extracted JSON files into an empty store."""
+        raw_file = self.data_dir / self.LEGACY_RAW_FILE
+        processed_file = self.data_dir / self.LEGACY_PROCESSED_FILE
+
+        if self.count_raw_emails() == 0 and raw_file.exists():
+            try:
+                with open(raw_file, "r", encoding="utf-8") as f:
+                    raw = json.load(f)
+                if isinstance(raw, list):
+                    self.add_raw_emails(raw)
+                    logger.info(f"Imported {len(raw)} raw email(s) from {raw_file}")
+            except json.JSONDecodeError as e:
+                logger.warning(f"⚠️  Could not import {raw_file}: {e}")
+
+        if sum(self.counts().values()) == 0 and processed_file.exists():
+            try:
+                with open(processed_file, "r", encoding="utf-8") as f:
+                    dashboard = json.load(f)
+                if isinstance(dashboard, dict):
+                    seen_ids = set()
+                    imported = 0
+                    with self._lock, self._conn:
+                        for category in CATEGORIES:
+                            for index, record in enumerate(dashboard.get(category, [])):
+                                record = dict(record, category=category)
+                                if not record.get("id") or record["id"] in seen_ids:
+                                    record["id"] = f"{ID_PREFIXES[category]}_legacy_{imported}_{index}"
+                                seen_ids.add(record["id"])
+                                self._insert_email(record, None, origin="gemini")
+                                imported += 1
+                    logger.info(f"Imported {imported} categorized email(s) from {processed_file}")
+            except json.JSONDecodeError as e:
+                logger.warning(f"⚠️  Could not import {processed_file}: {e}")
+
+    def add_raw_emails(self, emails: List[Dict]) -> List[int]:
+        now = datetime.now().isoformat()
+        ids = []
+        with self._lock, self._conn:
+            for email in emails:
+                cursor = self._conn.execute(
+                    "INSERT INTO raw_emails (payload, fingerprint, created_at) VALUES (?, ?, ?)",
+                    (json.dumps(email, ensure_ascii=False), email_fingerprint(email), now)
+                )
+                ids.append(cursor.lastrowid)
+        return ids
+
+    def iter_raw_emails(self) -> Iterator[Tuple[int, Dict]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT id, payload FROM raw_emails ORDER BY id").fetchall()
+        for row in rows:
+            yield row["id"], json.loads(row["payload"])
+
+    def count_raw_emails(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM raw_emails").fetchone()[0]
+
+    def iter_fingerprints(self) -> Iterator[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT fingerprint FROM raw_emails").fetchall()
+        for row in rows:
+            yield row["fingerprint"]
+
+    def has_fingerprint(self, fingerprint: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM raw_emails WHERE fingerprint = ? LIMIT 1", (fingerprint,)
+            ).fetchone()
+        return row is not None
+
+    def _load_counts(self) -> Dict[str, int]:
+        """Per-category record counts, kept up to date incrementally afterwards."""
+        counts = {category: 0 for category in CATEGORIES}
+        with self._lock:
+            for row in self._conn.execute(
+                "SELECT category, COUNT(*) AS n FROM categorized_emails GROUP BY category"
+            ):
+                counts[row["category"]] = row["n"]
+        return counts
+
+    def _insert_email(
+        self,
+        record: Dict,
+        raw_id: Optional[int],
+        created_at: Optional[str] = None,
+        origin: Optional[str] = None
+    ) -> Dict:
+        """Insert one record inside an open transaction, assigning an id if needed."""
+        category = record["category"]
+        if category not in self._next_index:
+            raise ValueError(f"Unknown category: {category}")
+
+        if not record.get("id"):
+            record = dict(record, id=f"{ID_PREFIXES[category]}_{self._next_index[category]}")
+            self._next_index[category] += 1
+
+        self._conn.execute(
+            "INSERT INTO categorized_emails "
+            "(id, category, raw_id, payload, created_at, sender_name, sender_email, email_date, origin) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (record["id"], category, raw_id,
+             json.dumps(record, ensure_ascii=False), created_at or datetime.now().isoformat(),
+             str(record.get("name") or "").strip().lower(),
+             str(record.get("email") or "").strip().lower(),
+             normalize_date(record.get("date")), origin)
+        )
+        return record
+
+    def add_emails(
+        self,
+        records: List[Dict],
+        raw_id: Optional[int] = None,
+        origin: Optional[str] = None
+    ) -> List[Dict]:
+        if not records:
+            return []
+        with self._lock:
+            with self._conn:
+                stored = [self._insert_email(record, raw_id, origin=origin) for record in records]
+            for record in stored:
+                self._counts[record["category"]] += 1
+            self._version += 1
+            self._notify([
+                {
+                    "type": "email_added",
+                    "version": self._version,
+                    "category": record["category"],
+                    "email": record,
+                    "raw_id": raw_id,
+                    "origin": origin,
+                }
+                for record in stored
+            ])
+        return stored
+
+    def replace_emails(
+        self,
+        entries: List[Tuple[Dict, Optional[int]]],
+        raw_ids: Optional[Iterable[int]] = None,
+        origins: Optional[Dict[int, str]] = None
+    ) -> None:
+        origins = origins or {}
+        if raw_ids is None:
+            scope, params = "1", ()
+        else:
+            scope = "raw_id IS NULL OR raw_id IN (SELECT value FROM json_each(?))"
+            params = (json.dumps(sorted(set(raw_ids))),)
+        with self._lock:
+            with self._conn:
+                previous = self._conn.execute(
+                    f"SELECT id, category, raw_id, created_at FROM categorized_emails WHERE {scope}", params
+                ).fetchall()
+                # Rewritten records keep when their email was first categorized
+                created = {}
+                for row in previous:
+                    if row["raw_id"] is not None:
+                        first = created.get(row["raw_id"], row["created_at"])
+                        created[row["raw_id"]] = min(first, row["created_at"])
+                self._conn.execute(f"DELETE FROM categorized_emails WHERE {scope}", params)
+                # New ids continue the counters, so no id ever points at a different email
+                stored = []
+                for record, raw_id in entries:
+                    record = {k: v for k, v in record.items() if k != "id"}
+                    stored.append((
+                        self._insert_email(record, raw_id, created.get(raw_id), origins.get(raw_id)), raw_id
+                    ))
+            self._counts = self._load_counts()
+            self._version += 1
+            self._notify(self._moved_events(previous, stored) + [
+                {"type": "emails_replaced", "version": self._version, "counts": dict(self._counts)}
+            ])
+
+    def _moved_events(self, previous: List[sqlite3.Row], stored: List[Tuple[Dict, Optional[int]]]) -> List[Dict]:
+        """email_moved events for raw emails whose single record changed category."""
+        before: Dict[int, List[sqlite3.Row]] = {}
+        for row in previous:
+            if row["raw_id"] is not None:
+                before.setdefault(row["raw_id"], []).append(row)
+        after: Dict[int, List[Dict]] = {}
+        for record, raw_id in stored:
+            if raw_id is not None:
+                after.setdefault(raw_id, []).append(record)
+
+        events = []
+        for raw_id, records in after.items():
+            old = before.get(raw_id, [])
+            if len(old) == 1 and len(records) == 1 and old[0]["category"] != records[0]["category"]:
+                events.append({
+                    "type": "email_moved",
+                    "version": self._version,
+                    "old_id": old[0]["id"],
+                    "from": old[0]["category"],
+                    "category": records[0]["category"],
+                    "email": records[0],
+                })
+        return events
+
+    def list_emails(self, category: str) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT payload FROM categorized_emails WHERE category = ? ORDER BY seq",
+                (category,)
+            ).fetchall()
+        return [json.loads(row["payload"]) for row in rows]
+
+    def query_emails(
+        self,
+        category: str,
+        limit: int = 50,
+        after: Optional[int] = None,
+        sender: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        text: Optional[str] = None
+    ) -> Tuple[List[Dict], Optional[int]]:
+        # Every filter is served by a (category, column, seq) index or the FTS index
+        clauses = ["category = ?"]
+        params: List = [category]
+        if after is not None:
+            clauses.append("seq > ?")
+            params.append(after)
+        if sender:
+            clauses.append("(sender_name = ? OR sender_email = ?)")
+            params += [sender.strip().lower()] * 2
+        if since:
+            clauses.append("email_date >= ?")
+            params.append(since)
+        if until:
+            clauses.append("email_date <= ? AND email_date != ''")
+            params.append(until)
+        if text:
+            # Quote each word so user input can't form FTS operators; prefix-match the words
+            terms = [word.replace('"', '""') for word in text.split()]
+            if terms:
+                clauses.append("seq IN (SELECT rowid FROM categorized_fts WHERE categorized_fts MATCH ?)")
+                params.append(" ".join(f'"{term}"*' for term in terms))
+
+        query = (
+            "SELECT seq, payload FROM categorized_emails WHERE "
+            + " AND ".join(clauses)
+            + " ORDER BY seq LIMIT ?"
+        )
+        params.append(limit + 1)
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        page = rows[:limit]
+        cursor = page[-1]["seq"] if len(rows) > limit else None
+        return [json.loads(row["payload"]) for row in page], cursor
+
+    def get_email(self, email_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM categorized_emails WHERE id = ?", (email_id,)
+            ).fetchone()
+        return json.loads(row["payload"]) if row else None
+
+    def remove_email(self, email_id: str, category: Optional[str] = None) -> Optional[Dict]:
+        query = "SELECT seq, category, payload FROM categorized_emails WHERE id = ?"
+        params: Tuple = (email_id,)
+        if category:
+            query += " AND category = ?"
+            params += (category,)
+
+        with self._lock:
+            with self._conn:
+                row = self._conn.execute(query, params).fetchone()
+                if row is None:
+                    return None
+                self._conn.execute("DELETE FROM categorized_emails WHERE seq = ?", (row["seq"],))
+            self._counts[row["category"]] -= 1
+            self._version += 1
+            self._notify([
+                {"type": "email_removed", "version": self._version, "category": row["category"], "id": email_id}
+            ])
+        return json.loads(row["payload"])
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    def iter_sender_categories(
+        self,
+        exclude_origin: Optional[str] = None
+    ) -> Iterator[Tuple[str, str, float, Optional[int]]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT c.sender_email, c.category, coalesce(r.created_at, c.created_at) AS at, c.raw_id "
+                "FROM categorized_emails c LEFT JOIN raw_emails r ON r.id = c.raw_id "
+                "WHERE c.sender_email != '' AND (c.origin IS NULL OR c.origin != ?) ORDER BY c.seq",
+                (exclude_origin or "",)
+            ).fetchall()
+        for row in rows:
+            at = datetime.fromisoformat(row["at"]).timestamp()
+            yield row["sender_email"], row["category"], at, row["raw_id"]
+
+    def last_raw_id(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT coalesce(MAX(id), 0) FROM raw_emails").fetchone()[0]
+
+    def iter_labeled_emails(self, origin: Optional[str] = None) -> Iterator[Tuple[Dict, str]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT r.payload AS raw, c.category FROM categorized_emails c "
+                "JOIN raw_emails r ON r.id = c.raw_id "
+                + ("WHERE c.origin = ? " if origin else "")
+                + "ORDER BY c.seq",
+                (origin,) if origin else ()
+            ).fetchall()
+            # Records imported from processed_emails.json carry no raw_id
+            legacy = self._conn.execute(
+                "SELECT payload, category FROM categorized_emails WHERE raw_id IS NULL "
+                + ("AND origin = ? " if origin else "")
+                + "ORDER BY seq",
+                (origin,) if origin else ()
+            ).fetchall()
+        for row in rows:
+            yield json.loads(row["raw"]), row["category"]
+        if not legacy:
+            return
+
+        def key(sender: Optional[str], subject: Optional[str]) -> Tuple[str, str]:
+            return (sender or "").strip().lower(), " ".join((subject or "").lower().split())
+
+        raw_by_key = {}
+        for _, email in self.iter_raw_emails():
+            raw_by_key.setdefault(key(email.get("Email"), email.get("Subject")), email)
+        for row in legacy:
+            record = json.loads(row["payload"])
+            email = raw_by_key.get(key(record.get("email"), record.get("subject")))
+            if email is not None:
+                yield email, row["category"]
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+
+# Registered backends, selectable by name
+BACKENDS = {
+    "sqlite": SqliteEmailStore,
+}
+
+_stores: Dict[Tuple[str, str], EmailStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_email_store(data_dir: Path, backend: str = "sqlite") -> EmailStore:
+    """
+    Get the process-wide store for a data directory.
+
+    The scan, recategorize and dashboard code paths all share one instance
+    per directory so they read and write through the same connection.
+
+    Args:
+        data_dir: Directory holding email data
+        backend: Name of a registered backend (see BACKENDS)
+
+    Returns:
+        EmailStore instance
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown email store backend: {backend}")
+
+    key = (str(Path(data_dir).resolve()), backend)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = BACKENDS[backend](Path(data_dir))
+        return _stores[key]
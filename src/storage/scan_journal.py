@@ -0,0 +1,275 @@
+"""
+Scan Journal
+Per-email stage of every scan session, so an interrupted scan can be resumed
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Stages an email goes through during a scan, in order
+STAGES = ("extracted", "categorized", "persisted", "archived")
+
+
+class ScanJournal:
+    """
+    SQLite-backed journal of scan sessions and the emails they handled.
+
+    Every email is recorded once its raw copy is saved ("extracted"), then
+    advanced as its Gemini result comes back ("categorized", with the result
+    kept), is written to the email store ("persisted") and its inbox action
+    is done ("archived"). A later scan on the same device picks up every
+    email that didn't reach "archived" and continues from its last stage,
+    instead of extracting and categorizing it again. Emails resumed
+    `max_attempts` times without finishing are marked "abandoned".
+    """
+
+    DB_NAME = "scan_journal.db"
+
+    MIGRATIONS = [
+        """
+        CREATE TABLE scan_sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            device TEXT NOT NULL,
+            status TEXT NOT NULL,
+            started_at REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            finished_at REAL,
+            resumed INTEGER NOT NULL DEFAULT 0,
+            stop_reason TEXT
+        );
+        CREATE TABLE scan_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id INTEGER NOT NULL REFERENCES scan_sessions(id),
+            device TEXT NOT NULL,
+            raw_id INTEGER,
+            subject TEXT NOT NULL,
+            email TEXT NOT NULL,
+            stage TEXT NOT NULL,
+            categorized TEXT,
+            category TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            updated_at REAL NOT NULL
+        );
+        CREATE INDEX idx_scan_items_open ON scan_items (device, stage);
+        CREATE INDEX idx_scan_items_session ON scan_items (session_id);
+        """,
+        # Categorizer of the kept result, carried into the email store on resume
+        """
+        ALTER TABLE scan_items ADD COLUMN origin TEXT;
+        """,
+    ]
+
+    def __init__(self, data_dir: Path, max_attempts: int = 3, retention_days: float = 7.0):
+        """
+        Args:
+            data_dir: Directory holding the journal database
+            max_attempts: Resumes after which an unfinished email is abandoned
+            retention_days: Age after which finished sessions and their
+                archived emails are dropped
+        """
+        self.db_path = Path(data_dir) / self.DB_NAME
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max_attempts
+        self.retention = retention_days * 86400.0
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+
+    def __repr__(self) -> str:
+        return f"ScanJournal({self.db_path})"
+
+    def _migrate(self):
+        """Apply pending schema migrations."""
+        with self._lock, self._conn:
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            for target, script in enumerate(self.MIGRATIONS[version:], start=version + 1):
+                self._conn.executescript(script)
+                self._conn.execute(f"PRAGMA user_version = {target}")
+
+    def start_session(self, device: Optional[str] = None) -> int:
+        """
+        Open a scan session for a device.
+
+        Sessions of the device still marked running (the process died mid-scan)
+        are marked interrupted, and old finished sessions are pruned.
+
+        Returns:
+            Session id
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE scan_sessions SET status = 'interrupted', finished_at = ? "
+                "WHERE device = ? AND status = 'running'",
+                (now, device or "")
+            )
+            self._prune(now)
+            return self._conn.execute(
+                "INSERT INTO scan_sessions (device, status, started_at, updated_at) VALUES (?, 'running', ?, ?)",
+                (device or "", now, now)
+            ).lastrowid
+
+    def finish_session(self, session_id: int, status: str = "completed", stop_reason: Optional[str] = None):
+        """Close a session as completed, stopped (e.g. extraction kept failing) or failed."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE scan_sessions SET status = ?, stop_reason = ?, finished_at = ?, updated_at = ? WHERE id = ?",
+                (status, stop_reason, now, now, session_id)
+            )
+
+    def resume(self, session_id: int, device: Optional[str] = None) -> List[Dict]:
+        """
+        Move a device's unfinished emails from earlier sessions into this one.
+
+        Returns:
+            Items {"id", "raw_id", "email", "stage", "categorized", "origin",
+            "category"}, oldest first
+        """
+        now = time.time()
+        device = device or ""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE scan_items SET stage = 'abandoned', updated_at = ? "
+                "WHERE device = ? AND stage NOT IN ('archived', 'abandoned') AND session_id != ? "
+                "AND attempts >= ?",
+                (now, device, session_id, self.max_attempts)
+            )
+            rows = self._conn.execute(
+                "SELECT * FROM scan_items "
+                "WHERE device = ? AND stage NOT IN ('archived', 'abandoned') AND session_id != ? ORDER BY id",
+                (device, session_id)
+            ).fetchall()
+            if rows:
+                self._conn.execute(
+                    "UPDATE scan_items SET session_id = ?, attempts = attempts + 1, updated_at = ? "
+                    "WHERE device = ? AND stage NOT IN ('archived', 'abandoned') AND session_id != ?",
+                    (session_id, now, device, session_id)
+                )
+                self._conn.execute(
+                    "UPDATE scan_sessions SET resumed = resumed + ? WHERE id = ?", (len(rows), session_id)
+                )
+        return [
+            {
+                "id": row["id"],
+                "raw_id": row["raw_id"],
+                "email": json.loads(row["email"]),
+                "stage": row["stage"],
+                "categorized": json.loads(row["categorized"]) if row["categorized"] else None,
+                "origin": row["origin"],
+                "category": row["category"],
+            }
+            for row in rows
+        ]
+
+    def record_extracted(self, session_id: int, device: Optional[str], raw_id: int, email: Dict) -> int:
+        """
+        Journal an email whose raw copy was just saved.
+
+        Returns:
+            Journal item id
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            item_id = self._conn.execute(
+                "INSERT INTO scan_items (session_id, device, raw_id, subject, email, stage, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, 'extracted', ?)",
+                (session_id, device or "", raw_id, email.get("Subject", ""), json.dumps(email), now)
+            ).lastrowid
+            self._conn.execute("UPDATE scan_sessions SET updated_at = ? WHERE id = ?", (now, session_id))
+        return item_id
+
+    def mark_categorized(self, item_id: int, categorized: Dict, origin: Optional[str] = None):
+        """Keep an email's Gemini result (and which categorizer gave it), so a resume doesn't ask again."""
+        self._advance([item_id], "categorized", categorized=json.dumps(categorized), origin=origin)
+
+    def mark_persisted(self, item_id: int, category: str):
+        """The email's categorized records are in the store; only its inbox action is left."""
+        self._advance([item_id], "persisted", category=category)
+
+    def mark_archived(self, item_ids: List[int]):
+        """The emails' inbox actions are done (or weren't needed)."""
+        self._advance(item_ids, "archived")
+
+    def _advance(self, item_ids: List[int], stage: str, **fields):
+        if not item_ids:
+            return
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        sql = f"UPDATE scan_items SET stage = ?, updated_at = ?{', ' + assignments if fields else ''} WHERE id = ?"
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(sql, [(stage, now, *fields.values(), item_id) for item_id in item_ids])
+
+    def _prune(self, now: float):
+        cutoff = now - self.retention
+        self._conn.execute(
+            "DELETE FROM scan_items WHERE stage IN ('archived', 'abandoned') AND updated_at < ?", (cutoff,)
+        )
+        self._conn.execute(
+            "DELETE FROM scan_sessions WHERE status != 'running' AND finished_at < ? "
+            "AND id NOT IN (SELECT DISTINCT session_id FROM scan_items)",
+            (cutoff,)
+        )
+
+    def sessions(self, limit: int = 20) -> List[Dict]:
+        """Most recent sessions with their emails counted by stage."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM scan_sessions ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+            counts: Dict[int, Dict[str, int]] = {}
+            if rows:
+                ids = [row["id"] for row in rows]
+                for session_id, stage, count in self._conn.execute(
+                    f"SELECT session_id, stage, COUNT(*) FROM scan_items "
+                    f"WHERE session_id IN ({','.join('?' * len(ids))}) GROUP BY session_id, stage",
+                    ids
+                ):
+                    counts.setdefault(session_id, {})[stage] = count
+        return [
+            {
+                **dict(row),
+                "device": row["device"] or None,
+                "stages": {stage: counts.get(row["id"], {}).get(stage, 0) for stage in STAGES + ("abandoned",)},
+            }
+            for row in rows
+        ]
+
+    def unfinished_count(self, device: Optional[str] = None) -> int:
+        """Emails waiting to be resumed (for one device, or all devices)."""
+        sql = "SELECT COUNT(*) FROM scan_items WHERE stage NOT IN ('archived', 'abandoned')"
+        params = ()
+        if device is not None:
+            sql += " AND device = ?"
+            params = (device,)
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()[0]
+
+
+_journals: Dict[str, ScanJournal] = {}
+_journals_lock = threading.Lock()
+
+
+def get_scan_journal(data_dir: Path) -> ScanJournal:
+    """
+    Get the process-wide scan journal for a data directory.
+
+    Args:
+        data_dir: Directory holding the journal database
+
+    Returns:
+        ScanJournal instance
+    """
+    key = str(Path(data_dir).resolve())
+    with _journals_lock:
+        if key not in _journals:
+            _journals[key] = ScanJournal(Path(data_dir))
+        return _journals[key]
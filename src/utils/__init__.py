@@ -1,10 +1,24 @@
 """Utility modules for InboxPilot"""
 
 from .config_loader import get_droidrun_config, get_llm
+from .device_pool import Device, DevicePool, get_device_pool
 from .logger import setup_logger
+from .metrics import REGISTRY, Counter, Histogram, MetricsRegistry, render_metrics, span
+from .pipeline import Pipeline, StageStats
 
 __all__ = [
     'get_droidrun_config',
     'get_llm',
+    'Device',
+    'DevicePool',
+    'get_device_pool',
     'setup_logger',
+    'Counter',
+    'Histogram',
+    'MetricsRegistry',
+    'REGISTRY',
+    'render_metrics',
+    'span',
+    'Pipeline',
+    'StageStats',
 ]
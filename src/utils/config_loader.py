@@ -1,46 +1,84 @@
 """Configuration loader utilities"""
 
+import dataclasses
+import threading
 from pathlib import Path
+from typing import Dict, Tuple
+
 from droidrun import DroidrunConfig
 from llama_index.llms.google_genai import GoogleGenAI
 
+# Parsed config per resolved path, with the mtime it was parsed at
+_configs: Dict[str, Tuple[float, DroidrunConfig]] = {}
+_configs_lock = threading.Lock()
+
+# One LLM client per model, so HTTP connection pools stay warm across agent runs
+_llms: Dict[str, GoogleGenAI] = {}
+_llms_lock = threading.Lock()
+
+
+def _resolve_config_path(config_path: str) -> Path:
+    """Resolve a config path relative to the project root."""
+    config_file = Path(config_path)
+    if not config_file.is_absolute():
+        project_root = Path(__file__).parent.parent.parent
+        config_file = project_root / config_path
+    return config_file
+
+
+def _load_base_config(config_file: Path) -> DroidrunConfig:
+    """Parse config.yaml once, re-parsing only when the file's mtime changes."""
+    if not config_file.exists():
+        raise FileNotFoundError(f"Config file not found: {config_file}")
+
+    key = str(config_file.resolve())
+    mtime = config_file.stat().st_mtime
+    with _configs_lock:
+        cached = _configs.get(key)
+        if cached is None or cached[0] != mtime:
+            config = DroidrunConfig.from_yaml(str(config_file))
+            config.tracing.enabled = True
+            config.agent.reasoning = False
+            _configs[key] = (mtime, config)
+        return _configs[key][1]
+
 
 def get_droidrun_config(max_steps: int = 20, config_path: str = "config.yaml") -> DroidrunConfig:
     """
     Load DroidRun configuration from YAML file.
-    
+
+    The file is parsed once per process (and again only after it changes);
+    each call returns a copy with its own agent and device sections, so
+    callers can set max_steps or the device serial without affecting others.
+
     Args:
         max_steps: Maximum number of agent steps
         config_path: Path to config.yaml file (can be relative or absolute)
-        
+
     Returns:
         Configured DroidrunConfig instance
     """
-    # Ensure config_path is absolute - resolve relative to project root if needed
-    config_file = Path(config_path)
-    if not config_file.is_absolute():
-        # If relative, resolve from project root
-        project_root = Path(__file__).parent.parent.parent
-        config_file = project_root / config_path
-    
-    if not config_file.exists():
-        raise FileNotFoundError(f"Config file not found: {config_file}")
-    
-    config = DroidrunConfig.from_yaml(str(config_file))
-    config.agent.max_steps = max_steps
-    config.tracing.enabled = True
-    config.agent.reasoning = False
-    return config
+    base = _load_base_config(_resolve_config_path(config_path))
+    return dataclasses.replace(
+        base,
+        agent=dataclasses.replace(base.agent, max_steps=max_steps),
+        device=dataclasses.replace(base.device)
+    )
 
 
 def get_llm(model: str = "models/gemini-2.5-flash") -> GoogleGenAI:
     """
     Get Gemini LLM instance for DroidRun agents.
-    
+
+    Instances are shared per model for the lifetime of the process.
+
     Args:
         model: Gemini model name (default: gemini-2.5-flash for cost efficiency)
-        
+
     Returns:
         Configured GoogleGenAI LLM instance
     """
-    return GoogleGenAI(model=model)
+    with _llms_lock:
+        if model not in _llms:
+            _llms[model] = GoogleGenAI(model=model)
+        return _llms[model]
@@ -0,0 +1,326 @@
+"""Pool of Android devices that DroidRun agents are scheduled onto"""
+
+import asyncio
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from async_adbutils import adb
+from droidrun import DroidAgent
+
+from .config_loader import get_droidrun_config, get_llm
+from .logger import setup_logger
+from .metrics import AGENT_RUNS, AGENT_SECONDS, AGENT_STEPS, DEVICE_WAIT_SECONDS
+from .pipeline import StageStats
+
+logger = setup_logger(__name__)
+
+# Comma-separated serials that override `adb devices` discovery
+DEVICES_ENV = "INBOXPILOT_DEVICES"
+
+# Consecutive agent errors before a device stops receiving unpinned work
+MAX_CONSECUTIVE_FAILURES = 3
+
+# Window focus lines sampled to tell when the UI has stopped changing
+UI_STATE_COMMAND = "dumpsys window windows | grep -E 'mCurrentFocus|mFocusedApp'"
+
+
+class Device:
+    """One ADB device: its lock holder, health and throughput counters."""
+
+    def __init__(self, serial: Optional[str], state: str = "device"):
+        """
+        Args:
+            serial: ADB serial, or None for whatever device config.yaml targets
+            state: ADB state ("device", "offline", "unauthorized", ...)
+        """
+        self.serial = serial
+        self.state = state
+        self.busy = False
+        self.current_goal: Optional[str] = None
+        self.consecutive_failures = 0
+        self.last_error: Optional[str] = None
+        self.stats = StageStats(serial or "default")
+        self.settle_stats = StageStats(f"{serial or 'default'}:settle")
+
+    @property
+    def healthy(self) -> bool:
+        return self.state == "device" and self.consecutive_failures < MAX_CONSECUTIVE_FAILURES
+
+    def as_dict(self, wall_seconds: float) -> Dict[str, Any]:
+        return {
+            "serial": self.serial,
+            "state": self.state,
+            "healthy": self.healthy,
+            "busy": self.busy,
+            "current_goal": self.current_goal,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error,
+            **self.stats.as_dict(wall_seconds),
+            "settle_p50": self.settle_stats.as_dict(wall_seconds)["latency_p50"],
+        }
+
+
+class DevicePool:
+    """
+    Schedules agent runs onto a set of ADB devices, one run per device at a time.
+
+    Unpinned runs go to any free healthy device; runs pinned to a serial
+    (a device's mailbox, or an action on an email that came from it) wait
+    for that device. A device that keeps raising errors is marked unhealthy
+    and only receives pinned work until discovery sees it again.
+    """
+
+    def __init__(self):
+        self.devices: Dict[Optional[str], Device] = {}
+        self.started_at: Optional[float] = None
+        self._discovered = False
+        self._condition: Optional[asyncio.Condition] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def _adb_devices(self) -> List[tuple]:
+        """(serial, state) pairs reported by the ADB server."""
+        try:
+            infos = await asyncio.wait_for(adb.list(), timeout=10)
+        except Exception as e:
+            logger.warning(f"⚠️  adb unavailable, using the configured device: {e or 'timeout'}")
+            return []
+        return [(info.serial, info.state) for info in infos]
+
+    async def discover(self) -> List[Device]:
+        """
+        (Re)discover devices from INBOXPILOT_DEVICES or the ADB server.
+
+        Known devices keep their stats; a device that is attached again gets
+        its failure count reset. With nothing found, the pool holds a single
+        device without a serial, i.e. the one config.yaml points at.
+
+        Returns:
+            The pool's devices
+        """
+        override = os.getenv(DEVICES_ENV)
+        if override:
+            found = [(serial.strip(), "device") for serial in override.split(",") if serial.strip()]
+        else:
+            found = await self._adb_devices()
+        if not found:
+            found = [(None, "device")]
+
+        devices = {}
+        for serial, state in found:
+            device = self.devices.get(serial) or Device(serial)
+            if state == "device":
+                device.consecutive_failures = 0
+            device.state = state
+            devices[serial] = device
+        # Keep busy devices that vanished so their runs can finish and release
+        for serial, device in self.devices.items():
+            if serial not in devices and device.busy:
+                device.state = "missing"
+                devices[serial] = device
+
+        self.devices = devices
+        self._discovered = True
+        if self.started_at is None:
+            self.started_at = time.time()
+        logger.info(f"✓ Device pool: {', '.join(str(d.serial or 'default') for d in devices.values())}")
+        condition = self._get_condition()
+        async with condition:
+            condition.notify_all()
+        return list(devices.values())
+
+    def _get_condition(self) -> asyncio.Condition:
+        # asyncio primitives belong to one loop; the CLI and tests may run several
+        loop = asyncio.get_running_loop()
+        if self._condition is None or self._loop is not loop:
+            self._condition = asyncio.Condition()
+            self._loop = loop
+        return self._condition
+
+    @property
+    def serials(self) -> List[Optional[str]]:
+        """Serials of devices that can take work (healthy first)."""
+        usable = [d for d in self.devices.values() if d.state == "device"]
+        usable.sort(key=lambda d: not d.healthy)
+        return [d.serial for d in usable]
+
+    def _pick(self, serial: Optional[str]) -> Optional[Device]:
+        if serial is not None:
+            device = self.devices.get(serial)
+            if device is None:
+                raise LookupError(f"Device {serial} is not attached")
+            return None if device.busy else device
+        free = [d for d in self.devices.values() if not d.busy and d.state == "device"]
+        healthy = [d for d in free if d.healthy]
+        if healthy:
+            return min(healthy, key=lambda d: d.stats.busy_seconds)
+        if free and not any(d.healthy for d in self.devices.values()):
+            # Every device is failing; keep trying rather than stall forever
+            return free[0]
+        return None
+
+    @asynccontextmanager
+    async def acquire(self, serial: Optional[str] = None) -> AsyncIterator[Device]:
+        """
+        Hold a device for the duration of the block.
+
+        Args:
+            serial: Specific device to wait for; None takes the least-used
+                free healthy device
+
+        Raises:
+            LookupError: If the serial is not attached
+        """
+        if not self._discovered:
+            await self.discover()
+        condition = self._get_condition()
+        async with condition:
+            while True:
+                device = self._pick(serial)
+                if device is not None:
+                    break
+                await condition.wait()
+            device.busy = True
+        try:
+            yield device
+        finally:
+            device.busy = False
+            device.current_goal = None
+            async with condition:
+                condition.notify_all()
+
+    async def run_agent(
+        self,
+        goal: str,
+        max_steps: int = 30,
+        output_model=None,
+        config_path: str = "config.yaml",
+        serial: Optional[str] = None,
+        settle_seconds: float = 0.0,
+        task: str = "agent"
+    ):
+        """
+        Run one DroidAgent on a device from the pool.
+
+        Args:
+            goal: Goal string for the agent
+            max_steps: Maximum number of agent steps
+            output_model: Optional Pydantic model for structured output
+            config_path: Path to config.yaml
+            serial: Pin the run to this device
+            settle_seconds: After the run, keep the device reserved until its
+                UI stops changing, for at most this long, so the next run on
+                it starts from a settled screen
+            task: Short name of the kind of run ("extract_email", "archive",
+                ...), used to label its metrics
+
+        Returns:
+            DroidAgent result
+        """
+        requested = time.monotonic()
+        async with self.acquire(serial) as device:
+            DEVICE_WAIT_SECONDS.observe(time.monotonic() - requested, task=task)
+            config = get_droidrun_config(max_steps=max_steps, config_path=config_path)
+            if device.serial is not None:
+                config.device.serial = device.serial
+            agent = DroidAgent(goal=goal, config=config, llms=get_llm(), output_model=output_model)
+
+            device.current_goal = goal.strip().splitlines()[0][:120] if goal.strip() else None
+            started = time.monotonic()
+            try:
+                result = await agent.run()
+            except Exception as e:
+                device.stats.record(time.monotonic() - started, ok=False)
+                AGENT_SECONDS.observe(time.monotonic() - started, task=task)
+                AGENT_RUNS.inc(task=task, device=device.serial or "default", outcome="error")
+                device.consecutive_failures += 1
+                device.last_error = str(e)
+                if not device.healthy:
+                    logger.warning(f"⚠️  Device {device.serial or 'default'} marked unhealthy: {e}")
+                raise
+            device.stats.record(time.monotonic() - started, ok=result.success)
+            AGENT_SECONDS.observe(time.monotonic() - started, task=task)
+            AGENT_STEPS.observe(getattr(result, "steps", 0) or 0, task=task)
+            AGENT_RUNS.inc(
+                task=task, device=device.serial or "default", outcome="success" if result.success else "failure"
+            )
+            device.consecutive_failures = 0
+            if not result.success:
+                device.last_error = result.reason
+
+            if settle_seconds:
+                await self._wait_until_idle(device, settle_seconds)
+            return result
+
+    async def _wait_until_idle(self, device: Device, timeout: float, interval: float = 0.2) -> float:
+        """
+        Poll the device's window focus until two samples in a row match.
+
+        Falls back to sleeping the whole timeout if the device can't be
+        queried, which is what callers did before idle detection.
+
+        Returns:
+            Seconds waited
+        """
+        started = time.monotonic()
+        deadline = started + timeout
+        previous = None
+        try:
+            handle = await adb.device(serial=device.serial)
+            while time.monotonic() < deadline:
+                sample = await handle.shell(UI_STATE_COMMAND, timeout=timeout)
+                if sample == previous:
+                    break
+                previous = sample
+                await asyncio.sleep(min(interval, max(0.0, deadline - time.monotonic())))
+        except Exception as e:
+            logger.debug(f"UI idle check unavailable on {device.serial or 'default'}: {e}")
+            await asyncio.sleep(max(0.0, deadline - time.monotonic()))
+        waited = time.monotonic() - started
+        device.settle_stats.record(waited)
+        return waited
+
+    async def stop_app(self, package: str, serial: Optional[str] = None) -> bool:
+        """
+        Force-stop an app on a device without an agent run.
+
+        Args:
+            package: Android package name
+            serial: Device to use (None: any free device)
+
+        Returns:
+            True if the stop command was delivered
+        """
+        async with self.acquire(serial) as device:
+            try:
+                handle = await adb.device(serial=device.serial)
+                await handle.app_stop(package)
+                return True
+            except Exception as e:
+                logger.warning(f"⚠️  Could not stop {package} on {device.serial or 'default'}: {e}")
+                return False
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        """Health and throughput per device."""
+        wall = time.time() - self.started_at if self.started_at else 0.0
+        return [device.as_dict(wall) for device in self.devices.values()]
+
+
+_pool: Optional[DevicePool] = None
+_pool_lock = threading.Lock()
+
+
+def get_device_pool() -> DevicePool:
+    """
+    Get the process-wide device pool.
+
+    Returns:
+        DevicePool instance
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = DevicePool()
+        return _pool
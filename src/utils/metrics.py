@@ -0,0 +1,242 @@
+"""
+Metrics
+Prometheus-style counters and histograms, and timed spans for pipeline phases
+"""
+
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Latency buckets (seconds) covering sub-millisecond disk writes to multi-minute agent runs
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> LabelValues:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonic counter per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(v)}" for key, v in values]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram per label set, with sum and count."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label values -> [per-bucket counts, sum, count]
+        self._values: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return entry[2] if entry else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, [list(entry[0]), entry[1], entry[2]]) for key, entry in self._values.items())
+        lines = []
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics of one process, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, documentation: str, labels: Tuple[str, ...], **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labels, **kwargs)
+            elif not isinstance(metric, cls) or metric.label_names != tuple(labels):
+                raise ValueError(f"Metric {name} already registered with a different type or labels")
+            return metric
+
+    def counter(self, name: str, documentation: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labels)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labels, buckets=buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# Metrics shared by the modules that drive devices and Gemini
+AGENT_RUNS = REGISTRY.counter(
+    "inboxpilot_agent_runs_total", "DroidAgent runs by task, device and outcome", ("task", "device", "outcome")
+)
+AGENT_SECONDS = REGISTRY.histogram(
+    "inboxpilot_agent_run_seconds", "DroidAgent run duration (excluding the wait for a device)", ("task",)
+)
+AGENT_STEPS = REGISTRY.histogram(
+    "inboxpilot_agent_steps", "Steps taken per DroidAgent run", ("task",),
+    buckets=(1, 2, 5, 10, 15, 20, 30, 50, 75, 100)
+)
+DEVICE_WAIT_SECONDS = REGISTRY.histogram(
+    "inboxpilot_device_wait_seconds", "Time an agent run waited for a free device", ("task",)
+)
+EXTRACTED_EMAILS = REGISTRY.counter(
+    "inboxpilot_extracted_emails_total", "Emails returned by extraction agent runs (several per run when batched)"
+)
+LLM_REQUESTS = REGISTRY.counter(
+    "inboxpilot_llm_requests_total", "Gemini requests by model and outcome (retries count separately)",
+    ("model", "outcome")
+)
+LLM_SECONDS = REGISTRY.histogram(
+    "inboxpilot_llm_request_seconds", "Gemini request latency (excluding rate-limit waits)", ("model",)
+)
+LLM_TOKENS = REGISTRY.counter(
+    "inboxpilot_llm_tokens_total", "Gemini tokens by model and kind (prompt or completion)", ("model", "kind")
+)
+PROMPT_PAYLOAD_TOKENS = REGISTRY.counter(
+    "inboxpilot_prompt_payload_tokens_total",
+    "Estimated tokens of email payloads sent to Gemini, before (raw) and after (compacted) compaction", ("stage",)
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    "inboxpilot_stage_seconds", "Duration of named pipeline phases", ("stage", "outcome")
+)
+CATEGORIZATIONS = REGISTRY.counter(
+    "inboxpilot_categorizations_total",
+    "Emails categorized, by source (rules, sender_memo, local_model, cache, gemini, fallback)", ("source",)
+)
+
+
+@contextmanager
+def span(stage: str, **attributes) -> Iterator[Dict]:
+    """
+    Time a phase into inboxpilot_stage_seconds and log it as one JSON line.
+
+    Works around sync and async code alike. The yielded dict can be filled
+    with attributes discovered during the phase (counts, ids, ...).
+
+    Args:
+        stage: Phase name, used as the histogram label
+        **attributes: Extra fields for the log line
+    """
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield attributes
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage, outcome=outcome)
+        logger.debug(json.dumps(
+            {"span": stage, "seconds": round(elapsed, 4), "outcome": outcome, **attributes}, default=str
+        ))
+
+
+def render_metrics(registry: Optional[MetricsRegistry] = None) -> str:
+    """All metrics in the Prometheus text exposition format."""
+    return (registry or REGISTRY).render()
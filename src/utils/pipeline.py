@@ -0,0 +1,169 @@
+"""Staged asyncio producer/consumer pipeline with per-stage stats"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional
+
+from .logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Marks the end of a stage's input
+_DONE = object()
+
+# Latest latencies kept per stage for percentiles; counts and totals cover everything
+LATENCY_WINDOW = 1024
+
+
+class StageStats:
+    """
+    Throughput and latency counters for one pipeline stage.
+
+    Counts, busy time and the max are running totals; percentiles come from
+    the latest LATENCY_WINDOW latencies, so long-lived stats stay bounded.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.max_seconds = 0.0
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def record(self, seconds: float, ok: bool = True):
+        self.busy_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.latencies.append(seconds)
+        if ok:
+            self.processed += 1
+        else:
+            self.failed += 1
+
+    def _percentile(self, pct: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+    def as_dict(self, wall_seconds: float) -> Dict[str, Any]:
+        return {
+            "processed": self.processed,
+            "failed": self.failed,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "utilization": round(self.busy_seconds / wall_seconds, 3) if wall_seconds else 0.0,
+            "throughput_per_min": round(self.processed / wall_seconds * 60, 2) if wall_seconds else 0.0,
+            "latency_p50": round(self._percentile(50), 3),
+            "latency_p95": round(self._percentile(95), 3),
+            "latency_max": round(self.max_seconds, 3),
+        }
+
+
+class _Stage:
+    def __init__(self, name: str, handler: Callable[[Any], Awaitable[Any]], workers: int):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.stats = StageStats(name)
+
+
+class Pipeline:
+    """
+    Chain of async stages connected by bounded queues.
+
+    A source async iterator feeds the first stage; each stage's handler
+    returns the item for the next stage (or None to drop it). Bounded
+    queues provide backpressure, so a fast stage can only run `queue_size`
+    items ahead of a slow one, and wall-clock time approaches the cost of
+    the slowest stage instead of the sum of all stages.
+    """
+
+    def __init__(self, queue_size: int = 2, source_name: str = "source"):
+        """
+        Args:
+            queue_size: Max items buffered between two stages
+            source_name: Name the source is reported under in stats
+        """
+        self.queue_size = queue_size
+        self.source_stats = StageStats(source_name)
+        self._stages: List[_Stage] = []
+        self.wall_seconds = 0.0
+
+    def add_stage(
+        self,
+        name: str,
+        handler: Callable[[Any], Awaitable[Any]],
+        workers: int = 1
+    ) -> "Pipeline":
+        """Append a stage run by `workers` concurrent consumers."""
+        self._stages.append(_Stage(name, handler, workers))
+        return self
+
+    async def _feed(self, source: AsyncIterator[Any], queue: asyncio.Queue, consumers: int):
+        iterator = source.__aiter__()
+        try:
+            while True:
+                started = time.monotonic()
+                try:
+                    item = await iterator.__anext__()
+                except StopAsyncIteration:
+                    break
+                self.source_stats.record(time.monotonic() - started)
+                await queue.put(item)
+        finally:
+            for _ in range(consumers):
+                await queue.put(_DONE)
+
+    async def _work(self, stage: _Stage, inbox: asyncio.Queue, outbox: Optional[asyncio.Queue]):
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                return
+            started = time.monotonic()
+            try:
+                result = await stage.handler(item)
+            except Exception as e:
+                stage.stats.record(time.monotonic() - started, ok=False)
+                logger.error(f"✗ Stage '{stage.name}' failed: {e}", exc_info=True)
+                continue
+            stage.stats.record(time.monotonic() - started)
+            if outbox is not None and result is not None:
+                await outbox.put(result)
+
+    async def _run_stage(self, index: int, queues: List[asyncio.Queue]):
+        stage = self._stages[index]
+        outbox = queues[index + 1] if index + 1 < len(queues) else None
+        await asyncio.gather(*(self._work(stage, queues[index], outbox) for _ in range(stage.workers)))
+        if outbox is not None:
+            for _ in range(self._stages[index + 1].workers):
+                await outbox.put(_DONE)
+
+    async def run(self, source: AsyncIterator[Any]) -> Dict[str, Dict[str, Any]]:
+        """
+        Drain the source through every stage.
+
+        Returns:
+            Per-stage stats keyed by stage name (source first)
+        """
+        if not self._stages:
+            raise ValueError("Pipeline has no stages")
+
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self._stages]
+        started = time.monotonic()
+        tasks = [asyncio.ensure_future(self._feed(source, queues[0], self._stages[0].workers))]
+        tasks += [asyncio.ensure_future(self._run_stage(i, queues)) for i in range(len(self._stages))]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+        self.wall_seconds = time.monotonic() - started
+        return self.get_stats()
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-stage throughput and latency stats."""
+        stats = {self.source_stats.name: self.source_stats.as_dict(self.wall_seconds)}
+        for stage in self._stages:
+            stats[stage.name] = stage.stats.as_dict(self.wall_seconds)
+        return stats
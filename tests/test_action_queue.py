@@ -0,0 +1,62 @@
+"""Tests for the action queue: leases, expiry, re-leasing and owner checks"""
+
+import time
+
+from src.storage import ActionQueue
+
+
+def test_leased_actions_are_not_claimable_until_the_lease_expires(tmp_path):
+    queue = ActionQueue(tmp_path)
+    queued = queue.enqueue("archive", email_id="info_0")
+
+    assert [action["id"] for action in queue.lease("worker-a", lease_seconds=0.2)] == [queued["id"]]
+    assert queue.lease("worker-b") == []
+
+    time.sleep(0.3)
+    released = queue.lease("worker-b", lease_seconds=60)
+    assert [action["id"] for action in released] == [queued["id"]]
+    assert queue.get(queued["id"])["leaseOwner"] == "worker-b"
+    assert queue.get(queued["id"])["attempts"] == 2
+
+
+def test_only_the_current_owner_can_ack_or_renew(tmp_path):
+    queue = ActionQueue(tmp_path)
+    queued = queue.enqueue("delete", email_id="spam_0")
+    queue.lease("worker-a", lease_seconds=0.2)
+    time.sleep(0.3)
+    queue.lease("worker-b", lease_seconds=60)
+
+    assert queue.renew([queued["id"]], "worker-a", lease_seconds=60) == []
+    assert queue.ack(queued["id"], owner="worker-a") is False
+    assert queue.nack(queued["id"], owner="worker-a", error="too late") is False
+    assert queue.get(queued["id"])["status"] == "leased"
+
+    assert queue.renew([queued["id"]], "worker-b", lease_seconds=60) == [queued["id"]]
+    assert queue.ack(queued["id"], owner="worker-b") is True
+    assert queue.get(queued["id"])["status"] == "completed"
+    assert queue.ack(queued["id"], owner="worker-b") is False
+
+
+def test_renewed_leases_outlive_their_first_expiry(tmp_path):
+    queue = ActionQueue(tmp_path)
+    queued = queue.enqueue("archive", email_id="info_1")
+    queue.lease("worker-a", lease_seconds=0.2)
+
+    queue.renew([queued["id"]], "worker-a", lease_seconds=60)
+    time.sleep(0.3)
+
+    assert queue.lease("worker-b") == []
+
+
+def test_nacked_actions_are_retried_until_max_attempts(tmp_path):
+    queue = ActionQueue(tmp_path, max_attempts=2)
+    queued = queue.enqueue("archive", email_id="info_2")
+
+    queue.lease("worker-a")
+    assert queue.nack(queued["id"], owner="worker-a", error="device busy") is True
+    assert queue.get(queued["id"])["status"] == "queued"
+
+    queue.lease("worker-a")
+    assert queue.nack(queued["id"], owner="worker-a", error="device busy") is True
+    assert queue.get(queued["id"])["status"] == "failed"
+    assert queue.lease("worker-a") == []
@@ -0,0 +1,78 @@
+"""Tests for batched categorization: reconcile and bisection"""
+
+import asyncio
+
+from src.categorization import BatchCategorizer, CategorizationError, empty_buckets
+from src.categorization.batching import reconcile
+
+
+def _items(count):
+    return [(str(i), {"Subject": f"Email {i}", "Text": "body"}) for i in range(count)]
+
+
+def _answer(payload, skip=()):
+    """Batched result putting every email but `skip` in the information bucket."""
+    result = empty_buckets()
+    result["information_emails"] = [
+        {"id": email["id"], "subject": email["Subject"]} for email in payload["emails"] if email["id"] not in skip
+    ]
+    return result
+
+
+def test_reconcile_splits_by_id():
+    categorized = empty_buckets()
+    categorized["spam_emails"] = [{"id": "1", "subject": "Sale"}]
+    categorized["urgent_emails"] = [{"id": 2, "subject": "Outage"}]
+
+    per_id = reconcile(categorized, ["1", "2"])
+
+    assert per_id["1"]["spam_emails"] == [{"subject": "Sale"}]
+    assert per_id["2"]["urgent_emails"] == [{"subject": "Outage"}]
+    assert not per_id["1"]["urgent_emails"]
+
+
+def test_reconcile_rejects_missing_duplicate_and_unknown_ids():
+    missing = {"spam_emails": [{"id": "1"}]}
+    duplicate = {"spam_emails": [{"id": "1"}], "urgent_emails": [{"id": "1"}, {"id": "2"}]}
+    unknown = {"spam_emails": [{"id": "1"}, {"id": "2"}, {"id": "9"}]}
+
+    for categorized in (missing, duplicate, unknown):
+        assert reconcile(categorized, ["1", "2"]) is None
+
+
+def test_reconcile_rejects_results_not_shaped_like_buckets():
+    for categorized in ([{"id": "1"}], "spam", None, {"spam_emails": "1"}, {"spam_emails": ["1"]}):
+        assert reconcile(categorized, ["1"]) is None
+
+
+def test_unreconcilable_batches_are_bisected():
+    calls = []
+
+    async def categorize(payload):
+        calls.append(len(payload["emails"]))
+        # Batches of more than two lose their last email
+        skip = {payload["emails"][-1]["id"]} if len(payload["emails"]) > 2 else set()
+        return _answer(payload, skip)
+
+    batcher = BatchCategorizer(categorize, max_batch_size=8)
+    results = asyncio.run(batcher.categorize(_items(8)))
+
+    assert sorted(results, key=int) == [str(i) for i in range(8)]
+    assert all(result["information_emails"] for result in results.values())
+    assert calls[0] == 8 and batcher.bisections == 3
+    assert batcher.requests == len(calls) == 7
+
+
+def test_failed_requests_are_not_bisected():
+    calls = []
+
+    async def categorize(payload):
+        calls.append(len(payload["emails"]))
+        raise CategorizationError("quota exceeded")
+
+    batcher = BatchCategorizer(categorize, max_batch_size=5)
+    results = asyncio.run(batcher.categorize(_items(10)))
+
+    assert calls == [5, 5]
+    assert batcher.failed_requests == 2 and batcher.bisections == 0
+    assert results == {str(i): empty_buckets() for i in range(10)}
@@ -0,0 +1,31 @@
+"""Regression tests for prompt compaction"""
+
+from src.categorization.compaction import UNSUBSCRIBE_MARKER, compact_text
+
+PARAGRAPH = (
+    "We are writing to let you know that the quarterly report is ready and the numbers "
+    "look better than expected across every region."
+)
+
+
+def test_sign_off_followed_by_content_is_kept():
+    text = "Hi,\nThanks!\nYour payment failed, update your card"
+    assert compact_text(text) == text
+
+
+def test_sign_off_with_name_block_is_cut():
+    text = "Hi,\nYour payment failed, update your card.\nThanks,\nJane Doe\nBilling Team, Acme Corp\n+1 555 010 2000"
+    assert compact_text(text) == "Hi,\nYour payment failed, update your card."
+
+
+def test_boilerplate_phrase_in_body_is_kept():
+    body = f"{PARAGRAPH}\nPlease review the new privacy policy before you unsubscribe anyone.\n{PARAGRAPH}"
+    assert compact_text(body) == body
+
+
+def test_trailing_footer_is_stripped():
+    text = (
+        f"{PARAGRAPH}\n\nAcme Corp, 1 Main St\nUnsubscribe here\nPrivacy Policy | Terms of Service\n"
+        "© 2024 Acme Corp. All rights reserved."
+    )
+    assert compact_text(text) == f"{PARAGRAPH}\n\nAcme Corp, 1 Main St\n{UNSUBSCRIBE_MARKER}"
@@ -0,0 +1,44 @@
+"""Regression tests for recategorizing the stored emails"""
+
+import asyncio
+import os
+
+os.environ.setdefault("INBOXPILOT_WEBAPP_MODE", "1")
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+
+from src.categorization import CategorizationError
+from src.modules.email_categorizer import EmailCategorizer
+from src.storage import get_email_store
+
+
+def _email(index):
+    return {
+        "Name": f"Colleague {index}",
+        "Email": f"colleague{index}@example.com",
+        "Subject": f"Project notes {index}",
+        "Text": f"Here are my notes on part {index} of the project.",
+    }
+
+
+def test_failed_batch_keeps_previous_records(tmp_path, monkeypatch):
+    store = get_email_store(tmp_path)
+    raw_ids = store.add_raw_emails([_email(i) for i in range(3)])
+    for raw_id in raw_ids:
+        store.add_emails(
+            [{"name": "Colleague", "email": "c@example.com", "subject": f"Notes {raw_id}", "category": "info"}],
+            raw_id=raw_id,
+            origin="gemini"
+        )
+
+    categorizer = EmailCategorizer(data_dir=str(tmp_path))
+
+    async def failing(*args, **kwargs):
+        raise CategorizationError("quota exceeded")
+
+    monkeypatch.setattr(categorizer.service, "categorize", failing)
+    stats = asyncio.run(categorizer.reprocess_emails(bypass_cache=True))
+
+    assert stats["info"] == 3
+    assert sorted(record["subject"] for record in store.list_emails("info")) == [
+        f"Notes {raw_id}" for raw_id in sorted(raw_ids)
+    ]
@@ -0,0 +1,116 @@
+"""Tests for the SQLite email store: migrations, legacy import and scoped replaces"""
+
+import json
+import sqlite3
+
+from src.storage import SqliteEmailStore
+
+
+def _record(subject, category="info", sender="alice@example.com"):
+    return {"name": "Alice", "email": sender, "subject": subject, "summary": "", "category": category}
+
+
+def _user_version(path):
+    with sqlite3.connect(str(path)) as conn:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _column(path, column, raw_id=None):
+    """A categorized_emails column per record, by raw_id (NULL raw_ids when raw_id is None)."""
+    with sqlite3.connect(str(path)) as conn:
+        rows = conn.execute(
+            f"SELECT {column} FROM categorized_emails WHERE raw_id IS ? ORDER BY seq", (raw_id,)
+        ).fetchall()
+    return [row[0] for row in rows]
+
+
+def test_migrates_an_empty_database(tmp_path):
+    store = SqliteEmailStore(tmp_path)
+
+    assert _user_version(store.db_path) == len(SqliteEmailStore.MIGRATIONS)
+    assert store.counts() == {"urgent": 0, "decisions": 0, "calendar": 0, "info": 0, "spam": 0}
+    assert store.last_raw_id() == 0
+
+
+def test_upgrades_a_first_version_database(tmp_path):
+    with sqlite3.connect(str(tmp_path / SqliteEmailStore.DB_NAME)) as conn:
+        conn.executescript(SqliteEmailStore.MIGRATIONS[0])
+        conn.execute(
+            "INSERT INTO categorized_emails (id, category, raw_id, payload, created_at) VALUES (?, ?, ?, ?, ?)",
+            ("info_0", "info", None, json.dumps(_record("Old news")), "2024-01-01T00:00:00")
+        )
+        conn.execute("PRAGMA user_version = 1")
+
+    store = SqliteEmailStore(tmp_path)
+
+    assert _user_version(store.db_path) == len(SqliteEmailStore.MIGRATIONS)
+    records, _ = store.query_emails("info", sender="alice@example.com")
+    assert [record["subject"] for record in records] == ["Old news"]
+    # Records without a raw email came from the legacy processed JSON, i.e. from Gemini
+    assert _column(store.db_path, "origin") == ["gemini"]
+    assert list(store.iter_sender_categories())[0][:2] == ("alice@example.com", "info")
+    # Ids keep counting after the migrated record
+    assert store.add_emails([_record("New")])[0]["id"] == "info_1"
+
+
+def test_imports_legacy_json_once(tmp_path):
+    raw = [{"Name": "Alice", "Email": "alice@example.com", "Subject": "Hello", "Text": "Hi there"}]
+    dashboard = {"info": [dict(_record("Hello"), id="info_0")], "spam": [_record("Buy now", "spam")]}
+    (tmp_path / SqliteEmailStore.LEGACY_RAW_FILE).write_text(json.dumps(raw))
+    (tmp_path / SqliteEmailStore.LEGACY_PROCESSED_FILE).write_text(json.dumps(dashboard))
+
+    store = SqliteEmailStore(tmp_path)
+
+    assert [email["Subject"] for _, email in store.iter_raw_emails()] == ["Hello"]
+    assert store.counts()["info"] == 1 and store.counts()["spam"] == 1
+    assert store.get_email("info_0")["subject"] == "Hello"
+    assert sorted(category for _, category in store.iter_labeled_emails(origin="gemini")) == ["info"]
+
+    # Reopening doesn't import again
+    reopened = SqliteEmailStore(tmp_path)
+    assert reopened.count_raw_emails() == 1
+    assert sum(reopened.counts().values()) == 2
+
+
+def test_ignores_malformed_legacy_json(tmp_path):
+    (tmp_path / SqliteEmailStore.LEGACY_RAW_FILE).write_text("{not json")
+    (tmp_path / SqliteEmailStore.LEGACY_PROCESSED_FILE).write_text("[1, 2]")
+
+    store = SqliteEmailStore(tmp_path)
+
+    assert store.count_raw_emails() == 0
+    assert sum(store.counts().values()) == 0
+
+
+def test_replace_emails_only_touches_its_raw_ids(tmp_path):
+    store = SqliteEmailStore(tmp_path)
+    first, second = store.add_raw_emails([
+        {"Name": "Alice", "Email": "alice@example.com", "Subject": "One", "Text": "1"},
+        {"Name": "Bob", "Email": "bob@example.com", "Subject": "Two", "Text": "2"},
+    ])
+    old = store.add_emails([_record("One")], raw_id=first, origin="gemini")[0]
+    kept = store.add_emails([_record("Two", sender="bob@example.com")], raw_id=second, origin="gemini")[0]
+    created_at = _column(store.db_path, "created_at", first)
+
+    store.replace_emails([(_record("One again", "spam"), first)], raw_ids=[first], origins={first: "rules"})
+
+    assert store.get_email(old["id"]) is None
+    assert store.get_email(kept["id"])["subject"] == "Two"
+    replaced = store.list_emails("spam")
+    assert [record["subject"] for record in replaced] == ["One again"]
+    # A new id, never one that pointed at a different email
+    assert replaced[0]["id"] not in (old["id"], kept["id"])
+    # The rewritten record keeps when its email was first categorized
+    assert _column(store.db_path, "created_at", first) == created_at
+    assert [category for _, category in store.iter_labeled_emails(origin="rules")] == ["spam"]
+
+
+def test_replace_emails_without_scope_replaces_everything(tmp_path):
+    store = SqliteEmailStore(tmp_path)
+    (raw_id,) = store.add_raw_emails([{"Name": "Alice", "Email": "alice@example.com", "Subject": "One"}])
+    store.add_emails([_record("One")], raw_id=raw_id)
+    store.add_emails([_record("Other")], raw_id=None)
+
+    store.replace_emails([(_record("One", "urgent"), raw_id)])
+
+    assert store.counts() == {"urgent": 1, "decisions": 0, "calendar": 0, "info": 0, "spam": 0}
@@ -0,0 +1,62 @@
+"""Tests for the sender memo: invalidations anchored to raw ids"""
+
+from src.categorization import SenderMemo
+from src.storage import SqliteEmailStore
+
+SENDER = "deals@shop.example"
+
+
+def _save_spam(store, count, origin="gemini"):
+    raw_ids = store.add_raw_emails([
+        {"Name": "Shop", "Email": SENDER, "Subject": f"Sale {store.last_raw_id() + i}", "Text": "50% off"}
+        for i in range(count)
+    ])
+    for raw_id in raw_ids:
+        record = {"name": "Shop", "email": SENDER, "subject": f"Sale {raw_id}", "category": "spam"}
+        store.add_emails([record], raw_id=raw_id, origin=origin)
+    return raw_ids
+
+
+def _memo(tmp_path, store):
+    return SenderMemo(tmp_path, store=store, threshold=0.7, shadow_rate=0.0)
+
+
+def test_consistent_sender_is_decided(tmp_path):
+    store = SqliteEmailStore(tmp_path)
+    _save_spam(store, 4)
+
+    decision = _memo(tmp_path, store).classify({"Email": SENDER})
+
+    assert decision["bucket"] == "spam_emails" and decision["decided"]
+
+
+def test_invalidation_survives_a_recategorize_and_a_rebuild(tmp_path):
+    store = SqliteEmailStore(tmp_path)
+    raw_ids = _save_spam(store, 4)
+    memo = _memo(tmp_path, store)
+    memo.invalidate(SENDER, reason="restored")
+
+    # A recategorize rewrites the same raw emails with fresh records and timestamps
+    store.replace_emails(
+        [({"name": "Shop", "email": SENDER, "subject": f"Sale {raw_id}", "category": "spam"}, raw_id)
+         for raw_id in raw_ids],
+        raw_ids=raw_ids,
+        origins={raw_id: "gemini" for raw_id in raw_ids}
+    )
+    assert memo.classify({"Email": SENDER})["bucket"] is None
+    assert _memo(tmp_path, store).classify({"Email": SENDER})["bucket"] is None
+
+    # Emails saved after the invalidation build a new history
+    _save_spam(store, 4)
+    assert memo.classify({"Email": SENDER})["decided"]
+    assert _memo(tmp_path, store).classify({"Email": SENDER})["decided"]
+
+
+def test_memo_answers_are_not_counted_as_history(tmp_path):
+    store = SqliteEmailStore(tmp_path)
+    _save_spam(store, 4, origin="sender_memo")
+    memo = _memo(tmp_path, store)
+
+    assert memo.classify({"Email": SENDER})["bucket"] is None
+    _save_spam(store, 4, origin="sender_memo")
+    assert memo.classify({"Email": SENDER})["bucket"] is None
@@ -9,10 +9,27 @@ import SpamQuarantine from "@/components/SpamQuarantine";
 import UrgentView from "@/components/UrgentView";
 import InfoView from "@/components/InfoView";
 import CalendarView from "@/components/CalendarView";
-import { EmailData } from "@/types";
+import { Email, EmailData } from "@/types";
 
 type View = "dashboard" | "decisions" | "spam" | "urgent" | "info" | "calendar";
 
+const CATEGORIES: Email["category"][] = ["urgent", "info", "calendar", "spam", "decisions"];
+
+// Apply change feed events to the current dashboard data
+const withoutEmail = (data: EmailData, id: string): EmailData => {
+  const next = { ...data };
+  for (const category of CATEGORIES) {
+    next[category] = data[category].filter((email) => email.id !== id);
+  }
+  return next;
+};
+
+const withEmail = (data: EmailData, email: Email): EmailData => {
+  const next = withoutEmail(data, email.id);
+  next[email.category] = [...next[email.category], email];
+  return next;
+};
+
 export default function Home() {
   const [currentView, setCurrentView] = useState<View>("dashboard");
   const [emailData, setEmailData] = useState<EmailData | null>(null);
@@ -35,10 +52,49 @@ export default function Home() {
 
   useEffect(() => {
     fetchData();
-    
-    // Poll every 30 seconds for updates
-    const interval = setInterval(fetchData, 30000);
-    return () => clearInterval(interval);
+
+    // Poll every 30 seconds only while the change feed is unavailable
+    let interval: ReturnType<typeof setInterval> | null = null;
+    const startPolling = () => {
+      if (!interval) interval = setInterval(fetchData, 30000);
+    };
+    const stopPolling = () => {
+      if (interval) clearInterval(interval);
+      interval = null;
+    };
+
+    if (typeof EventSource === "undefined") {
+      startPolling();
+      return stopPolling;
+    }
+
+    const source = new EventSource("/api/emails/stream");
+    const applyEvent = (update: (data: EmailData, event: any) => EmailData) => (message: MessageEvent) => {
+      const event = JSON.parse(message.data);
+      setEmailData((previous) => (previous ? update(previous, event) : previous));
+      setLastSync(new Date());
+    };
+
+    source.onopen = () => {
+      stopPolling();
+      setIsLive(true);
+    };
+    // EventSource reconnects by itself; poll in the meantime
+    source.onerror = () => startPolling();
+
+    // Catch up on anything missed before (re)connecting; a 304 if nothing changed
+    source.addEventListener("connected", () => fetchData());
+    source.addEventListener("email_added", applyEvent((data, event) => withEmail(data, event.email)));
+    source.addEventListener("email_removed", applyEvent((data, event) => withoutEmail(data, event.id)));
+    source.addEventListener("email_moved", applyEvent((data, event) => withEmail(withoutEmail(data, event.old_id), event.email)));
+    // Records were renumbered or we fell behind: take a fresh snapshot
+    source.addEventListener("emails_replaced", () => fetchData());
+    source.addEventListener("resync", () => fetchData());
+
+    return () => {
+      source.close();
+      stopPolling();
+    };
   }, []);
 
   const renderView = () => {
@@ -12,27 +12,45 @@ export default function Header({ isLive, lastSync, onRefresh }: HeaderProps) {
   const [isRecategorizing, setIsRecategorizing] = useState(false);
   const [isScheduling, setIsScheduling] = useState(false);
 
+  // Start a background job and poll it until it finishes
+  const runJob = async (url: string, body: object) => {
+    const response = await fetch(url, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify(body),
+    });
+    const data = await response.json();
+
+    if (!response.ok) {
+      // 409 means the same job is already running
+      const detail = data.detail?.message || data.detail || data.message;
+      throw new Error(detail || "Unknown error");
+    }
+
+    while (true) {
+      await new Promise((resolve) => setTimeout(resolve, 2000));
+      const jobResponse = await fetch(`/api/jobs/${data.job_id}`);
+      const job = await jobResponse.json();
+      if (!jobResponse.ok) {
+        throw new Error(job.detail || "Job not found");
+      }
+      if (job.status === "succeeded") {
+        return job.result;
+      }
+      if (job.status === "failed" || job.status === "cancelled") {
+        throw new Error(job.error || `Job ${job.status}`);
+      }
+    }
+  };
+
   const handleScanInbox = async () => {
     setIsScanning(true);
     try {
-      const response = await fetch("/api/emails/scan", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ max_emails: 10 }),
-      });
-      const data = await response.json();
-      
-      if (!response.ok) {
-        // Handle HTTP error responses
-        alert("❌ Scan failed: " + (data.detail || data.message || "Unknown error"));
-      } else if (data.success) {
-        alert(`✅ Scanned ${data.stats.processed} emails!`);
-        onRefresh?.();
-      } else {
-        alert("❌ Scan failed: " + (data.message || "Unknown error"));
-      }
+      const stats = await runJob("/api/emails/scan", { max_emails: 10 });
+      alert(`✅ Scanned ${stats.processed} emails!`);
+      onRefresh?.();
     } catch (error) {
-      alert("❌ Error scanning inbox: " + (error as Error).message);
+      alert("❌ Scan failed: " + (error as Error).message);
     } finally {
       setIsScanning(false);
     }
@@ -41,23 +59,11 @@ export default function Header({ isLive, lastSync, onRefresh }: HeaderProps) {
   const handleRecategorize = async () => {
     setIsRecategorizing(true);
     try {
-      const response = await fetch("/api/emails/recategorize", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({}),
-      });
-      const data = await response.json();
-      
-      if (!response.ok) {
-        alert("❌ Recategorization failed: " + (data.detail || data.message || "Unknown error"));
-      } else if (data.success) {
-        alert(`✅ Recategorized ${data.stats.total} emails!`);
-        onRefresh?.();
-      } else {
-        alert("❌ Recategorization failed: " + (data.message || "Unknown error"));
-      }
+      const stats = await runJob("/api/emails/recategorize", {});
+      alert(`✅ Recategorized ${stats.total} emails!`);
+      onRefresh?.();
     } catch (error) {
-      alert("❌ Error: " + (error as Error).message);
+      alert("❌ Recategorization failed: " + (error as Error).message);
     } finally {
       setIsRecategorizing(false);
     }
@@ -66,23 +72,11 @@ export default function Header({ isLive, lastSync, onRefresh }: HeaderProps) {
   const handleScheduleEvents = async () => {
     setIsScheduling(true);
     try {
-      const response = await fetch("/api/scheduler/run", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ delay: 1.5 }),
-      });
-      const data = await response.json();
-      
-      if (!response.ok) {
-        alert("❌ Scheduling failed: " + (data.detail || data.message || "Unknown error"));
-      } else if (data.success) {
-        alert(`✅ Scheduled ${data.stats.succeeded}/${data.stats.total} events!`);
-        onRefresh?.();
-      } else {
-        alert("❌ Scheduling failed: " + (data.message || "Unknown error"));
-      }
+      const stats = await runJob("/api/scheduler/run", { delay: 1.5 });
+      alert(`✅ Scheduled ${stats.succeeded}/${stats.total} events!`);
+      onRefresh?.();
     } catch (error) {
-      alert("❌ Error: " + (error as Error).message);
+      alert("❌ Scheduling failed: " + (error as Error).message);
     } finally {
       setIsScheduling(false);
     }